@@ -0,0 +1,254 @@
+# balance_analyzer.py
+"""Monte Carlo balance report for the ENEMIES in config.py.
+
+Plays every enemy against generated player builds (class, style, level,
+transformation, gear) with the same combat engine /cacar uses, and reports
+win rate, turns, HP lost and XP/money per minute of hunting. Builds are spread
+over a process pool; each one runs its fights with its own seeded RNG, so a
+report is reproducible.
+
+    python balance_analyzer.py                      # summary per enemy/class/level
+    python balance_analyzer.py --fights 5000 --csv balanco.csv
+    python balance_analyzer.py --classes Vampiro --levels 1,2,3 --enemies "Lobo Faminto"
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from combat_engine import Fighter, simulate_combat
+from config import (
+    ATTRIBUTE_POINT_GAINS,
+    ATTRIBUTE_POINTS_PER_LEVEL,
+    BATTLE_TURN_DELAY,
+    CLASS_BASE_STAT_BONUSES,
+    CLASS_TRANSFORMATIONS,
+    ENEMIES,
+    HUNT_COOLDOWN_SECONDS,
+    INITIAL_ATTACK,
+    INITIAL_HP,
+    INITIAL_SPECIAL_ATTACK,
+    ITEMS_DATA,
+    MAX_ENERGY,
+    MAX_HP_PER_LEVEL,
+    REVIVE_COST,
+)
+from player import Player
+from stats import CLASS_ITEMS, apply_class_item_hp
+
+STYLES = ("Habilidade Inata", "Aura")
+DEFAULT_LEVELS = (1, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+# How attribute points are spent: share of the points per attribute.
+POINT_PROFILES = {
+    "equilibrado": {"attack": 1, "special_attack": 1, "hp": 1},
+    "ataque": {"attack": 1},
+    "vida": {"hp": 1},
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Build:
+    player_class: str
+    style: str
+    level: int
+    transformation: str | None = None
+    equipped: bool = False  # Class item, Amuleto de Pedra and the style's blessings
+    profile: str = "equilibrado"
+
+
+def build_player(build: Build) -> Player:
+    """A full-HP sheet for the build, as if every level-up point went into its profile."""
+    stats = {
+        "hp": INITIAL_HP,
+        "attack": INITIAL_ATTACK,
+        "special_attack": INITIAL_SPECIAL_ATTACK,
+    }
+    for stat, bonus in CLASS_BASE_STAT_BONUSES.get(build.player_class, {}).items():
+        stats[stat] += bonus
+    stats["hp"] += MAX_HP_PER_LEVEL * (build.level - 1)
+
+    points = ATTRIBUTE_POINTS_PER_LEVEL * (build.level - 1)
+    weights = POINT_PROFILES[build.profile]
+    total_weight = sum(weights.values())
+    spent = 0
+    for index, (stat, weight) in enumerate(weights.items()):
+        share = (
+            points - spent
+            if index == len(weights) - 1
+            else points * weight // total_weight
+        )
+        stats[stat] += share * ATTRIBUTE_POINT_GAINS[stat]
+        spent += share
+
+    sheet = {
+        "class": build.player_class,
+        "style": build.style,
+        "level": build.level,
+        "hp": stats["hp"],
+        "max_hp": stats["hp"],
+        "base_attack": stats["attack"],
+        "base_special_attack": stats["special_attack"],
+        "inventory": {},
+        "energy": MAX_ENERGY,
+        "current_transformation": build.transformation,
+        "aura_blessing_active": False,
+        "bencao_dracula_active": False,
+        "amulet_used_since_revive": False,
+    }
+    if build.equipped:
+        item_id = CLASS_ITEMS.get(build.player_class)
+        if item_id:
+            sheet["inventory"][item_id] = 1
+            apply_class_item_hp(sheet, item_id)  # As if bought at this level
+        sheet["inventory"]["amuleto_de_pedra"] = 1
+        sheet["aura_blessing_active"] = build.style == "Aura"
+        sheet["bencao_dracula_active"] = build.player_class == "Vampiro"
+
+    return Player.from_dict(sheet)
+
+
+def generate_builds(classes, levels, profile: str = "equilibrado") -> list:
+    """Every style, transformation and gear combination the game allows."""
+    builds = []
+    for class_name in classes:
+        for style in STYLES:
+            for equipped in (False, True):
+                forms = [None]
+                for name, info in CLASS_TRANSFORMATIONS.get(class_name, {}).items():
+                    # Blessed forms need the Bênção do Rei Henrique active (Aura only)
+                    if not info.get("required_blessing") or (
+                        equipped and style == "Aura"
+                    ):
+                        forms.append(name)
+                for form in forms:
+                    for level in levels:
+                        builds.append(
+                            Build(class_name, style, level, form, equipped, profile)
+                        )
+    return builds
+
+
+def run_matchup(task: tuple) -> tuple:
+    """Worker: plays `fights` fights of one build against one enemy."""
+    build, enemy, fights, seed = task
+    fighter = Fighter.from_player(build_player(build))
+    rng = random.Random(seed)
+
+    wins = turns = hp_lost = 0
+    for _ in range(fights):
+        outcome = simulate_combat(fighter, enemy, "basico", rng)
+        wins += outcome.won
+        # A defeat ends after the enemy's half-turn, which already advanced the count
+        turns += outcome.turns if outcome.won else outcome.turns - 1
+        hp_lost += fighter.hp - outcome.player_hp
+    return build, enemy["name"], fights, wins, turns, hp_lost
+
+
+def summarize(build: Build, enemy: dict, fights: int, wins, turns, hp_lost) -> dict:
+    win_rate = wins / fights
+    mean_turns = turns / fights
+    xp = enemy["xp"]
+    if build.style == "Habilidade Inata":
+        xp = int(xp * (1 + ITEMS_DATA["habilidade_inata"]["xp_multiplier_passive"]))
+    # An animated fight shows about two half-turns per turn; /cacar cannot be
+    # used again before its cooldown anyway. A defeat costs the revive fee.
+    seconds = max(HUNT_COOLDOWN_SECONDS, BATTLE_TURN_DELAY * (2 * mean_turns - 1))
+    money = win_rate * enemy["money"] - (1 - win_rate) * REVIVE_COST
+    return {
+        "inimigo": enemy["name"],
+        "classe": build.player_class,
+        "estilo": build.style,
+        "nivel": build.level,
+        "forma": build.transformation or "",
+        "equipado": build.equipped,
+        "vitorias": round(win_rate, 4),
+        "turnos": round(mean_turns, 2),
+        "hp_perdido": round(hp_lost / fights, 1),
+        "xp_por_min": round(win_rate * xp * 60 / seconds, 1),
+        "dinheiro_por_min": round(money * 60 / seconds, 1),
+    }
+
+
+def analyze(builds, enemies, fights: int, seed: int = 0, workers=None) -> list:
+    pairs = [(build, enemy) for enemy in enemies for build in builds]
+    tasks = [
+        (build, enemy, fights, seed + index)
+        for index, (build, enemy) in enumerate(pairs)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 8))
+        results = pool.map(run_matchup, tasks, chunksize=chunksize)
+        enemy_by_name = {enemy["name"]: enemy for enemy in enemies}
+        return [
+            summarize(build, enemy_by_name[name], *counts)
+            for build, name, *counts in results
+        ]
+
+
+def print_summary(rows: list) -> None:
+    """Averages over styles, forms and gear: one line per enemy, class and level."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["inimigo"], row["classe"], row["nivel"])].append(row)
+
+    header = f"{'Inimigo':<20} {'Classe':<11} {'Nv':>3} {'Vitória':>8} {'Turnos':>7} {'HP perdido':>11} {'XP/min':>8} {'$/min':>8}"
+    current_enemy = None
+    for (enemy, class_name, level), group in groups.items():
+        if enemy != current_enemy:
+            print(f"\n{header}\n{'-' * len(header)}")
+            current_enemy = enemy
+
+        def mean(key):
+            return sum(row[key] for row in group) / len(group)
+
+        print(
+            f"{enemy:<20} {class_name:<11} {level:>3} {mean('vitorias'):>8.1%} "
+            f"{mean('turnos'):>7.1f} {mean('hp_perdido'):>11.1f} "
+            f"{mean('xp_por_min'):>8.1f} {mean('dinheiro_por_min'):>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simula milhares de lutas por inimigo e build para balancear config.py."
+    )
+    parser.add_argument("--fights", type=int, default=1000, help="lutas por matchup")
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)))
+    parser.add_argument("--classes", default=",".join(CLASS_TRANSFORMATIONS))
+    parser.add_argument("--enemies", default=None, help="nomes separados por vírgula")
+    parser.add_argument("--profile", choices=POINT_PROFILES, default="equilibrado")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="grava uma linha por build e inimigo")
+    args = parser.parse_args()
+
+    enemies = [enemy for location in ENEMIES.values() for enemy in location]
+    if args.enemies:
+        wanted = {name.strip() for name in args.enemies.split(",")}
+        enemies = [enemy for enemy in enemies if enemy["name"] in wanted]
+    builds = generate_builds(
+        [name.strip() for name in args.classes.split(",")],
+        [int(level) for level in args.levels.split(",")],
+        args.profile,
+    )
+    if not enemies or not builds:
+        sys.exit("Nenhum inimigo ou build corresponde aos filtros.")
+
+    print(
+        f"Simulando {len(builds) * len(enemies) * args.fights:,} lutas "
+        f"({len(builds)} builds x {len(enemies)} inimigos x {args.fights})..."
+    )
+    rows = analyze(builds, enemies, args.fights, args.seed, args.workers)
+    print_summary(rows)
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\n{len(rows)} linhas gravadas em {args.csv}")
@@ -0,0 +1,88 @@
+# battle_governor.py
+import asyncio
+from contextlib import asynccontextmanager
+
+# Reasons admit() can turn a fight away.
+BUSY = "busy"  # The player already has a fight running or waiting
+FULL = "full"  # Every slot and every queue place is taken
+
+
+class BattleGovernor:
+    """Caps how many PvE fights run at once and queues a few more.
+
+    Each player gets at most one fight (running or queued). Usage:
+
+        refusal = governor.admit(user_id)      # synchronous, answer fast if set
+        ...
+        async with governor.session(user_id):  # waits for a free slot
+            await run_the_fight()
+    """
+
+    def __init__(self, max_active: int, max_queued: int):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_active)
+        self._players = set()  # IDs (str) with an admitted fight
+        self.active = 0
+        self.queued = 0  # Admitted, waiting for a slot
+        self.completed = 0
+        self.rejected = 0
+
+    def admit(self, user_id) -> str | None:
+        """Reserves a place for the player's fight, or returns BUSY / FULL.
+
+        An admitted fight must then either enter session() or call release().
+        """
+        user_id = str(user_id)
+        if user_id in self._players:
+            refusal = BUSY
+        elif self.active + self.queued >= self.max_active + self.max_queued:
+            refusal = FULL
+        else:
+            self._players.add(user_id)
+            self.queued += 1
+            return None
+        self.rejected += 1
+        return refusal
+
+    def release(self, user_id) -> None:
+        """Gives back the place admit() reserved, for a fight that will not run."""
+        user_id = str(user_id)
+        if user_id in self._players:
+            self._players.discard(user_id)
+            self.queued -= 1
+
+    def must_wait(self) -> bool:
+        """True if the fight just admitted has to wait for a slot."""
+        return self.active + self.queued > self.max_active
+
+    def queue_position(self) -> int:
+        return max(0, self.active + self.queued - self.max_active)
+
+    @asynccontextmanager
+    async def session(self, user_id):
+        user_id = str(user_id)
+        try:
+            try:
+                await self._slots.acquire()
+            finally:
+                self.queued -= 1
+            self.active += 1
+            try:
+                yield
+            finally:
+                self.active -= 1
+                self.completed += 1
+                self._slots.release()
+        finally:
+            self._players.discard(user_id)
+
+    def metrics(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_active": self.max_active,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,251 @@
+# bosses.py
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import NamedTuple
+
+
+class HitBatch(NamedTuple):
+    """Hits applied together in one tick."""
+
+    damage: dict  # Player ID (str) -> damage dealt this tick
+    hits: int
+    crits: int
+
+    @property
+    def total(self) -> int:
+        return sum(self.damage.values())
+
+
+@dataclass(slots=True, eq=False)
+class BossInstance:
+    """One raid: a boss summoned in a channel, with its own HP and participants."""
+
+    channel_id: int
+    name: str
+    max_hp: int
+    attack: int
+    drops: dict
+    rewards: dict  # See BOSS_DATA["rewards"]
+    attack_interval: float  # Seconds between attacks with few players online
+    min_attack_interval: float
+    targets_per_attack: int
+    hp: int = 0
+    participants: dict = field(default_factory=dict)  # Player ID (str) -> damage dealt
+    # Participants whose status is "online": the only ones the boss can attack.
+    # Kept in step by BossManager.status_changed(), never rebuilt.
+    online: set = field(default_factory=set)
+    # time.monotonic() of the next attack; None while nobody online can be attacked
+    next_attack_at: float | None = None
+    # Hits waiting for the next tick (BOSS_HIT_TICK_SECONDS > 0).
+    pending_damage: dict = field(default_factory=dict)
+    pending_hits: int = 0
+    pending_crits: int = 0
+
+    @property
+    def defeated(self) -> bool:
+        return self.hp <= 0
+
+    def join(self, user_id: str, online: bool = True) -> None:
+        self.participants.setdefault(user_id, 0)
+        self.set_online(user_id, online)
+
+    def set_online(self, user_id: str, online: bool) -> None:
+        if online:
+            self.online.add(user_id)
+        else:
+            self.online.discard(user_id)
+
+    def attack_delay(self) -> float:
+        """Seconds until the next attack, shorter the more participants are online."""
+        crowd = max(len(self.online), self.targets_per_attack)
+        return max(
+            self.min_attack_interval,
+            self.attack_interval * self.targets_per_attack / crowd,
+        )
+
+    def hit(self, user_id: str, damage: int) -> None:
+        """Applies a hit right away."""
+        self.hp -= damage
+        self.participants[user_id] = self.participants.get(user_id, 0) + damage
+
+    def queue_hit(self, user_id: str, damage: int, crit: bool = False) -> None:
+        """Records a hit for the next apply_pending(); HP does not change yet."""
+        self.pending_damage[user_id] = self.pending_damage.get(user_id, 0) + damage
+        self.pending_hits += 1
+        self.pending_crits += crit
+
+    def apply_pending(self) -> HitBatch:
+        """Applies every queued hit at once."""
+        batch = HitBatch(self.pending_damage, self.pending_hits, self.pending_crits)
+        self.pending_damage = {}
+        self.pending_hits = self.pending_crits = 0
+        for user_id, damage in batch.damage.items():
+            self.hit(user_id, damage)
+        return batch
+
+
+class BossReward(NamedTuple):
+    money: int
+    xp: int
+    mvp_rank: int | None  # 1 for the top damage dealer, if among the MVPs
+
+
+def boss_rewards(boss: BossInstance) -> dict:
+    """Splits a defeated boss's rewards by damage dealt. Player ID -> BossReward.
+
+    Everyone gets `min_share` of the base reward; the rest of the pool (base
+    times the number of participants) is divided by share of the damage. The
+    top len(mvp_bonus) damage dealers also get that fraction of the base extra.
+    """
+    rewards = boss.rewards
+    base_money, base_xp = rewards.get("money", 0), rewards.get("xp", 0)
+    min_share = rewards.get("min_share", 1.0)
+    mvp_bonus = rewards.get("mvp_bonus", ())
+
+    count = len(boss.participants)
+    total_damage = sum(boss.participants.values())
+    mvps = heapq.nlargest(len(mvp_bonus), boss.participants.items(), key=itemgetter(1))
+    mvp_ranks = {user_id: rank for rank, (user_id, _) in enumerate(mvps, 1)}
+
+    result = {}
+    for user_id, damage in boss.participants.items():
+        share = damage / total_damage if total_damage else 1 / count
+        weight = min_share + (1 - min_share) * count * share
+        rank = mvp_ranks.get(user_id)
+        if rank is not None:
+            weight += mvp_bonus[rank - 1]
+        result[user_id] = BossReward(
+            int(base_money * weight), int(base_xp * weight), rank
+        )
+    return result
+
+
+class BossManager:
+    """The active bosses, at most one per channel.
+
+    Bosses are created from a template (config.BOSS_DATA). One scheduler task
+    runs every boss's attacks: it keeps a heap of (next_attack_at, boss) and
+    sleeps until the earliest. It starts with the first spawn and ends when no
+    boss is left; a boss with no online participant is simply not in the heap.
+    Each due attack runs as its own task, so a slow one does not delay others.
+    """
+
+    def __init__(self, template: dict, attack=None):
+        self.template = template
+        self._attack = attack  # async function(boss): one attack of the boss
+        self._bosses = {}  # channel_id -> BossInstance
+        self._schedule = []  # Heap of (next_attack_at, tie-breaker, boss)
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._scheduler = None  # The scheduler task, while bosses exist
+        self._attacks = set()  # Attacks under way
+
+    def get(self, channel_id) -> BossInstance | None:
+        return self._bosses.get(channel_id)
+
+    def __iter__(self):
+        return iter(list(self._bosses.values()))
+
+    def __len__(self) -> int:
+        return len(self._bosses)
+
+    def spawn(
+        self, channel_id, summoner_id, summoner_online: bool = True
+    ) -> BossInstance | None:
+        """Summons a boss in the channel; None if one is already active there."""
+        if channel_id in self._bosses:
+            return None
+        template = self.template
+        interval = template.get("attack_interval_seconds", 15)
+        boss = BossInstance(
+            channel_id=channel_id,
+            name=template["name"],
+            max_hp=template["max_hp"],
+            attack=template["attack"],
+            drops=dict(template.get("drops", {})),
+            rewards=template.get("rewards", {}),
+            attack_interval=interval,
+            min_attack_interval=template.get("min_attack_interval_seconds", interval),
+            targets_per_attack=template.get("targets_per_attack", 3),
+            hp=template["max_hp"],
+        )
+        boss.join(str(summoner_id), summoner_online)
+        self._bosses[channel_id] = boss
+        self._arm(boss)
+        if self._attack and (self._scheduler is None or self._scheduler.done()):
+            self._scheduler = asyncio.create_task(self._run())
+        return boss
+
+    def join(self, boss: BossInstance, user_id: str, online: bool = True) -> None:
+        """Adds a participant, scheduling the boss's attacks if it had no one to hit."""
+        boss.join(user_id, online)
+        if boss.next_attack_at is None and self._bosses.get(boss.channel_id) is boss:
+            self._arm(boss)
+
+    def remove(self, boss: BossInstance) -> bool:
+        """Ends a raid. Returns False if it had already ended, so that only one
+        caller (e.g. the killing blow) goes on to pay out rewards."""
+        if self._bosses.get(boss.channel_id) is not boss:
+            return False
+        del self._bosses[boss.channel_id]
+        boss.next_attack_at = None  # Its heap entry is skipped when it surfaces
+        self._wakeup.set()  # Lets the scheduler end if that was the last boss
+        return True
+
+    def status_changed(self, user_id, status: str) -> None:
+        """Call whenever a player's status changes, to keep `online` sets current."""
+        user_id = str(user_id)
+        for boss in self._bosses.values():
+            if user_id in boss.participants:
+                boss.set_online(user_id, status == "online")
+                if boss.next_attack_at is None:
+                    self._arm(boss)
+
+    def _arm(self, boss: BossInstance) -> None:
+        """Schedules the boss's next attack, if anyone online can be attacked."""
+        if not boss.online:
+            boss.next_attack_at = None
+            return
+        boss.next_attack_at = time.monotonic() + boss.attack_delay()
+        entry = (boss.next_attack_at, next(self._counter), boss)
+        heapq.heappush(self._schedule, entry)
+        if self._schedule[0] is entry:
+            self._wakeup.set()  # Earlier than what the scheduler sleeps for
+
+    async def _run(self):
+        while self._bosses:
+            self._wakeup.clear()
+            if not self._schedule:
+                await self._wakeup.wait()
+                continue
+            when, _, boss = self._schedule[0]
+            if (
+                boss.next_attack_at != when
+                or self._bosses.get(boss.channel_id) is not boss
+            ):
+                heapq.heappop(self._schedule)  # Rescheduled or ended meanwhile
+                continue
+            delay = when - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._schedule)
+            self._arm(boss)  # The next one, paced by the current crowd
+            if boss.online:
+                task = asyncio.create_task(self._attack_safely(boss))
+                self._attacks.add(task)
+                task.add_done_callback(self._attacks.discard)
+        self._schedule.clear()
+
+    async def _attack_safely(self, boss: BossInstance):
+        try:
+            await self._attack(boss)
+        except Exception as e:
+            print(f"Erro no ataque do boss no canal {boss.channel_id}: {e}")
@@ -0,0 +1,181 @@
+# combat_engine.py
+import random
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from config import CRITICAL_CHANCE, CRITICAL_MULTIPLIER, TRANSFORM_COST
+from player import Player
+from stats import calculate_effective_stats, player_modifiers
+
+# Vampiro heals this fraction of the damage dealt (before critical hits).
+VAMPIRE_BASIC_LIFESTEAL = 0.5
+VAMPIRE_SPECIAL_LIFESTEAL = 0.75
+
+
+@dataclass(slots=True, frozen=True)
+class Fighter:
+    """The player's side of a PvE fight, detached from the sheet and from Discord."""
+
+    hp: int
+    max_hp: int  # The sheet's max_hp; caps lifesteal like the live combat always did
+    attack: int
+    special_attack: int
+    energy: int
+    special_energy_cost: int
+    vampire: bool = False
+    evasion_chance: float = 0.0  # Bênção de Drácula
+    evasion_hp_steal: float = 0.0
+    has_amulet: bool = False  # Amuleto de Pedra available for this fight
+
+    @classmethod
+    def from_player(cls, raw_player_data: Player) -> "Fighter":
+        stats = calculate_effective_stats(raw_player_data)
+        modifiers = player_modifiers(raw_player_data)
+        return cls(
+            hp=raw_player_data.hp,
+            max_hp=raw_player_data.max_hp,
+            attack=stats.attack,
+            special_attack=stats.special_attack,
+            energy=raw_player_data.energy,
+            special_energy_cost=modifiers.special_energy_cost(TRANSFORM_COST),
+            vampire=raw_player_data.player_class == "Vampiro",
+            evasion_chance=modifiers.dracula_evasion_chance,
+            evasion_hp_steal=modifiers.dracula_hp_steal_percent,
+            has_amulet=(raw_player_data.inventory or {}).get("amuleto_de_pedra", 0) > 0
+            and not raw_player_data.get("amulet_used_since_revive", False),
+        )
+
+
+class TurnEvent(NamedTuple):
+    """One half of a turn: the player's attack or the enemy's."""
+
+    turn: int
+    actor: str  # "player" or "enemy"
+    damage: int
+    player_hp: int  # After this event
+    enemy_hp: int
+    crit: bool = False
+    special: bool = False  # Player used the special attack
+    energy_fallback: bool = False  # Player wanted the special but lacked energy
+    lifesteal: int = 0  # HP healed by Vampiro lifesteal or a Drácula evasion
+    evaded: bool = False  # Enemy attack dodged by the Bênção de Drácula
+    amulet: bool = False  # Amuleto de Pedra kept the player alive
+
+
+class CombatOutcome(NamedTuple):
+    won: bool
+    turns: int
+    player_hp: int  # Never negative
+    enemy_hp: int
+    energy: int
+    amulet_used: bool
+    events: list | None  # TurnEvents, only when record_events=True
+
+
+def simulate_combat(
+    fighter: Fighter,
+    enemy: dict,
+    opening: str = "basico",
+    rng: random.Random | None = None,
+    record_events: bool = False,
+) -> CombatOutcome:
+    """Plays a fight against an ENEMIES entry to the end, without any I/O.
+
+    `opening` is the first attack ("basico" or "especial"); later turns always
+    use the basic attack. Damage rolls are uniform over the same ranges as
+    random.randint but are drawn from `rng.random()` only, which keeps a seeded
+    simulation cheap.
+    """
+    rand = (rng or random).random
+    events = [] if record_events else None
+
+    hp = fighter.hp
+    max_hp = fighter.max_hp
+    energy = fighter.energy
+    vampire = fighter.vampire
+    evasion_chance = fighter.evasion_chance
+    amulet_available = fighter.has_amulet
+    amulet_used = False
+
+    basic_low = fighter.attack // 2
+    basic_span = fighter.attack - basic_low + 1
+    special_low = int(fighter.special_attack * 0.8)
+    special_span = int(fighter.special_attack * 1.5) - special_low + 1
+    enemy_hp = enemy["hp"]
+    enemy_low = enemy["attack"] // 2
+    enemy_span = enemy["attack"] - enemy_low + 1
+
+    turn = 1
+    while hp > 0 and enemy_hp > 0:
+        special = fallback = False
+        heal = 0
+        if turn == 1 and opening == "especial":
+            if energy < fighter.special_energy_cost:
+                # This should ideally be caught before starting combat, but as a fallback
+                fallback = True
+                damage = basic_low + int(rand() * basic_span)
+            else:
+                special = True
+                damage = special_low + int(rand() * special_span)
+                energy = max(0, energy - fighter.special_energy_cost)
+                if vampire:
+                    heal = int(damage * VAMPIRE_SPECIAL_LIFESTEAL)
+                    hp = min(max_hp, hp + heal)
+        else:
+            damage = basic_low + int(rand() * basic_span)
+            if vampire:
+                heal = int(damage * VAMPIRE_BASIC_LIFESTEAL)
+                hp = min(max_hp, hp + heal)
+
+        crit = rand() < CRITICAL_CHANCE
+        if crit:
+            damage = int(damage * CRITICAL_MULTIPLIER)
+        enemy_hp -= damage
+        if events is not None:
+            events.append(
+                TurnEvent(
+                    turn, "player", damage, hp, enemy_hp, crit, special, fallback, heal
+                )
+            )
+        if enemy_hp <= 0:
+            break
+
+        enemy_damage = enemy_low + int(rand() * enemy_span)
+        if evasion_chance and rand() < evasion_chance:
+            stolen = int(enemy_damage * fighter.evasion_hp_steal)
+            hp = min(max_hp, hp + stolen)
+            if events is not None:
+                events.append(
+                    TurnEvent(
+                        turn,
+                        "enemy",
+                        enemy_damage,
+                        hp,
+                        enemy_hp,
+                        lifesteal=stolen,
+                        evaded=True,
+                    )
+                )
+            continue  # An evaded attack does not end the turn
+
+        hp -= enemy_damage
+        saved = hp <= 0 and amulet_available
+        if saved:
+            hp = 1
+            amulet_available = False
+            amulet_used = True
+        if events is not None:
+            events.append(
+                TurnEvent(turn, "enemy", enemy_damage, hp, enemy_hp, amulet=saved)
+            )
+        turn += 1
+
+    return CombatOutcome(
+        won=hp > 0,
+        turns=turn,
+        player_hp=max(0, hp),
+        enemy_hp=enemy_hp,
+        energy=energy,
+        amulet_used=amulet_used,
+        events=events,
+    )
@@ -14,7 +14,67 @@ REVIVE_COST = 55
 BOUNTY_PERCENTAGE = 0.20
 TRANSFORM_COST = 2
 MAX_ENERGY = 10
+# Segundos para regenerar 1 de energia (calculado ao ler a ficha, sem tarefa periódica).
+ENERGY_REGEN_SECONDS = 60
 STARTING_LOCATION = "Abrigo dos Foras-da-Lei"
+MAX_HP_PER_LEVEL = 10
+# Quanto cada ponto de atributo (/distribuir_pontos) adiciona ao atributo base.
+ATTRIBUTE_POINT_GAINS = {"attack": 2, "special_attack": 3, "hp": 5}
+# Ajustes de cada classe sobre INITIAL_HP / INITIAL_ATTACK / INITIAL_SPECIAL_ATTACK.
+CLASS_BASE_STAT_BONUSES = {
+    "Lutador": {"hp": 20, "attack": 5},
+    "Espadachim": {"attack": 10, "special_attack": -5},
+    "Atirador": {"hp": -10, "special_attack": 10},
+    "Curandeiro": {"special_attack": 5},
+    "Vampiro": {"hp": 30, "attack": 8, "special_attack": 15},
+}
+HUNT_COOLDOWN_SECONDS = 15  # /cacar
+
+# --- CONFIGURAÇÕES DE PERSISTÊNCIA ---
+SAVE_COALESCE_SECONDS = 5  # Fichas alteradas são gravadas em lote após esta janela
+# "json" (outlaws_data.json), "sqlite" (uma linha por jogador, em SQLITE_DATA_FILE)
+# ou "journal" (outlaws_data.json + log de alterações em JOURNAL_DATA_FILE).
+# Para migrar para SQLite: python storage.py outlaws_data.json outlaws_data.db
+STORAGE_BACKEND = "json"
+SQLITE_DATA_FILE = "outlaws_data.db"
+JOURNAL_DATA_FILE = "outlaws_data.journal"
+JOURNAL_COMPACT_MINUTES = 10  # Frequência com que o log é consolidado no JSON
+# Carrega fichas sob demanda em vez de todas na inicialização (requer "sqlite").
+# Só as PLAYER_CACHE_SIZE fichas usadas mais recentemente ficam em memória.
+LAZY_LOADING = False
+PLAYER_CACHE_SIZE = 2000
+
+# --- CONFIGURAÇÕES DE BATALHA ---
+# Pausa (segundos) entre cada metade de turno numa batalha animada.
+BATTLE_TURN_DELAY = 2.5
+# Intervalo mínimo (segundos) entre edições da mensagem de uma batalha animada.
+# Quadros intermediários são descartados; o resultado final sai na hora.
+BATTLE_EDIT_INTERVAL = 3
+# Resolver /cacar e /batalhar de uma vez (um só embed de resumo) em vez de animar
+# turno a turno. Cada servidor pode mudar o padrão com /modo_combate.
+INSTANT_COMBAT_DEFAULT = False
+# Batalhas de /cacar e /batalhar rodando ao mesmo tempo; as seguintes esperam numa
+# fila de até MAX_QUEUED_BATTLES e, com ela cheia, são recusadas na hora.
+MAX_ACTIVE_BATTLES = 40
+MAX_QUEUED_BATTLES = 60
+# Golpes de /atacar_boss são confirmados na hora e somados; a vida do boss, o aviso
+# no canal e o salvamento acontecem uma vez por tick. 0 = aplicar cada golpe na hora.
+BOSS_HIT_TICK_SECONDS = 2
+# Resumo de um boss derrotado: participantes por página do embed paginado.
+BOSS_RESULTS_PAGE_SIZE = 10
+# Trocas de cargo de nível feitas ao mesmo tempo após um boss (as demais esperam),
+# para não enfileirar centenas de chamadas nem estourar o limite da API.
+ROLE_UPDATE_WORKERS = 4
+# Sincronização de cargos (nível, personagem inicial): só jogadores cujo nível ou
+# status mudou são conferidos, com no máximo esta quantidade de edições por segundo.
+ROLE_SYNC_EDITS_PER_SECOND = 1
+# Preferências por servidor (modo de combate...), em JSON.
+GUILD_SETTINGS_FILE = "guild_settings.json"
+
+# --- CONFIGURAÇÕES DE NOTIFICAÇÕES ---
+# DMs (ex.: fim de transformação/bênção) enviadas por segundo pela fila de fundo.
+# Avisos para o mesmo jogador que ainda esperam na fila saem numa só mensagem.
+DM_MESSAGES_PER_SECOND = 2
 
 
 CUSTOM_EMOJIS = {
@@ -201,15 +261,26 @@ CLASS_TRANSFORMATIONS = {
 }
 
 
+# Modelo do boss invocado com o Invocador. Cada canal pode ter o seu, com vida,
+# participantes e ataques próprios (ver bosses.py).
 BOSS_DATA = {
     "name": "Colosso de Pedra",
-    "hp": 0,
     "max_hp": 5000,
     "attack": 150,
-    "is_active": False,
-    "participants": [],
-    "channel_id": None,
+    # Com mais de targets_per_attack participantes online o boss ataca mais rápido
+    # (cada um continua sendo alvo com a mesma frequência), até o mínimo abaixo.
+    "attack_interval_seconds": 15,
+    "min_attack_interval_seconds": 5,
+    "targets_per_attack": 3,
     "drops": {"amuleto_de_pedra": 1},
+    # Recompensa média por participante. Cada um garante min_share dela; o resto é
+    # dividido pelo dano causado. Os maiores danos ganham mvp_bonus extra (1º, 2º...).
+    "rewards": {
+        "money": 5000,
+        "xp": 1000,
+        "min_share": 0.25,
+        "mvp_bonus": [0.5, 0.25, 0.1],
+    },
 }
 
 WORLD_MAP = {
@@ -0,0 +1,57 @@
+# dm_queue.py
+import asyncio
+
+import discord
+
+
+class DMQueue:
+    """Sends direct messages from one background worker, at a bounded rate.
+
+    notify() never awaits. Notices for a user still waiting in the queue are
+    merged into one message, and users found with DMs closed are skipped from
+    then on instead of costing a failed request every time.
+
+        dms = DMQueue(bot.get_user, per_second=2)
+        asyncio.create_task(dms.run())
+        dms.notify(user_id, "Sua transformação expirou!")
+    """
+
+    def __init__(self, get_user, per_second: float):
+        self._get_user = get_user  # int ID -> discord.User | None
+        self._interval = 1 / per_second
+        self._queue = asyncio.Queue()  # User IDs, each at most once
+        self._pending = {}  # User ID -> lines not sent yet
+        self.closed = set()  # IDs that answered discord.Forbidden
+        self.sent = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def notify(self, user_id, text: str) -> None:
+        user_id = int(user_id)
+        if user_id in self.closed:
+            return
+        lines = self._pending.get(user_id)
+        if lines is None:
+            self._pending[user_id] = [text]
+            self._queue.put_nowait(user_id)
+        else:
+            lines.append(text)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            user_id = await self._queue.get()
+            lines = self._pending.pop(user_id, None)
+            user = self._get_user(user_id)
+            if not lines or not user:
+                continue
+            started = loop.time()
+            try:
+                await user.send("\n".join(lines))
+                self.sent += 1
+            except discord.Forbidden:
+                self.closed.add(user_id)
+            except discord.HTTPException as e:
+                print(f"Erro ao enviar DM para {user_id}: {e}")
+            await asyncio.sleep(max(0.0, self._interval - (loop.time() - started)))
@@ -0,0 +1,69 @@
+# expiry_scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class ExpiryScheduler:
+    """Deadlines in a min-heap, fired by one task that sleeps until the earliest.
+
+    Keys are any hashable (e.g. (user_id, "aura")) and deadlines are wall-clock
+    timestamps, like the *_end_time fields of a sheet. schedule() and cancel()
+    are O(log n) and O(1); nothing runs between deadlines. Scheduling a key
+    again replaces its deadline: the old heap entry is skipped when it surfaces.
+
+        expiry = ExpiryScheduler(on_expire)  # async def on_expire(key)
+        expiry.schedule((user_id, "aura"), end_time)
+        asyncio.create_task(expiry.run())
+    """
+
+    def __init__(self, on_expire):
+        self._on_expire = on_expire
+        self._heap = []  # (deadline, tie-breaker, key)
+        self._deadlines = {}  # key -> its current deadline
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key, deadline: float) -> None:
+        self._deadlines[key] = deadline
+        entry = (deadline, next(self._counter), key)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wakeup.set()  # Earlier than what run() is sleeping for
+
+    def cancel(self, key) -> None:
+        self._deadlines.pop(key, None)
+
+    def pop_due(self, now: float | None = None) -> list:
+        """Removes and returns the keys whose deadline has passed."""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for key in self.pop_due():
+                try:
+                    await self._on_expire(key)
+                except Exception as e:
+                    print(f"Erro ao expirar {key}: {e}")
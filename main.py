@@ -2,9 +2,11 @@ import discord
 from discord.ext import commands, tasks
 import asyncio
 from discord import app_commands, Embed, Color, Interaction, ui, ButtonStyle
+import heapq
 import json
 import os
 import random
+import sqlite3
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
@@ -24,15 +26,61 @@ from config import (
     TRANSFORM_COST,
     MAX_ENERGY,
     STARTING_LOCATION,
+    MAX_HP_PER_LEVEL,
+    ATTRIBUTE_POINT_GAINS,
+    CLASS_BASE_STAT_BONUSES,
+    HUNT_COOLDOWN_SECONDS,
+    SAVE_COALESCE_SECONDS,
+    STORAGE_BACKEND,
+    SQLITE_DATA_FILE,
+    JOURNAL_DATA_FILE,
+    JOURNAL_COMPACT_MINUTES,
+    LAZY_LOADING,
+    PLAYER_CACHE_SIZE,
+    BATTLE_TURN_DELAY,
+    BATTLE_EDIT_INTERVAL,
+    INSTANT_COMBAT_DEFAULT,
+    MAX_ACTIVE_BATTLES,
+    MAX_QUEUED_BATTLES,
+    GUILD_SETTINGS_FILE,
+    DM_MESSAGES_PER_SECOND,
     ITEMS_DATA,
     CLASS_TRANSFORMATIONS,
     BOSS_DATA,
+    BOSS_HIT_TICK_SECONDS,
+    BOSS_RESULTS_PAGE_SIZE,
+    ROLE_UPDATE_WORKERS,
+    ROLE_SYNC_EDITS_PER_SECOND,
     WORLD_MAP,
     ENEMIES,
     PROFILE_IMAGES,
     LEVEL_ROLES,
     NEW_CHARACTER_ROLE_ID,
 )
+from player import (
+    SCHEMA_VERSION,
+    Player,
+    current_energy,
+    migrate_player,
+    seconds_to_next_energy,
+    settle_energy,
+)
+from combat_engine import Fighter, simulate_combat
+from player_locks import PlayerLocks, PlayerTransaction
+from role_sync import RoleReconciler
+from battle_governor import BUSY, BattleGovernor
+from bosses import BossInstance, BossManager, boss_rewards
+from dm_queue import DMQueue
+from expiry_scheduler import ExpiryScheduler
+from stats import apply_class_item_hp, calculate_effective_stats, player_modifiers
+from storage import (
+    JournalPlayerStore,
+    JsonPlayerStore,
+    LazyPlayerDatabase,
+    SqlitePlayerStore,
+    load_json,
+    write_json_atomic,
+)
 
 # --- CONFIGURAÇÃO INICIAL E CONSTANTES ---
 load_dotenv()
@@ -40,6 +88,12 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PLAYER_DATA_FILE = os.path.join(SCRIPT_DIR, "outlaws_data.json")
 GUILD_ID = 1318938087535153152  # Consider making this dynamic or loading from config if it varies
+combat_rng = random.Random()  # Dice for PvE fights (see combat_engine.py)
+# Active raids, one per channel, and the single task that runs their attacks
+boss_manager = BossManager(BOSS_DATA, lambda boss: bot.boss_attack(boss))
+BOSS_MVP_MEDALS = ("🥇", "🥈", "🥉")  # Later MVP ranks get 🏅
+player_locks = PlayerLocks()  # See player_locks.py for when a lock is needed
+battle_governor = BattleGovernor(MAX_ACTIVE_BATTLES, MAX_QUEUED_BATTLES)
 
 
 # Custom exception classes for command checks
@@ -56,315 +110,557 @@ class NotInWilderness(app_commands.CheckFailure):
 
 
 # --- GERENCIAMENTO DE DADOS ---
+if STORAGE_BACKEND == "sqlite":
+    player_store = SqlitePlayerStore(os.path.join(SCRIPT_DIR, SQLITE_DATA_FILE))
+elif STORAGE_BACKEND == "journal":
+    player_store = JournalPlayerStore(
+        PLAYER_DATA_FILE, os.path.join(SCRIPT_DIR, JOURNAL_DATA_FILE)
+    )
+else:
+    player_store = JsonPlayerStore(PLAYER_DATA_FILE)
+
+# IDs (str) of sheets changed since the last flush, and the pending flush timer.
+dirty_player_ids = set()
+_pending_flush = None
+
+# Background save state: at most one write is in flight (`_save_task`); requests
+# arriving meanwhile are merged into `_queued_save` (a set of IDs or _FULL_SAVE).
+_FULL_SAVE = object()
+_save_task = None
+_queued_save = None
+_queued_compaction = False  # Journal mode: fold the log into outlaws_data.json
+
+
+def has_unsaved_changes(user_id: str) -> bool:
+    """True while a sheet's latest changes are not yet handed to a save."""
+    if user_id in dirty_player_ids or _queued_save is _FULL_SAVE:
+        return True
+    return _queued_save is not None and user_id in _queued_save
+
+
 def load_data():
-    """Loads player data from the JSON file."""
-    if not os.path.exists(PLAYER_DATA_FILE):
-        return {}
+    """Loads player data from the configured store."""
+    if LAZY_LOADING:
+        if isinstance(player_store, SqlitePlayerStore):
+            # Each sheet is migrated when it is first loaded
+            return LazyPlayerDatabase(
+                player_store,
+                PLAYER_CACHE_SIZE,
+                has_unsaved_changes,
+                on_load=_prepare_loaded_player,
+            )
+        print('AVISO: LAZY_LOADING requer STORAGE_BACKEND = "sqlite"; ignorado.')
     try:
-        with open(PLAYER_DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
+        records = player_store.load_all()
+    except (json.JSONDecodeError, IOError, sqlite3.Error) as e:
         print(f"ERRO ao carregar dados: {e}")
         return {}
 
+    # Upgrade old sheets once here, so the rest of the bot can rely on the schema
+    migrated = [uid for uid, record in records.items() if migrate_player(record)]
+    if migrated:
+        dirty_player_ids.update(migrated)  # Written by the first save
+        print(f"{len(migrated)} fichas migradas para o schema v{SCHEMA_VERSION}.")
+    return {uid: Player.from_dict(record) for uid, record in records.items()}
+
+
+def _prepare_loaded_player(user_id: str, record: dict):
+    if migrate_player(record):
+        mark_player_dirty(user_id)
+    schedule_timed_effects(user_id, record)
+    track_player_roles(user_id, record)
+
 
 player_database = load_data()
+lazy_loading = isinstance(player_database, LazyPlayerDatabase)
+
+
+# --- EFEITOS COM DURAÇÃO ---
+# Effect -> (field that marks it active, its end-time field, value once expired)
+TIMED_EFFECTS = {
+    "transformation": ("current_transformation", "transform_end_time", None),
+    "aura": ("aura_blessing_active", "aura_blessing_end_time", False),
+    "dracula": ("bencao_dracula_active", "bencao_dracula_end_time", False),
+}
+
+
+def schedule_timed_effects(user_id, player_data) -> None:
+    """Registers the sheet's active transformation and blessings with effect_expiry."""
+    for effect, (flag, end_field, _) in TIMED_EFFECTS.items():
+        if player_data.get(flag):
+            effect_expiry.schedule(
+                (str(user_id), effect), player_data.get(end_field, 0)
+            )
+
+
+async def expire_timed_effect(key):
+    user_id, effect = key
+    flag, end_field, expired_value = TIMED_EFFECTS[effect]
+    player_data = get_player_data(user_id)
+    if not player_data or not player_data.get(flag):
+        return  # Already ended, e.g. by /destransformar
+    transform_name = player_data[flag]
+    player_data[flag] = expired_value
+    player_data[end_field] = 0
+    mark_player_dirty(user_id)
+
+    if effect == "transformation":
+        message = f"🔄 Sua transformação de {transform_name} expirou!"
+    elif effect == "aura":
+        message = f"✨ A {ITEMS_DATA.get('bencao_rei_henrique', {}).get('name', 'Bênção da Aura')} em você expirou!"
+    else:
+        message = f"🦇 A {ITEMS_DATA.get('bencao_dracula', {}).get('name', 'Bênção de Drácula')} em você expirou!"
+    dm_queue.notify(user_id, message)
+
+
+# Fires each effect at its end time instead of scanning every sheet for it
+effect_expiry = ExpiryScheduler(expire_timed_effect)
+# Player DMs, sent in the background; see dm_queue.py
+dm_queue = DMQueue(lambda user_id: bot.get_user(user_id), DM_MESSAGES_PER_SECOND)
+# Game roles in GUILD_ID, corrected only for players whose level or status changed
+role_reconciler = RoleReconciler(
+    LEVEL_ROLES if isinstance(LEVEL_ROLES, dict) else {},
+    (
+        NEW_CHARACTER_ROLE_ID
+        if isinstance(NEW_CHARACTER_ROLE_ID, int) and NEW_CHARACTER_ROLE_ID > 0
+        else None
+    ),
+    ROLE_SYNC_EDITS_PER_SECOND,
+)
 
 
-def save_data():
-    """Saves player data to the JSON file."""
+def track_player_roles(user_id, player_data) -> None:
+    """Call after a player's level or status changes."""
+    role_reconciler.track(
+        user_id, player_data.get("level", 1), player_data.get("status")
+    )
+
+
+def load_guild_settings() -> dict:
+    """Per-server preferences, keyed by guild ID (str)."""
     try:
-        with open(PLAYER_DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(player_database, f, indent=4)
+        return load_json(os.path.join(SCRIPT_DIR, GUILD_SETTINGS_FILE), {})
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"ERRO ao carregar configurações dos servidores: {e}")
+        return {}
+
+
+async def save_guild_settings():
+    snapshot = {gid: dict(settings) for gid, settings in guild_settings.items()}
+    try:
+        await asyncio.to_thread(
+            write_json_atomic, os.path.join(SCRIPT_DIR, GUILD_SETTINGS_FILE), snapshot
+        )
     except IOError as e:
-        print(f"ERRO CRÍTICO AO SALVAR DADOS: {e}")
+        print(f"ERRO ao salvar configurações dos servidores: {e}")
 
 
-def get_player_data(user_id):
-    """Retrieves raw player data from the database, initializing if necessary."""
-    user_id_str = str(user_id)
-    if user_id_str not in player_database:
-        # Initialize default player data if not found (e.g., for /perfil on a new user)
-        # This prevents KeyError if a command tries to access a non-existent player
-        return None  # Or a default structure if you want to handle it differently
+guild_settings = load_guild_settings()
 
-    # Ensure 'location' is set for existing players without it
-    if "location" not in player_database[user_id_str]:
-        player_database[user_id_str]["location"] = STARTING_LOCATION
-        save_data()  # Save immediately after correcting old data
 
-    return player_database.get(user_id_str)
+def instant_combat_enabled(i: Interaction, requested: bool | None) -> bool:
+    """The player's choice if given, else the server's default combat mode."""
+    if requested is not None:
+        return requested
+    settings = guild_settings.get(str(i.guild_id), {})
+    return settings.get("instant_combat", INSTANT_COMBAT_DEFAULT)
 
 
-# --- FUNÇÕES AUXILIARES GLOBAIS ---
-def calculate_effective_stats(raw_player_data: dict) -> dict:
-    """Calculates a player's effective stats based on their base stats, transformation, and inventory items.
-    Does NOT modify the original raw_player_data.
-    """
-    effective_data = raw_player_data.copy()
+def player_count() -> int:
+    """Number of players with a sheet, including ones not loaded in lazy mode."""
+    return player_database.count() if lazy_loading else len(player_database)
 
-    # Default values for bonuses/multipliers
-    effective_data["attack_bonus_passive_percent"] = 0.0
-    effective_data["healing_multiplier"] = 1.0
-    effective_data["evasion_chance_bonus"] = 0.0  # Initialize evasion bonus
 
-    # Apply passive bonuses from "Habilidade Inata" source of power
-    habilidade_inata_info = ITEMS_DATA.get("habilidade_inata", {})
-    if effective_data.get("style") == "Habilidade Inata":
-        effective_data["attack_bonus_passive_percent"] = habilidade_inata_info.get(
-            "attack_bonus_passive_percent", 0.0
-        )
+def save_data():
+    """Saves every player sheet to the configured store, blocking the caller.
 
-    # Initialize current attack/special_attack/max_hp with base values
-    effective_data["attack"] = raw_player_data["base_attack"]
-    effective_data["special_attack"] = raw_player_data["base_special_attack"]
-    effective_data["max_hp"] = raw_player_data["max_hp"]  # Start with raw max_hp
+    Only for when the event loop is gone (e.g. after Ctrl+C); inside the bot use
+    save_data_async().
+    """
+    try:
+        player_store.save(player_database)
+        dirty_player_ids.clear()
+    except (IOError, sqlite3.Error) as e:
+        print(f"ERRO CRÍTICO AO SALVAR DADOS: {e}")
 
-    # Apply class transformations
-    if effective_data.get("current_transformation"):
-        transform_name = effective_data["current_transformation"]
-        class_name = effective_data["class"]
-        transform_info = CLASS_TRANSFORMATIONS.get(class_name, {}).get(transform_name)
-        if transform_info:
-            effective_data["attack"] = int(
-                effective_data["attack"] * transform_info.get("attack_multiplier", 1.0)
-            )
-            effective_data["special_attack"] = int(
-                effective_data["special_attack"]
-                * transform_info.get("special_attack_multiplier", 1.0)
-            )
-            effective_data["max_hp"] = int(
-                effective_data["max_hp"] * transform_info.get("hp_multiplier", 1.0)
-            )
-            effective_data["healing_multiplier"] *= transform_info.get(
-                "healing_multiplier", 1.0
+
+def request_save(user_ids=None, compact: bool = False) -> asyncio.Task:
+    """Queues a background save of `user_ids` (or everyone if None).
+
+    Returns the task performing the write; requests made while a write is in
+    flight are merged into a single follow-up write. `compact` only matters for
+    the journal backend, where it also rewrites the snapshot and truncates the log.
+    """
+    global _save_task, _queued_save, _queued_compaction
+    _queued_compaction = _queued_compaction or compact
+    if user_ids is None or _queued_save is _FULL_SAVE:
+        _queued_save = _FULL_SAVE
+    else:
+        _queued_save = (_queued_save or set()).union(user_ids)
+
+    if _save_task is None or _save_task.done():
+        _save_task = asyncio.create_task(_save_worker())
+    return _save_task
+
+
+async def _save_worker():
+    global _queued_save, _queued_compaction
+    loop = asyncio.get_running_loop()
+    while _queued_save is not None:
+        queued, _queued_save = _queued_save, None
+        user_ids = None if queued is _FULL_SAVE else list(queued)
+        # Put back on failure, so a failed write doesn't lose what was unsaved
+        pending = set(dirty_player_ids) if user_ids is None else set(user_ids)
+        if user_ids is None:
+            dirty_player_ids.clear()  # A full snapshot covers them
+
+        # Snapshot on the loop (cheap copies), encode + fsync + rename in a thread.
+        if _queued_compaction and isinstance(player_store, JournalPlayerStore):
+            _queued_compaction = False
+            snapshot = player_store.snapshot(player_database, user_ids, compact=True)
+        else:
+            snapshot = player_store.snapshot(player_database, user_ids)
+        try:
+            encoded = await loop.run_in_executor(
+                None, player_store.write_snapshot, snapshot
             )
+            player_store.adopt(player_database, encoded)
+            if lazy_loading:
+                player_database.release_saved()
+        except (IOError, sqlite3.Error) as e:
+            print(f"ERRO CRÍTICO AO SALVAR DADOS: {e}")
+            dirty_player_ids.update(pending)  # Tenta de novo no próximo flush
 
-            if "evasion_chance_bonus" in transform_info:
-                effective_data["evasion_chance_bonus"] += transform_info[
-                    "evasion_chance_bonus"
-                ]
 
-    # Apply Aura-specific blessing (King Henry's Blessing) if active
-    king_henry_blessing_info = ITEMS_DATA.get("bencao_rei_henrique", {})
-    if effective_data.get("aura_blessing_active"):
-        effective_data["attack"] = int(
-            effective_data["attack"]
-            * king_henry_blessing_info.get("attack_multiplier", 1.0)
-        )
-        effective_data["special_attack"] = int(
-            effective_data["special_attack"]
-            * king_henry_blessing_info.get("special_attack_multiplier", 1.0)
-        )
-        effective_data["max_hp"] = int(
-            effective_data["max_hp"]
-            * king_henry_blessing_info.get("max_hp_multiplier", 1.0)
-        )
-        effective_data["healing_multiplier"] *= king_henry_blessing_info.get(
-            "healing_multiplier", 1.0
-        )
+async def save_data_async(user_ids=None, compact: bool = False):
+    """Saves `user_ids` (or everyone) without blocking the event loop."""
+    await asyncio.shield(request_save(user_ids, compact))
 
-    # Apply item bonuses based on inventory (after transformations for proper stacking)
-    inventory = effective_data.get("inventory", {})
 
-    # Manopla do Lutador: Increases attack and HP
-    manopla_lutador_info = ITEMS_DATA.get("manopla_lutador", {})
-    if inventory.get("manopla_lutador", 0) > 0 and effective_data["class"] == "Lutador":
-        effective_data["attack"] = int(
-            effective_data["attack"]
-            * (1 + manopla_lutador_info.get("attack_bonus_percent", 0.0))
-        )
-        effective_data["max_hp"] = int(
-            effective_data["max_hp"] + manopla_lutador_info.get("hp_bonus_flat", 0)
-        )
+def mark_player_dirty(*user_ids):
+    """Flags player sheets as changed; they are written by the next coalesced flush."""
+    for user_id in user_ids:
+        dirty_player_ids.add(str(user_id))
+        if lazy_loading:
+            player_database.keep_until_saved(str(user_id))
+    _schedule_flush()
 
-    # Espada Fantasma: Attack bonus and HP penalty
-    espada_fantasma_info = ITEMS_DATA.get("espada_fantasma", {})
-    if (
-        inventory.get("espada_fantasma", 0) > 0
-        and effective_data["class"] == "Espadachim"
-    ):
-        effective_data["attack"] = int(
-            effective_data["attack"]
-            * (1 + espada_fantasma_info.get("attack_bonus_percent", 0.0))
-        )
-        # Apply penalty to the calculated max_hp based on previous buffs
-        effective_data["max_hp"] = int(
-            effective_data["max_hp"]
-            * (1 - espada_fantasma_info.get("hp_penalty_percent", 0.0))
-        )
-        effective_data["hp"] = min(
-            effective_data["hp"], effective_data["max_hp"]
-        )  # Adjust current HP
 
-    # Cajado do Curandeiro: Increases healing effectiveness
-    cajado_curandeiro_info = ITEMS_DATA.get("cajado_curandeiro", {})
-    if (
-        inventory.get("cajado_curandeiro", 0) > 0
-        and effective_data["class"] == "Curandeiro"
-    ):
-        effective_data["healing_multiplier"] *= cajado_curandeiro_info.get(
-            "effect_multiplier", 1.0
-        )
+def _schedule_flush():
+    global _pending_flush
+    if _pending_flush is not None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Sem event loop (inicialização/desligamento): o próximo save completo grava.
+    _pending_flush = loop.call_later(SAVE_COALESCE_SECONDS, flush_dirty_players)
+
+
+def flush_dirty_players():
+    """Queues a background write of the sheets flagged by mark_player_dirty().
+
+    Returns the in-flight save task (or None) so callers that need the store to
+    be up to date can await it.
+    """
+    global _pending_flush
+    if _pending_flush is not None:
+        _pending_flush.cancel()
+        _pending_flush = None
+    if not dirty_player_ids:
+        return _save_task
+
+    changed_ids = list(dirty_player_ids)
+    dirty_player_ids.clear()
+    return request_save(changed_ids)
 
-    # Mira Semi-Automática (Handles cooldown reduction, not direct stats)
-    # The effect for Mira Semi-Automática is handled directly in the cooldown calculation where needed.
 
-    # Apply passive attack bonus from "Habilidade Inata" (final layer)
-    effective_data["attack"] = int(
-        effective_data["attack"]
-        * (1 + effective_data.get("attack_bonus_passive_percent", 0.0))
+def get_player_data(user_id):
+    """Retrieves a player's sheet, or None if they have not created one."""
+    # Sheets are migrated at load, so no fix-ups are needed here. In lazy mode
+    # this loads the sheet from the store on first access.
+    return player_database.get(str(user_id))
+
+
+async def get_ranking_ids(limit: int) -> list:
+    """Top player IDs by kills, then level, then money."""
+    if isinstance(player_store, SqlitePlayerStore):
+        # The index must see the latest in-memory changes
+        if save_task := flush_dirty_players():
+            await asyncio.shield(save_task)
+        return player_store.top_player_ids(limit)
+    return heapq.nlargest(
+        limit,
+        player_database,
+        key=lambda uid: (
+            player_database[uid].get("kills", 0),
+            player_database[uid].get("level", 1),
+            player_database[uid].get("money", 0),
+        ),
     )
 
-    # Ensure HP doesn't exceed new max_hp after all calculations
-    effective_data["hp"] = min(raw_player_data["hp"], effective_data["max_hp"])
 
-    return effective_data
+# --- FUNÇÕES AUXILIARES GLOBAIS ---
+def set_player_status(user_id, player_data: dict, status: str) -> None:
+    """Sets "online" / "afk" / "dead", keeping the bosses' online participants in step."""
+    player_data["status"] = status
+    boss_manager.status_changed(user_id, status)
+    track_player_roles(user_id, player_data)
 
 
 # Helper function to process level-ups (NOW A METHOD OF OutlawsBot)
 # Moved inside the class `OutlawsBot` to allow `self.bot` context
+def level_up_once(player_data: dict) -> bool:
+    """Applies one level-up if the player has the XP for it. No messages, no awaits."""
+    xp_needed = int(XP_PER_LEVEL_BASE * (player_data.get("level", 1) ** 1.2))
+    if player_data["xp"] < xp_needed:
+        return False
+    player_data["level"] += 1
+    player_data["xp"] -= xp_needed
+    player_data["attribute_points"] = (
+        player_data.get("attribute_points", 0) + ATTRIBUTE_POINTS_PER_LEVEL
+    )
+    player_data["max_hp"] += MAX_HP_PER_LEVEL
+    player_data["hp"] = player_data["max_hp"]  # Restore HP on level up
+    return True
+
+
+def apply_level_ups(player_data: dict) -> int:
+    """Applies every level-up the player's XP allows. Returns how many."""
+    levels = 0
+    while level_up_once(player_data):
+        levels += 1
+    return levels
+
+
+async def update_level_role(guild: discord.Guild, member_id: int, level: int):
+    """Gives the member the LEVEL_ROLES role for `level` (and the new-character
+    role) and removes the other level roles, in a single member edit.
+
+    Once the edit went through the role reconciler is told, so it does not queue
+    a second edit; if it failed, the member is left to the reconciler to retry.
+    Returns the level role if it was newly added, else None.
+    """
+    player_data = get_player_data(member_id)
+    status = player_data.get("status") if player_data else None
+
+    def retry_later():
+        role_reconciler.track(member_id, level, status)
+        role_reconciler.mark(member_id)
+
+    member_obj = guild.get_member(member_id)
+    if not member_obj:
+        print(
+            f"Aviso: Membro {member_id} não encontrado na guilda para atualizar cargos."
+        )
+        retry_later()
+        return None
+
+    target_role_id = role_reconciler.level_role(level)  # Bisect over LEVEL_ROLES
+    if target_role_id and not guild.get_role(target_role_id):
+        print(
+            f"Aviso: Cargo com ID {target_role_id} não encontrado na guilda {guild.name}."
+        )
+    # Level-ups update roles even while AFK
+    wanted = role_reconciler.wanted_roles(level, "online")
+    new_roles = role_reconciler.target_roles(guild, member_obj, wanted)
+    if new_roles is None:
+        role_reconciler.synced(member_id, level, status)  # Already as wanted
+        return None
+    added = next(
+        (
+            role
+            for role in new_roles
+            if role.id == target_role_id and role not in member_obj.roles
+        ),
+        None,
+    )
+
+    try:
+        await member_obj.edit(roles=new_roles, reason=f"Reached Level {level}")
+    except discord.Forbidden:
+        print(
+            f"Erro: Bot sem permissão para atualizar os cargos de nível de {member_obj.display_name}. Verifique as permissões do bot e a hierarquia de cargos."
+        )
+        retry_later()
+        return None
+    except discord.HTTPException as e:
+        print(f"Erro ao atualizar cargos de nível de {member_obj.display_name}: {e}")
+        retry_later()
+        return None
+    role_reconciler.synced(member_id, level, status)
+    return added
+
+
 async def check_and_process_levelup_internal(
     bot_instance,  # Added this to pass the bot instance
     member: discord.Member,
     player_data: dict,
     send_target: Interaction | discord.TextChannel,
 ):
-    level = player_data.get("level", 1)
-    xp_needed = int(XP_PER_LEVEL_BASE * (level**1.2))
+    # Reach the final level first, then update roles and announce it once
+    start_level = player_data["level"]
+    levels_gained = apply_level_ups(player_data)
+    if not levels_gained:
+        return
 
-    while player_data["xp"] >= xp_needed:
-        player_data["level"] += 1
-        player_data["xp"] -= xp_needed
-        player_data["attribute_points"] = (
-            player_data.get("attribute_points", 0) + ATTRIBUTE_POINTS_PER_LEVEL
+    level_text = f"**Nível {player_data['level']}**"
+    if levels_gained > 1:
+        level_text += (
+            f" (Nível {start_level} → {player_data['level']}, +{levels_gained} níveis)"
         )
-        player_data["max_hp"] += 10
-        player_data["hp"] = player_data["max_hp"]  # Restore HP on level up
+    embed = Embed(
+        title="🌟 LEVEL UP! 🌟",
+        description=f"Parabéns, {member.mention}! Você alcançou o {level_text}!",
+        color=Color.gold(),
+    )
+    embed.set_thumbnail(
+        url="https://media.tenor.com/drx1lO9cfEAAAAi/dark-souls-bonfire.gif"
+    )
+    embed.add_field(
+        name="Recompensas",
+        value=f"🔹 **{ATTRIBUTE_POINTS_PER_LEVEL * levels_gained}** Pontos de Atributo\n🔹 Vida totalmente restaurada!",
+        inline=False,
+    )
+    embed.set_footer(text="Use /distribuir_pontos para ficar mais forte!")
 
-        embed = Embed(
-            title="🌟 LEVEL UP! 🌟",
-            description=f"Parabéns, {member.mention}! Você alcançou o **Nível {player_data['level']}**!",
-            color=Color.gold(),
-        )
-        embed.set_thumbnail(
-            url="https://media.tenor.com/drx1lO9cfEAAAAi/dark-souls-bonfire.gif"
+    # --- Cargo de nível: one direct edit here, or the reconciler if that can't run ---
+    guild = None
+    if isinstance(LEVEL_ROLES, dict):
+        guild_id_from_context = (
+            send_target.guild_id
+            if isinstance(send_target, Interaction)
+            else send_target.guild.id
         )
-        embed.add_field(
-            name="Recompensas",
-            value=f"🔹 **{ATTRIBUTE_POINTS_PER_LEVEL}** Pontos de Atributo\n🔹 Vida totalmente restaurada!",
-            inline=False,
-        )
-        embed.set_footer(text="Use /distribuir_pontos para ficar mais forte!")
-
-        # --- Lógica para conceder cargos a cada 10 níveis ---
-        if isinstance(LEVEL_ROLES, dict):
-            sorted_level_roles_keys = sorted(LEVEL_ROLES.keys(), reverse=True)
-
-            current_role_to_assign = None
-            for required_level in sorted_level_roles_keys:
-                if player_data["level"] >= required_level:
-                    current_role_to_assign = LEVEL_ROLES[required_level]
-                    break
-
-            guild_id_from_context = (
-                send_target.guild_id
-                if isinstance(send_target, Interaction)
-                else send_target.guild.id
-            )
-            guild = bot_instance.get_guild(guild_id_from_context)  # Use bot_instance
-
-            if guild:
-                member_obj = guild.get_member(member.id)
-                if member_obj:
-                    roles_to_remove = []
-                    for level_key, role_id in LEVEL_ROLES.items():
-                        role_to_remove = guild.get_role(role_id)
-                        if role_to_remove and role_to_remove in member_obj.roles:
-                            roles_to_remove.append(role_to_remove)
-
-                    if roles_to_remove:
-                        try:
-                            await member_obj.remove_roles(
-                                *roles_to_remove,
-                                reason="Level up - updating level roles",
-                            )
-                        except discord.Forbidden:
-                            print(
-                                f"Erro: Bot sem permissão para remover cargos de nível para {member.display_name}."
-                            )
-                        except discord.HTTPException as e:
-                            print(
-                                f"Erro ao remover cargos de nível para {member.display_name}: {e}"
-                            )
+        guild = bot_instance.get_guild(guild_id_from_context)  # Use bot_instance
 
-                    if current_role_to_assign:
-                        role = guild.get_role(current_role_to_assign)
-                        if role and role not in member_obj.roles:
-                            try:
-                                await member_obj.add_roles(
-                                    role,
-                                    reason=f"Reached Level {player_data['level']}",
-                                )
-                                embed.add_field(
-                                    name="🎉 Novo Cargo Desbloqueado!",
-                                    value=f"Você recebeu o cargo `{role.name}`!",
-                                    inline=False,
-                                )
-                            except discord.Forbidden:
-                                print(
-                                    f"Erro: Bot não tem permissão para adicionar o cargo {role.name} ao usuário {member.display_name}. Verifique as permissões do bot e a hierarquia de cargos."
-                                )
-                            except discord.HTTPException as e:
-                                print(
-                                    f"Erro ao adicionar cargo para {member.display_name}: {e}"
-                                )
-                        elif not role:
-                            print(
-                                f"Aviso: Cargo com ID {current_role_to_assign} não encontrado na guilda {guild.name}."
-                            )
-                else:
-                    print(
-                        f"Aviso: Membro {member.display_name} não encontrado na guilda para atualizar cargos."
-                    )
-            else:
-                print(
-                    f"Aviso: Guilda com ID {guild_id_from_context} não encontrada para conceder cargo de nível."
+        if guild:
+            role = await update_level_role(guild, member.id, player_data["level"])
+            if role:
+                embed.add_field(
+                    name="🎉 Novo Cargo Desbloqueado!",
+                    value=f"Você recebeu o cargo `{role.name}`!",
+                    inline=False,
                 )
-        # --- FIM da Lógica para conceder cargos a cada 10 níveis ---
+        else:
+            print(
+                f"Aviso: Guilda com ID {guild_id_from_context} não encontrada para conceder cargo de nível."
+            )
+    if not guild:
+        track_player_roles(member.id, player_data)
 
-        if isinstance(send_target, Interaction):
+    if isinstance(send_target, Interaction):
+        try:
+            if send_target.response.is_done():
+                await send_target.followup.send(embed=embed)
+            else:
+                await send_target.response.send_message(embed=embed)  # Initial response
+        except discord.InteractionResponded:
+            await send_target.channel.send(
+                embed=embed
+            )  # Fallback if already responded and followup failed
+        except Exception as e:
+            print(f"Erro ao enviar embed de level up na interação: {e}")
+    else:
+        await send_target.send(embed=embed)
+
+
+class EmbedEditCoalescer:
+    """Edits one message at most once per `interval` seconds, always with the latest embed.
+
+    submit() never waits for Discord: frames that arrive while an edit is pending
+    replace each other, so a fast animation cannot exceed the edit rate limits.
+    finish() drops whatever is pending and shows the final embed immediately.
+    """
+
+    def __init__(self, edit, interval: float = BATTLE_EDIT_INTERVAL):
+        self._edit = edit  # e.g. interaction.edit_original_response
+        self.interval = interval
+        self._pending = None
+        self._last_edit = float("-inf")
+        self._task = None
+        self._editing = False
+
+    def submit(self, embed: Embed):
+        self._pending = embed.copy()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending is not None:
+            delay = self._last_edit + self.interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            embed, self._pending = self._pending, None
+            self._last_edit = loop.time()
+            self._editing = True
             try:
-                if send_target.response.is_done():
-                    await send_target.followup.send(embed=embed)
-                else:
-                    await send_target.response.send_message(
-                        embed=embed
-                    )  # Initial response
-            except discord.InteractionResponded:
-                await send_target.channel.send(
-                    embed=embed
-                )  # Fallback if already responded and followup failed
-            except Exception as e:
-                print(f"Erro ao enviar embed de level up na interação: {e}")
+                await self._edit(embed=embed)
+            except discord.HTTPException as e:
+                print(f"Erro ao atualizar a mensagem da batalha: {e}")
+            finally:
+                self._editing = False
+
+    async def finish(self, embed: Embed):
+        self._pending = None
+        if self._task is not None and not self._task.done():
+            if self._editing:
+                await self._task  # Let the edit in flight land before the final one
+            else:
+                self._task.cancel()
+        await self._edit(embed=embed)
+
+
+# run_turn_based_combat (remains global, bot instance passed explicitly)
+def summarize_combat(outcome, enemy: dict) -> str:
+    """Condensed log of a whole fight, for instant mode."""
+    dealt = taken = crits = healed = evaded = 0
+    for event in outcome.events:
+        healed += event.lifesteal
+        if event.actor == "player":
+            dealt += event.damage
+            crits += event.crit
+        elif event.evaded:
+            evaded += 1
         else:
-            await send_target.send(embed=embed)
+            taken += event.damage
+
+    turns = outcome.events[-1].turn if outcome.events else 0
+    lines = [
+        f"⚔️ **{turns} turno(s)** contra {enemy['name']}.",
+        f"➡️ Você causou `{dealt}` de dano"
+        + (f" ({crits} crítico(s) 💥)." if crits else "."),
+        f"⬅️ Você sofreu `{taken}` de dano.",
+    ]
+    if outcome.events and outcome.events[0].energy_fallback:
+        lines.append(
+            "⚠️ Energia insuficiente para Ataque Especial. Usando Ataque Básico."
+        )
+    elif outcome.events and outcome.events[0].special:
+        lines.append("✨ Você abriu a luta com um Ataque Especial.")
+    if healed:
+        lines.append(f"🩸 Você sugou `{healed}` HP no total.")
+    if evaded:
+        lines.append(f"👻 Você desviou de {evaded} ataque(s).")
+    if outcome.amulet_used:
+        lines.append("✨ **Amuleto de Pedra ativado!** Você sobreviveu por um triz!")
+    lines.append(
+        f"❤️ HP final: {outcome.player_hp} | Inimigo: {max(0, outcome.enemy_hp)}"
+    )
+    return "\n".join(lines)
 
-        xp_needed = int(XP_PER_LEVEL_BASE * (player_data["level"] ** 1.2))
 
+async def animate_combat(
+    interaction: Interaction, raw_player_data: dict, enemy: dict, outcome
+) -> EmbedEditCoalescer:
+    """Replays a fight turn by turn on the interaction's message.
 
-# run_turn_based_combat (remains global, bot instance passed explicitly)
-async def run_turn_based_combat(
-    bot_instance: commands.Bot,  # Explicitly pass the bot instance
-    interaction: Interaction,
-    raw_player_data: dict,
-    enemy: dict,
-    initial_attack_style: str = "basico",
-):
+    Returns the coalescer so the caller can send the result with finish().
+    """
     log = []
     player_hp = raw_player_data["hp"]
     enemy_hp = enemy["hp"]
-    amulet_activated_this_combat = False
 
     player_stats = calculate_effective_stats(raw_player_data)
 
@@ -372,352 +668,298 @@ async def run_turn_based_combat(
     embed.set_thumbnail(url=enemy.get("thumb"))
     embed.add_field(
         name=interaction.user.display_name,
-        value=f"❤️ {player_hp}/{player_stats['max_hp']}",
+        value=f"❤️ {player_hp}/{player_stats.max_hp}",
         inline=True,
     )
     embed.add_field(
         name=enemy["name"], value=f"❤️ {enemy_hp}/{enemy['hp']}", inline=True
     )
 
-    if not interaction.response.is_done():
-        await interaction.response.defer()
-
-    battle_message = await interaction.edit_original_response(embed=embed)
-
-    turn = 1
-    while player_hp > 0 and enemy_hp > 0:
-        await asyncio.sleep(2.5)
-
-        player_dmg = 0
-        attack_type_name = ""
-        crit_msg = ""
-
-        # Calculate energy cost for special attack with reductions
-        cost_energy_special = TRANSFORM_COST
+    # Animation frames go through the coalescer so a long fight cannot hit the
+    # message edit rate limit; only the final result is sent immediately.
+    edits = EmbedEditCoalescer(interaction.edit_original_response)
+    edits.submit(embed)
 
-        # Aura Blessing reduction
-        if raw_player_data.get("aura_blessing_active"):
-            blessing_info = ITEMS_DATA.get("bencao_rei_henrique", {})
-            cost_energy_special = max(
-                1,
-                int(
-                    cost_energy_special
-                    * (1 - blessing_info.get("cooldown_reduction_percent", 0.0))
-                ),
-            )
-
-        # Transformation reduction
-        if raw_player_data.get("current_transformation"):
-            transform_name = raw_player_data["current_transformation"]
-            class_name = raw_player_data["class"]
-            transform_info = CLASS_TRANSFORMATIONS.get(class_name, {}).get(
-                transform_name
-            )
-            if transform_info and "cooldown_reduction_percent" in transform_info:
-                cost_energy_special = max(
-                    1,
-                    int(
-                        cost_energy_special
-                        * (1 - transform_info["cooldown_reduction_percent"])
-                    ),
-                )
-
-        # Mira Semi-Automática reduction
-        mira_semi_automatica_info = ITEMS_DATA.get("mira_semi_automatica", {})
-        if (
-            raw_player_data["inventory"].get("mira_semi_automatica", 0) > 0
-            and raw_player_data["class"] == "Atirador"
-        ):
-            cost_energy_special = max(
-                1,
-                int(
-                    cost_energy_special
-                    * (
-                        1
-                        - mira_semi_automatica_info.get(
-                            "cooldown_reduction_percent", 0.0
-                        )
-                    )
-                ),
-            )
-
-        if turn == 1:
-            if initial_attack_style == "basico":
-                player_dmg = random.randint(
-                    player_stats["attack"] // 2, player_stats["attack"]
-                )
-                attack_type_name = "Ataque Básico"
-                if raw_player_data["class"] == "Vampiro":
-                    heal_from_vampire_basic = int(player_dmg * 0.5)
-                    raw_player_data["hp"] = min(
-                        raw_player_data["max_hp"],
-                        raw_player_data["hp"] + heal_from_vampire_basic,
-                    )
-                    log.append(
-                        f"🩸 Você sugou `{heal_from_vampire_basic}` HP do inimigo!"
-                    )
-            elif initial_attack_style == "especial":
-                if raw_player_data["energy"] < cost_energy_special:
-                    # This should ideally be caught before starting combat, but as a fallback
-                    player_dmg = random.randint(
-                        player_stats["attack"] // 2, player_stats["attack"]
-                    )
-                    attack_type_name = (
-                        "Ataque Básico (Energia Insuficiente para Especial)"
-                    )
-                    log.append(
-                        "⚠️ Energia insuficiente para Ataque Especial. Usando Ataque Básico."
-                    )
-                else:
-                    player_dmg = random.randint(
-                        int(player_stats["special_attack"] * 0.8),
-                        int(player_stats["special_attack"] * 1.5),
-                    )
-                    attack_type_name = "Ataque Especial"
-                    raw_player_data["energy"] = max(
-                        0, raw_player_data["energy"] - cost_energy_special
-                    )
-
-                    if raw_player_data["class"] == "Vampiro":
-                        heal_from_vampire_special = int(player_dmg * 0.75)
-                        raw_player_data["hp"] = min(
-                            raw_player_data["max_hp"],
-                            raw_player_data["hp"] + heal_from_vampire_special,
-                        )
-                        log.append(
-                            f"🧛 Você sugou `{heal_from_vampire_special}` HP do inimigo com seu ataque especial!"
-                        )
-        else:  # Subsequent turns always use basic attack
-            player_dmg = random.randint(
-                player_stats["attack"] // 2, player_stats["attack"]
-            )
-            attack_type_name = "Ataque Básico"
-            if raw_player_data["class"] == "Vampiro":
-                heal_from_vampire_basic = int(player_dmg * 0.5)
-                raw_player_data["hp"] = min(
-                    raw_player_data["max_hp"],
-                    raw_player_data["hp"] + heal_from_vampire_basic,
-                )
-                log.append(f"🩸 Você sugou `{heal_from_vampire_basic}` HP do inimigo!")
-
-        if random.random() < CRITICAL_CHANCE:
-            player_dmg = int(player_dmg * CRITICAL_MULTIPLIER)
-            crit_msg = "💥 **CRÍTICO!** "
-
-        enemy_hp -= player_dmg
-        log.append(
-            f"➡️ **Turno {turn}**: {crit_msg}Você usou **{attack_type_name}** e causou `{player_dmg}` de dano."
-        )
-        if len(log) > 5:
-            log.pop(0)
-
-        player_hp = raw_player_data["hp"]
-
-        embed.description = "\n".join(log)
+    def set_player_field():
         embed.set_field_at(
             0,
             name=interaction.user.display_name,
-            value=f"❤️ {max(0, player_hp)}/{player_stats['max_hp']}",
+            value=f"❤️ {max(0, player_hp)}/{player_stats.max_hp}",
             inline=True,
         )
-        embed.set_field_at(
-            1,
-            name=enemy["name"],
-            value=f"❤️ {max(0, enemy_hp)}/{enemy['hp']}",
-            inline=True,
-        )
-        await interaction.edit_original_response(embed=embed)
 
-        if enemy_hp <= 0:
-            break
+    for event in outcome.events:
+        await asyncio.sleep(BATTLE_TURN_DELAY)
+        player_hp = event.player_hp
 
-        await asyncio.sleep(2.5)
-
-        enemy_dmg = random.randint(enemy["attack"] // 2, enemy["attack"])
+        if event.actor == "player":
+            enemy_hp = event.enemy_hp
+            if event.energy_fallback:
+                attack_type_name = "Ataque Básico (Energia Insuficiente para Especial)"
+                log.append(
+                    "⚠️ Energia insuficiente para Ataque Especial. Usando Ataque Básico."
+                )
+            elif event.special:
+                attack_type_name = "Ataque Especial"
+            else:
+                attack_type_name = "Ataque Básico"
+            if event.lifesteal and event.special:
+                log.append(
+                    f"🧛 Você sugou `{event.lifesteal}` HP do inimigo com seu ataque especial!"
+                )
+            elif event.lifesteal:
+                log.append(f"🩸 Você sugou `{event.lifesteal}` HP do inimigo!")
 
-        # Calculate Dracula evasion chance considering transformation bonus
-        dracula_evasion_chance = ITEMS_DATA.get("bencao_dracula", {}).get(
-            "evasion_chance", 0.0
-        )
-        if raw_player_data.get("current_transformation") == "Rei da Noite":
-            vampire_blessed_transform_info = CLASS_TRANSFORMATIONS.get(
-                "Vampiro", {}
-            ).get("Rei da Noite", {})
-            dracula_evasion_chance += vampire_blessed_transform_info.get(
-                "evasion_chance_bonus", 0.0
+            crit_msg = "💥 **CRÍTICO!** " if event.crit else ""
+            log.append(
+                f"➡️ **Turno {event.turn}**: {crit_msg}Você usou **{attack_type_name}** e causou `{event.damage}` de dano."
             )
+            if len(log) > 5:
+                log.pop(0)
 
-        if (
-            raw_player_data["class"] == "Vampiro"
-            and raw_player_data.get("bencao_dracula_active", False)
-            and random.random() < dracula_evasion_chance
-        ):
-            hp_steal_percent_on_evade = ITEMS_DATA.get("bencao_dracula", {}).get(
-                "hp_steal_percent_on_evade", 0.0
-            )
-            hp_stolen_on_evade = int(enemy_dmg * hp_steal_percent_on_evade)
-            raw_player_data["hp"] = min(
-                raw_player_data["max_hp"], raw_player_data["hp"] + hp_stolen_on_evade
+            embed.description = "\n".join(log)
+            set_player_field()
+            embed.set_field_at(
+                1,
+                name=enemy["name"],
+                value=f"❤️ {max(0, enemy_hp)}/{enemy['hp']}",
+                inline=True,
             )
+            edits.submit(embed)
+            continue
 
+        if event.evaded:
             log.append(
-                f"👻 **DESVIADO!** {enemy['name']} errou o ataque! Você sugou `{hp_stolen_on_evade}` HP!)"
+                f"👻 **DESVIADO!** {enemy['name']} errou o ataque! Você sugou `{event.lifesteal}` HP!)"
             )
             if len(log) > 5:
                 log.pop(0)
-            player_hp = raw_player_data["hp"]
             embed.description = "\n".join(log)
-            embed.set_field_at(
-                0,
-                name=interaction.user.display_name,
-                value=f"❤️ {max(0, player_hp)}/{player_stats['max_hp']}",
-                inline=True,
-            )
-            await interaction.edit_original_response(embed=embed)
+            set_player_field()
+            edits.submit(embed)
             await asyncio.sleep(1.5)
             continue
 
-        player_hp -= enemy_dmg
-        raw_player_data["hp"] = player_hp
-
-        # Amulet of Stone activation
-        amulet_info = ITEMS_DATA.get("amuleto_de_pedra", {})
-        if (
-            player_hp <= 0
-            and raw_player_data["inventory"].get("amuleto_de_pedra", 0) > 0
-            and not amulet_activated_this_combat
-            and not raw_player_data.get("amulet_used_since_revive", False)
-        ):
-            player_hp = 1
-            raw_player_data["hp"] = 1
-            amulet_activated_this_combat = True
-            raw_player_data["amulet_used_since_revive"] = True
+        if event.amulet:
             log.append("✨ **Amuleto de Pedra ativado!** Você sobreviveu por um triz!")
             if len(log) > 5:
                 log.pop(0)
             embed.description = "\n".join(log)
-            embed.set_field_at(
-                0,
-                name=interaction.user.display_name,
-                value=f"❤️ {max(0, player_hp)}/{player_stats['max_hp']}",
-                inline=True,
-            )
-            await interaction.edit_original_response(embed=embed)
+            set_player_field()
+            edits.submit(embed)
             await asyncio.sleep(1.5)
 
-        log.append(f"⬅️ {enemy['name']} ataca e causa `{enemy_dmg}` de dano.")
+        log.append(f"⬅️ {enemy['name']} ataca e causa `{event.damage}` de dano.")
         if len(log) > 5:
             log.pop(0)
 
         embed.description = "\n".join(log)
-        embed.set_field_at(
-            0,
-            name=interaction.user.display_name,
-            value=f"❤️ {max(0, player_hp)}/{player_stats['max_hp']}",
-            inline=True,
-        )
-        await interaction.edit_original_response(embed=embed)
+        set_player_field()
+        edits.submit(embed)
 
-        turn += 1
+    return edits
 
-    final_embed = Embed()
-    raw_player_data["hp"] = max(0, player_hp)
 
-    if player_hp <= 0:
-        final_embed.title = "☠️ Você Foi Derrotado!"
-        final_embed.color = Color.dark_red()
-        raw_player_data["status"] = "dead"
-        raw_player_data["deaths"] += 1
-        final_embed.description = f"O {enemy['name']} foi muito forte para você."
-    else:
-        final_embed.title = "🏆 Vitória! 🏆"
-        final_embed.color = Color.green()
-        final_embed.description = f"Você derrotou o {enemy['name']}!"
+async def run_turn_based_combat(
+    bot_instance: commands.Bot,  # Explicitly pass the bot instance
+    interaction: Interaction,
+    raw_player_data: dict,
+    enemy: dict,
+    initial_attack_style: str = "basico",
+    instant: bool = False,
+):
+    # The fight is decided up front by the combat engine; this only shows it.
+    start_hp, start_energy = raw_player_data["hp"], settle_energy(raw_player_data)
+    outcome = simulate_combat(
+        Fighter.from_player(raw_player_data),
+        enemy,
+        initial_attack_style,
+        combat_rng,
+        record_events=True,
+    )
 
-        xp_gain_raw = enemy["xp"]
+    if not interaction.response.is_done():
+        await interaction.response.defer()
 
-        # Apply passive XP bonus from Habilidade Inata first
-        xp_multiplier_passive = ITEMS_DATA.get("habilidade_inata", {}).get(
-            "xp_multiplier_passive", 0.0
-        )
-        if raw_player_data.get("style") == "Habilidade Inata":
-            xp_gain_raw = int(xp_gain_raw * (1 + xp_multiplier_passive))
+    # Instant mode skips the animation: the result embed is the only edit.
+    edits = (
+        None
+        if instant
+        else await animate_combat(interaction, raw_player_data, enemy, outcome)
+    )
 
-        if raw_player_data.get("xptriple") is True:
-            xp_gain = xp_gain_raw * 3
-            xp_message = f"✨ +{xp_gain} XP (triplicado!)"
+    async with player_locks.acquire(interaction.user.id):
+        # The animation took a while: heals, boss hits or purchases may have changed
+        # the sheet meanwhile, so the fight's result is applied as deltas.
+        txn = PlayerTransaction()
+        txn.add(raw_player_data, "energy", outcome.energy - start_energy, minimum=0)
+        if outcome.amulet_used:
+            txn.set(raw_player_data, "amulet_used_since_revive", True)
+
+        final_embed = Embed()
+        if edits is None:
+            final_embed.add_field(
+                name="📜 Resumo da Batalha",
+                value=summarize_combat(outcome, enemy),
+                inline=False,
+            )
+
+        if not outcome.won:
+            final_embed.title = "☠️ Você Foi Derrotado!"
+            final_embed.color = Color.dark_red()
+            txn.set(raw_player_data, "hp", 0)
+            txn.set(raw_player_data, "status", "dead")
+            txn.add(raw_player_data, "deaths", 1)
+            final_embed.description = f"O {enemy['name']} foi muito forte para você."
         else:
-            xp_gain = xp_gain_raw
-            xp_message = f"✨ +{xp_gain} XP"
+            final_embed.title = "🏆 Vitória! 🏆"
+            final_embed.color = Color.green()
+            final_embed.description = f"Você derrotou o {enemy['name']}!"
+            # Killed elsewhere during the animation (e.g. a boss hit): stays at 0 HP,
+            # lifesteal can't bring a dead player back
+            if raw_player_data["status"] != "dead":
+                txn.add(
+                    raw_player_data,
+                    "hp",
+                    outcome.player_hp - start_hp,
+                    minimum=0,
+                    maximum=raw_player_data["max_hp"],
+                )
 
-        # Refine XP message if Habilidade Inata is active but not trippled
-        if (
-            raw_player_data.get("style") == "Habilidade Inata"
-            and xp_multiplier_passive > 0
-            and not raw_player_data.get("xptriple")
-        ):
-            xp_message += f" (Habilidade Inata: +{int(xp_multiplier_passive*100)}%!)"
-        elif (
-            raw_player_data.get("style") == "Habilidade Inata"
-            and xp_multiplier_passive > 0
-            and raw_player_data.get("xptriple")
-        ):
-            xp_message = f"✨ +{xp_gain} XP (triplicado + Habilidade Inata: +{int(xp_multiplier_passive*100)}%!)"
+            xp_gain_raw = enemy["xp"]
 
-        money_gain_raw = enemy["money"]
-        if raw_player_data.get("money_double") is True:
-            money_gain = money_gain_raw * 2
-            money_message = f"💰 +${money_gain} (duplicado!)"
-        else:
-            money_gain = money_gain_raw
-            money_message = f"💰 +${money_gain}"
+            # Apply passive XP bonus from Habilidade Inata first
+            xp_multiplier_passive = ITEMS_DATA.get("habilidade_inata", {}).get(
+                "xp_multiplier_passive", 0.0
+            )
+            if raw_player_data.get("style") == "Habilidade Inata":
+                xp_gain_raw = int(xp_gain_raw * (1 + xp_multiplier_passive))
 
-        final_embed.add_field(
-            name="Recompensas", value=f"{money_message}\n{xp_message}"
-        )
+            if raw_player_data.get("xptriple") is True:
+                xp_gain = xp_gain_raw * 3
+                xp_message = f"✨ +{xp_gain} XP (triplicado!)"
+            else:
+                xp_gain = xp_gain_raw
+                xp_message = f"✨ +{xp_gain} XP"
 
-        raw_player_data["money"] += money_gain
-        raw_player_data["xp"] += xp_gain
+            # Refine XP message if Habilidade Inata is active but not trippled
+            if (
+                raw_player_data.get("style") == "Habilidade Inata"
+                and xp_multiplier_passive > 0
+                and not raw_player_data.get("xptriple")
+            ):
+                xp_message += (
+                    f" (Habilidade Inata: +{int(xp_multiplier_passive*100)}%!)"
+                )
+            elif (
+                raw_player_data.get("style") == "Habilidade Inata"
+                and xp_multiplier_passive > 0
+                and raw_player_data.get("xptriple")
+            ):
+                xp_message = f"✨ +{xp_gain} XP (triplicado + Habilidade Inata: +{int(xp_multiplier_passive*100)}%!)"
 
-        if enemy["name"] == BOSS_DATA["name"]:
-            for item, quantity in BOSS_DATA.get("drops", {}).items():
-                item_info_drop = ITEMS_DATA.get(item)
-                if not item_info_drop:  # Skip if item not defined in ITEMS_DATA
-                    print(
-                        f"Warning: Item '{item}' from BOSS_DATA drops is not defined in ITEMS_DATA."
-                    )
-                    continue
+            money_gain_raw = enemy["money"]
+            if raw_player_data.get("money_double") is True:
+                money_gain = money_gain_raw * 2
+                money_message = f"💰 +${money_gain} (duplicado!)"
+            else:
+                money_gain = money_gain_raw
+                money_message = f"💰 +${money_gain}"
 
-                if item == "amuleto_de_pedra":
-                    if raw_player_data["inventory"].get("amuleto_de_pedra", 0) == 0:
-                        raw_player_data["inventory"]["amuleto_de_pedra"] = 1
-                        final_embed.add_field(
-                            name="Item Encontrado!",
-                            value=f"Você encontrou **{item_info_drop['name']}**!",
-                            inline=False,
+            final_embed.add_field(
+                name="Recompensas", value=f"{money_message}\n{xp_message}"
+            )
+
+            txn.add(raw_player_data, "money", money_gain)
+            txn.add(raw_player_data, "xp", xp_gain)
+
+            if enemy["name"] == BOSS_DATA["name"]:
+                for item, quantity in BOSS_DATA.get("drops", {}).items():
+                    item_info_drop = ITEMS_DATA.get(item)
+                    if not item_info_drop:  # Skip if item not defined in ITEMS_DATA
+                        print(
+                            f"Warning: Item '{item}' from BOSS_DATA drops is not defined in ITEMS_DATA."
                         )
+                        continue
+
+                    if item == "amuleto_de_pedra":
+                        if raw_player_data["inventory"].get("amuleto_de_pedra", 0) == 0:
+                            txn.set(raw_player_data["inventory"], "amuleto_de_pedra", 1)
+                            final_embed.add_field(
+                                name="Item Encontrado!",
+                                value=f"Você encontrou **{item_info_drop['name']}**!",
+                                inline=False,
+                            )
+                        else:
+                            final_embed.add_field(
+                                name="Amuleto de Pedra (Já Possuído)",
+                                value=f"Você já possui o **{item_info_drop['name']}**. Não é possível obter mais de um.",
+                                inline=False,
+                            )
                     else:
+                        txn.add(raw_player_data["inventory"], item, quantity)
                         final_embed.add_field(
-                            name="Amuleto de Pedra (Já Possuído)",
-                            value=f"Você já possui o **{item_info_drop['name']}**. Não é possível obter mais de um.",
+                            name="Item Encontrado!",
+                            value=f"Você encontrou **{item_info_drop['name']}**!",
                             inline=False,
                         )
-                else:
-                    raw_player_data["inventory"][item] = (
-                        raw_player_data["inventory"].get(item, 0) + quantity
-                    )
-                    final_embed.add_field(
-                        name="Item Encontrado!",
-                        value=f"Você encontrou **{item_info_drop['name']}**!",
-                        inline=False,
-                    )
 
+        settle_energy(raw_player_data)  # The energy delta applies to the current value
+        txn.commit()
+        if not outcome.won:
+            boss_manager.status_changed(interaction.user.id, "dead")
+        mark_player_dirty(interaction.user.id)
+
+    if outcome.won:
+        # Takes the player's lock itself
         await bot_instance.check_and_process_levelup(
             interaction.user, raw_player_data, interaction
         )
 
-    save_data()
-    await interaction.edit_original_response(embed=final_embed)
+    if edits is None:
+        await interaction.edit_original_response(embed=final_embed)
+    else:
+        await edits.finish(final_embed)
+
+
+async def run_governed_combat(i: Interaction, player_data: dict, enemy: dict, **kwargs):
+    """Runs a PvE fight through battle_governor (one per player, global cap).
+
+    Refusals are answered at once; a queued fight shows its place in line.
+    """
+    refusal = battle_governor.admit(i.user.id)
+    if refusal == BUSY:
+        await i.response.send_message(
+            "⚔️ Você já tem uma batalha em andamento! Espere ela terminar.",
+            ephemeral=True,
+        )
+        return
+    if refusal:
+        await i.response.send_message(
+            "🚦 Muitas batalhas acontecendo agora. Tente novamente em alguns segundos.",
+            ephemeral=True,
+        )
+        return
+
+    queued = battle_governor.must_wait()
+    try:
+        if queued:
+            await i.response.send_message(
+                f"⏳ Sua batalha está na fila ({battle_governor.queue_position()}º)..."
+            )
+        else:
+            await i.response.defer()
+    except BaseException:
+        battle_governor.release(i.user.id)
+        raise
+
+    async with battle_governor.session(i.user.id):
+        if queued:
+            if player_data["status"] == "dead":  # Killed while waiting
+                await i.edit_original_response(content="Mortos não batalham.")
+                return
+            await i.edit_original_response(content=None)
+        await run_turn_based_combat(bot, i, player_data, enemy, **kwargs)
 
 
 # --- SETUP DO BOT ---
@@ -730,11 +972,18 @@ class OutlawsBot(commands.Bot):
 
     async def setup_hook(self):
         self.auto_save.start()
-        self.energy_regeneration.start()
-        self.boss_attack_loop.start()
+        if isinstance(player_store, JournalPlayerStore):
+            self.journal_compaction.start()
+        # Sheets loaded later (lazy mode) are registered by _prepare_loaded_player
+        for user_id, player_data in player_database.items():
+            schedule_timed_effects(user_id, player_data)
+        self._expiry_task = asyncio.create_task(effect_expiry.run())
+        self._dm_task = asyncio.create_task(dm_queue.run())
+        if BOSS_HIT_TICK_SECONDS > 0:
+            self.boss_hit_tick.start()
         await self.tree.sync()
         print("Comandos sincronizados!")
-        self.sync_roles_periodically.start()
+        self._role_sync_task = asyncio.create_task(self.reconcile_roles())
         self.tree.on_error = self.on_app_command_error
 
     async def on_app_command_error(
@@ -786,11 +1035,11 @@ class OutlawsBot(commands.Bot):
 
     async def on_ready(self):
         print(f"Bot {self.user} está online!")
-        print(f"Dados de {len(player_database)} jogadores carregados.")
+        print(f"Dados de {player_count()} jogadores carregados.")
 
     async def close(self):
         print("Desligando e salvando dados...")
-        save_data()
+        await save_data_async(compact=True)
         await super().close()
 
     # Helper function to process level-ups (NOW A METHOD OF OutlawsBot)
@@ -800,155 +1049,136 @@ class OutlawsBot(commands.Bot):
         player_data: dict,
         send_target: Interaction | discord.TextChannel,
     ):
-        # Call the internal function, passing self (the bot instance)
-        await check_and_process_levelup_internal(self, member, player_data, send_target)
+        # The level-up loop awaits between changes to the sheet; hold its lock
+        async with player_locks.acquire(member.id):
+            # Call the internal function, passing self (the bot instance)
+            await check_and_process_levelup_internal(
+                self, member, player_data, send_target
+            )
+        mark_player_dirty(member.id)
 
     # --- TAREFAS EM BACKGROUND (agora métodos da classe) ---
     @tasks.loop(seconds=60)
     async def auto_save(self):
-        save_data()
+        # Safety net: dirty sheets are normally written by the coalesced flush
+        # a few seconds after each command; this catches anything left behind.
+        await save_data_async()
         print("Dados salvos automaticamente.")  # Added for confirmation
 
-    @tasks.loop(seconds=60)
-    async def energy_regeneration(self):
-        for user_id_str, player_data in player_database.items():
-            user_id = int(user_id_str)  # Convert back to int for get_user
-            if player_data.get("energy", 0) < MAX_ENERGY:
-                player_data["energy"] += 1
-
-            now = datetime.now().timestamp()
-
-            # Check for Aura Blessing expiration
-            if player_data.get("aura_blessing_active"):
-                if now > player_data.get("aura_blessing_end_time", 0):
-                    player_data["aura_blessing_active"] = False
-                    player_data["aura_blessing_end_time"] = 0
-                    user = self.get_user(user_id)
-                    if user:
-                        try:
-                            await user.send(
-                                f"✨ A {ITEMS_DATA.get('bencao_rei_henrique', {}).get('name', 'Bênção da Aura')} em você expirou!"
-                            )
-                        except discord.Forbidden:
-                            pass  # Cannot send DMs
-                    # save_data() # Will be saved by auto_save or next loop iteration
-
-            # Check for Dracula Blessing expiration
-            if player_data.get("bencao_dracula_active"):
-                if now > player_data.get("bencao_dracula_end_time", 0):
-                    player_data["bencao_dracula_active"] = False
-                    player_data["bencao_dracula_end_time"] = 0
-                    user = self.get_user(user_id)
-                    if user:
-                        try:
-                            await user.send(
-                                f"🦇 A {ITEMS_DATA.get('bencao_dracula', {}).get('name', 'Bênção de Drácula')} em você expirou!"
-                            )
-                        except discord.Forbidden:
-                            pass
-                    # save_data() # Will be saved by auto_save or next loop iteration
-
-            # Check for Transformation expiration
-            if player_data.get("current_transformation"):
-                if now > player_data.get("transform_end_time", 0):
-                    transform_name = player_data["current_transformation"]
-                    player_data["current_transformation"] = None
-                    player_data["transform_end_time"] = 0
-                    user = self.get_user(user_id)
-                    if user:
-                        try:
-                            await user.send(
-                                f"🔄 Sua transformação de {transform_name} expirou!"
-                            )
-                        except discord.Forbidden:
-                            pass
-                    # save_data() # Will be saved by auto_save or next loop iteration
-        save_data()  # Save all changes once per loop for efficiency
-
-    @tasks.loop(seconds=15)
-    async def boss_attack_loop(self):
-        if not BOSS_DATA["is_active"] or not BOSS_DATA["channel_id"]:
-            return
-        channel = self.get_channel(BOSS_DATA["channel_id"])
+    @tasks.loop(minutes=JOURNAL_COMPACT_MINUTES)
+    async def journal_compaction(self):
+        # Journal mode only: rewrite outlaws_data.json and empty the change log
+        await save_data_async(compact=True)
+
+    @tasks.loop(seconds=max(1, BOSS_HIT_TICK_SECONDS))
+    async def boss_hit_tick(self):
+        ticking = [boss for boss in boss_manager if boss.pending_hits]
+        if ticking:
+            results = await asyncio.gather(
+                *(self.apply_boss_hits(boss) for boss in ticking),
+                return_exceptions=True,
+            )
+            # One boss failing must not stop the loop (and strand everyone's hits)
+            for boss, result in zip(ticking, results):
+                if isinstance(result, Exception):
+                    print(f"Erro no tick do boss no canal {boss.channel_id}: {result}")
+
+    async def apply_boss_hits(self, boss: BossInstance):
+        """Applies a boss's queued /atacar_boss hits and posts one update for them."""
+        batch = boss.apply_pending()
+        mark_player_dirty(*batch.damage)  # Their cooldowns: one save per tick
+        defeated = boss.defeated and boss_manager.remove(boss)
+        channel = self.get_channel(boss.channel_id)
         if not channel:
-            BOSS_DATA["is_active"] = False
-            BOSS_DATA["channel_id"] = None
-            save_data()  # Save boss data changes
+            boss_manager.remove(boss)
+            if defeated:  # Nowhere to announce it, but the kill is still paid
+                await pay_out_boss(boss, None)
             return
 
-        participants_online = [
-            p_id
-            for p_id in BOSS_DATA["participants"]
-            if (p_data := get_player_data(p_id)) and p_data.get("status") == "online"
+        top_hitters = sorted(batch.damage.items(), key=lambda kv: kv[1], reverse=True)
+        lines = [
+            f"**{(get_player_data(uid) or {}).get('name', uid)}**: `{damage}`"
+            for uid, damage in top_hitters[:5]
         ]
-        if not participants_online:
+        if len(top_hitters) > 5:
+            lines.append(f"... e mais {len(top_hitters) - 5} jogador(es)")
+        crits = f" ({batch.crits} crítico(s) 💥)" if batch.crits else ""
+        embed = Embed(
+            title=f"⚔️ Ataque ao {boss.name}",
+            description=f"**{batch.hits}** golpe(s) causaram `{batch.total}` de dano{crits}!\n"
+            + "\n".join(lines),
+            color=Color.orange(),
+        )
+        embed.add_field(name="Vida do Boss", value=f"`{max(0, boss.hp)}/{boss.max_hp}`")
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            print(f"Erro ao anunciar o tick do boss no canal {boss.channel_id}: {e}")
+
+        # The raid is already removed: pay out even if the announcement failed
+        if defeated:
+            await pay_out_boss(boss, channel)
+
+    async def boss_attack(self, boss: BossInstance):
+        channel = self.get_channel(boss.channel_id)
+        if not channel:
+            boss_manager.remove(boss)
             return
 
         targets_to_attack_ids = random.sample(
-            participants_online, k=min(3, len(participants_online))
+            list(boss.online), k=min(boss.targets_per_attack, len(boss.online))
         )
         target_names = []
-        for target_id in targets_to_attack_ids:
-            raw_target_data = get_player_data(target_id)
-            if not raw_target_data:
-                continue
-
-            damage_to_deal = random.randint(
-                BOSS_DATA["attack"] // 2, BOSS_DATA["attack"]
-            )
+        # Wait for sheets whose fight result or level-up is still being applied
+        async with player_locks.acquire(*targets_to_attack_ids):
+            for target_id in targets_to_attack_ids:
+                raw_target_data = get_player_data(target_id)
+                if not raw_target_data:
+                    continue
 
-            # Calculate total evasion chance
-            dracula_evasion_chance = ITEMS_DATA.get("bencao_dracula", {}).get(
-                "evasion_chance", 0.0
-            )
-            if raw_target_data.get("current_transformation") == "Rei da Noite":
-                vampire_blessed_transform_info = CLASS_TRANSFORMATIONS.get(
-                    "Vampiro", {}
-                ).get("Rei da Noite", {})
-                dracula_evasion_chance += vampire_blessed_transform_info.get(
-                    "evasion_chance_bonus", 0.0
-                )
+                damage_to_deal = random.randint(boss.attack // 2, boss.attack)
 
-            if (
-                raw_target_data["class"] == "Vampiro"
-                and raw_target_data.get("bencao_dracula_active", False)
-                and random.random() < dracula_evasion_chance
-            ):
-                hp_steal_percent_on_evade = ITEMS_DATA.get("bencao_dracula", {}).get(
-                    "hp_steal_percent_on_evade", 0.0
-                )
-                hp_stolen_on_evade = int(damage_to_deal * hp_steal_percent_on_evade)
-                raw_target_data["hp"] = min(
-                    raw_target_data["max_hp"],
-                    raw_target_data["hp"] + hp_stolen_on_evade,
-                )
+                # Dracula evasion (chance includes the Rei da Noite bonus)
+                modifiers = player_modifiers(raw_target_data)
+                if (
+                    modifiers.dracula_evasion_chance
+                    and random.random() < modifiers.dracula_evasion_chance
+                ):
+                    hp_stolen_on_evade = int(
+                        damage_to_deal * modifiers.dracula_hp_steal_percent
+                    )
+                    raw_target_data["hp"] = min(
+                        raw_target_data["max_hp"],
+                        raw_target_data["hp"] + hp_stolen_on_evade,
+                    )
 
-                target_names.append(
-                    f"**{raw_target_data['name']}** (👻 DESVIOU! Sugou `{hp_stolen_on_evade}` HP!)"
-                )
-            else:
-                raw_target_data["hp"] -= damage_to_deal
-                target_names.append(
-                    f"**{raw_target_data['name']}** (`{damage_to_deal}` dano)"
-                )
+                    target_names.append(
+                        f"**{raw_target_data['name']}** (👻 DESVIOU! Sugou `{hp_stolen_on_evade}` HP!)"
+                    )
+                else:
+                    raw_target_data["hp"] -= damage_to_deal
+                    target_names.append(
+                        f"**{raw_target_data['name']}** (`{damage_to_deal}` dano)"
+                    )
 
-            if raw_target_data["hp"] <= 0:
-                raw_target_data["hp"] = 0
-                raw_target_data["status"] = "dead"
-                raw_target_data["deaths"] += 1
+                if raw_target_data["hp"] <= 0:
+                    raw_target_data["hp"] = 0
+                    set_player_status(target_id, raw_target_data, "dead")
+                    raw_target_data["deaths"] += 1
 
         if target_names:
             attack_embed = Embed(
-                title=f"👹 Fúria do {BOSS_DATA['name']}",
+                title=f"👹 Fúria do {boss.name}",
                 description=f"O colosso ataca ferozmente! {', '.join(target_names)} foram atingidos!",
                 color=Color.dark_orange(),
             )
             await channel.send(embed=attack_embed)
-            save_data()  # Save after boss attack updates
+            mark_player_dirty(*targets_to_attack_ids)  # Save after boss attack updates
 
-    # --- NOVA TAREFA: Sincronização de Cargos (MOVIDA PARA DENTRO DA CLASSE OutlawsBot) ---
-    @tasks.loop(minutes=5)
-    async def sync_roles_periodically(self):
+    # --- Sincronização de Cargos ---
+    async def reconcile_roles(self):
+        """Checks every loaded sheet's roles once, then only players marked since."""
+        await self.wait_until_ready()
         if GUILD_ID == 0:
             print(
                 "AVISO: GUILD_ID não está configurado. A sincronização de cargos não funcionará."
@@ -962,8 +1192,6 @@ class OutlawsBot(commands.Bot):
             )
             return
 
-        print(f"Iniciando sincronização de cargos na guilda {guild.name}...")
-
         if not guild.chunked:
             try:
                 await guild.chunk()
@@ -972,101 +1200,19 @@ class OutlawsBot(commands.Bot):
                 print(f"Erro ao carregar membros da guilda {guild.name}: {e}")
                 return
 
-        total_synced = 0
+        # In lazy mode this only visits sheets currently in memory; the rest
+        # are tracked as they load
         for member_id_str, player_data in player_database.items():
-            member_id = int(member_id_str)
-            member = guild.get_member(member_id)
-
-            if not member:
-                continue
-
-            if player_data.get("status") == "afk":
-                continue
-
-            # 1. Handle NEW_CHARACTER_ROLE_ID
-            if isinstance(NEW_CHARACTER_ROLE_ID, int) and NEW_CHARACTER_ROLE_ID > 0:
-                new_char_role = guild.get_role(NEW_CHARACTER_ROLE_ID)
-                if new_char_role:
-                    if new_char_role not in member.roles:
-                        try:
-                            await member.add_roles(
-                                new_char_role, reason="Sincronização de cargo inicial."
-                            )
-                            total_synced += 1
-                        except discord.Forbidden:
-                            print(
-                                f"PERMISSÃO NEGADA: Não foi possível adicionar '{new_char_role.name}' a {member.display_name}."
-                            )
-                        except discord.HTTPException as e:
-                            print(
-                                f"ERRO HTTP ao adicionar '{new_char_role.name}' a {member.display_name}: {e}"
-                            )
-
-            # 2. Handle LEVEL_ROLES
-            if isinstance(LEVEL_ROLES, dict):
-                current_level = player_data.get("level", 1)
-                highest_applicable_role_id = None
-
-                for required_level in sorted(LEVEL_ROLES.keys(), reverse=True):
-                    if current_level >= required_level:
-                        highest_applicable_role_id = LEVEL_ROLES[required_level]
-                        break
-
-                all_level_role_ids = list(LEVEL_ROLES.values())
-
-                roles_to_remove = []
-                roles_to_add = []
-
-                for existing_role in member.roles:
-                    if (
-                        existing_role.id in all_level_role_ids
-                        and existing_role.id != highest_applicable_role_id
-                    ):
-                        roles_to_remove.append(existing_role)
-
-                if highest_applicable_role_id:
-                    role_to_add = guild.get_role(highest_applicable_role_id)
-                    if role_to_add and role_to_add not in member.roles:
-                        roles_to_add.append(role_to_add)
-
-                if roles_to_remove:
-                    try:
-                        await member.remove_roles(
-                            *roles_to_remove, reason="Sincronização de cargos de nível."
-                        )
-                        total_synced += len(roles_to_remove)
-                    except discord.Forbidden:
-                        print(
-                            f"PERMISSÃO NEGADA: Não foi possível remover cargos de {member.display_name}."
-                        )
-                    except discord.HTTPException as e:
-                        print(
-                            f"ERRO HTTP ao remover cargos de {member.display_name}: {e}"
-                        )
-
-                if roles_to_add:
-                    try:
-                        await member.add_roles(
-                            *roles_to_add, reason="Sincronização de cargos de nível."
-                        )
-                        total_synced += len(roles_to_add)
-                    except discord.Forbidden:
-                        print(
-                            f"PERMISSÃO NEGADA: Não foi possível adicionar '{roles_to_add[0].name}' a {member.display_name}."
-                        )
-                    except discord.HTTPException as e:
-                        print(
-                            f"ERRO HTTP ao adicionar '{roles_to_add[0].name}' a {member.display_name}: {e}"
-                        )
-
-        if total_synced > 0:
-            print(f"Sincronização de cargos concluída. Total de ações: {total_synced}.")
-        else:
-            print("Sincronização de cargos concluída. Nenhum cargo foi alterado.")
+            track_player_roles(member_id_str, player_data)
+        print(
+            f"Sincronização de cargos: {role_reconciler.pending()} jogador(es) a conferir."
+        )
+        await role_reconciler.run(guild)
 
-    @sync_roles_periodically.before_loop
-    async def before_sync_roles_periodically(self):
-        await self.wait_until_ready()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        # Someone else changed a member's roles: put game roles back if needed
+        if after.guild.id == GUILD_ID and before.roles != after.roles:
+            role_reconciler.roles_changed(after)
 
 
 # Instantiate the bot after the class and its methods are fully defined.
@@ -1157,52 +1303,43 @@ class ClassChooserView(ui.View):
         }
 
         # Apply class-specific base stat adjustments
-        if self.chosen_class == "Lutador":
-            base_stats["hp"] += 20
-            base_stats["attack"] += 5
-        elif self.chosen_class == "Espadachim":
-            base_stats["attack"] += 10
-            base_stats["special_attack"] -= 5
-        elif self.chosen_class == "Atirador":
-            base_stats["hp"] -= 10
-            base_stats["special_attack"] += 10
-        elif self.chosen_class == "Curandeiro":
-            base_stats["special_attack"] += 5
-        elif self.chosen_class == "Vampiro":
-            base_stats["hp"] += 30
-            base_stats["attack"] += 8
-            base_stats["special_attack"] += 15
-
-        player_database[user_id] = {
-            "name": i.user.display_name,
-            "class": self.chosen_class,
-            "style": self.chosen_style,
-            "xp": 0,
-            "level": 1,
-            "money": INITIAL_MONEY,
-            "hp": base_stats["hp"],
-            "max_hp": base_stats["hp"],
-            "base_attack": base_stats["attack"],
-            "base_special_attack": base_stats["special_attack"],
-            "inventory": {},
-            "cooldowns": {},
-            "status": "online",
-            "bounty": 0,
-            "kills": 0,
-            "deaths": 0,
-            "energy": MAX_ENERGY,
-            "current_transformation": None,
-            "transform_end_time": 0,
-            "aura_blessing_active": False,
-            "aura_blessing_end_time": 0,
-            "bencao_dracula_active": False,
-            "bencao_dracula_end_time": 0,
-            "amulet_used_since_revive": False,
-            "attribute_points": 0,
-            "location": STARTING_LOCATION,  # Ensure this is always set on creation
-            "xptriple": False,
-            "money_double": False,
-        }
+        for stat, bonus in CLASS_BASE_STAT_BONUSES.get(self.chosen_class, {}).items():
+            base_stats[stat] += bonus
+
+        player_database[user_id] = Player.from_dict(
+            {
+                "name": i.user.display_name,
+                "class": self.chosen_class,
+                "style": self.chosen_style,
+                "xp": 0,
+                "level": 1,
+                "money": INITIAL_MONEY,
+                "hp": base_stats["hp"],
+                "max_hp": base_stats["hp"],
+                "base_attack": base_stats["attack"],
+                "base_special_attack": base_stats["special_attack"],
+                "inventory": {},
+                "cooldowns": {},
+                "status": "online",
+                "bounty": 0,
+                "kills": 0,
+                "deaths": 0,
+                "energy": MAX_ENERGY,
+                "energy_updated_at": datetime.now().timestamp(),
+                "current_transformation": None,
+                "transform_end_time": 0,
+                "aura_blessing_active": False,
+                "aura_blessing_end_time": 0,
+                "bencao_dracula_active": False,
+                "bencao_dracula_end_time": 0,
+                "amulet_used_since_revive": False,
+                "attribute_points": 0,
+                "location": STARTING_LOCATION,  # Ensure this is always set on creation
+                "xptriple": False,
+                "money_double": False,
+                "schema_version": SCHEMA_VERSION,
+            }
+        )
 
         # --- NOVO: Concede cargo de personagem inicial ---
         guild = i.guild
@@ -1231,7 +1368,8 @@ class ClassChooserView(ui.View):
                 )
         # --- FIM NOVO: Concede cargo de personagem inicial ---
 
-        save_data()
+        mark_player_dirty(user_id)
+        track_player_roles(user_id, player_database[user_id])
         embed = Embed(
             title=f"Ficha de {i.user.display_name} Criada!",
             description=f"Bem-vindo ao mundo de OUTLAWS, **{self.chosen_class}** que usa **{self.chosen_style}**!",
@@ -1341,11 +1479,12 @@ class ProfileView(ui.View):
 
         # --- Barras de Progresso (AGORA CHAMANDO VIA CLASSE) ---
         hp_bar = ProfileView.create_progress_bar(
-            player_data["hp"], player_stats["max_hp"], length=15
-        )
-        energy_bar = ProfileView.create_progress_bar(
-            player_data["energy"], MAX_ENERGY, length=15
+            player_data["hp"], player_stats.max_hp, length=15
         )
+        energy = current_energy(player_data)
+        energy_bar = ProfileView.create_progress_bar(energy, MAX_ENERGY, length=15)
+        next_energy = seconds_to_next_energy(player_data)
+        next_energy = f" (+1 em {int(next_energy) + 1}s)" if next_energy else ""
         xp_needed = int(XP_PER_LEVEL_BASE * (player_data["level"] ** 1.2))
         xp_bar = ProfileView.create_xp_bar(player_data["xp"], xp_needed, length=15)
 
@@ -1366,12 +1505,12 @@ class ProfileView(ui.View):
         # --- Detailed Stats (all in one inline=False field for maximum responsiveness and readability) ---
         stats_value = (
             f"**__⚔️ Combate__**\n"
-            f"❤️ **Vida:** `{player_data['hp']}/{player_stats['max_hp']}` {hp_bar}\n"
-            f"🗡️ **Ataque:** `{player_stats['attack']}`\n"
-            f"✨ **Atq. Especial:** `{player_stats['special_attack']}`\n"
+            f"❤️ **Vida:** `{player_data['hp']}/{player_stats.max_hp}` {hp_bar}\n"
+            f"🗡️ **Ataque:** `{player_stats.attack}`\n"
+            f"✨ **Atq. Especial:** `{player_stats.special_attack}`\n"
             f"\n"
             f"**__⚙️ Recursos__**\n"
-            f"⚡ **Energia:** `{player_data['energy']}/{MAX_ENERGY}` {energy_bar}\n"
+            f"⚡ **Energia:** `{energy}/{MAX_ENERGY}` {energy_bar}{next_energy}\n"
             f"💰 **Dinheiro:** `${player_data['money']}`\n"
             f"🌟 **Pontos de Atributo:** `{player_data.get('attribute_points', 0)}`\n"
             f"\n"
@@ -1493,7 +1632,7 @@ class TravelButton(ui.Button):
             return
 
         player_data["location"] = self.destination_id  # Use the internal ID
-        save_data()
+        mark_player_dirty(self.view.user_id)
         await i.response.edit_message(
             embed=Embed(
                 title=f"✈️ Viagem Concluída",
@@ -1813,30 +1952,10 @@ class ShopView(ui.View):
                 player_data["inventory"].get(self.item_id, 0) + 1
             )
 
-            # --- Aplicação de bônus/penalidades de HP na compra ---
-            if self.item_id == "manopla_lutador" and player_data["class"] == "Lutador":
-                hp_gain_from_item = ITEMS_DATA["manopla_lutador"].get(
-                    "hp_bonus_flat", 0
-                )
-                player_data["max_hp"] += hp_gain_from_item
-                player_data["hp"] = min(
-                    player_data["hp"] + hp_gain_from_item, player_data["max_hp"]
-                )
-            elif (
-                self.item_id == "espada_fantasma"
-                and player_data["class"] == "Espadachim"
-            ):
-                hp_penalty_percent = ITEMS_DATA["espada_fantasma"].get(
-                    "hp_penalty_percent", 0.0
-                )
-                hp_penalty_from_item = int(player_data["max_hp"] * hp_penalty_percent)
-                player_data["max_hp"] = max(
-                    1, player_data["max_hp"] - hp_penalty_from_item
-                )
-                player_data["hp"] = min(player_data["hp"], player_data["max_hp"])
-            # --- FIM DA APLICAÇÃO DE BÔNUS/PENALIDADES DE HP ---
+            # Bônus/penalidades de HP do item de classe, aplicados na compra
+            apply_class_item_hp(player_data, self.item_id)
 
-            save_data()
+            mark_player_dirty(i.user.id)
             await i.response.send_message(
                 f"**{i.user.display_name}** comprou 1x {ITEMS_DATA[self.item_id]['name']}!"
             )
@@ -2168,9 +2287,9 @@ async def reviver(i: Interaction):
 
     player_data["money"] -= REVIVE_COST
     player_data["hp"] = player_data["max_hp"]
-    player_data["status"] = "online"
+    set_player_status(i.user.id, player_data, "online")
     player_data["amulet_used_since_revive"] = False
-    save_data()
+    mark_player_dirty(i.user.id)
     await i.response.send_message(
         embed=Embed(
             title="✨ De Volta à Vida",
@@ -2212,16 +2331,15 @@ async def distribuir_pontos(
         )
         return
     player_data["attribute_points"] -= quantidade
+    gain = quantidade * ATTRIBUTE_POINT_GAINS[atributo.value]
     if atributo.value == "attack":
-        player_data["base_attack"] += quantidade * 2
+        player_data["base_attack"] += gain
     elif atributo.value == "special_attack":
-        player_data["base_special_attack"] += quantidade * 3
+        player_data["base_special_attack"] += gain
     elif atributo.value == "hp":
-        player_data["max_hp"] += quantidade * 5
-        player_data["hp"] += (
-            quantidade * 5
-        )  # Also restore current HP when max HP increases
-    save_data()
+        player_data["max_hp"] += gain
+        player_data["hp"] += gain  # Also restore current HP when max HP increases
+    mark_player_dirty(i.user.id)
     await i.response.send_message(
         embed=Embed(
             title="📈 Atributos Aprimorados",
@@ -2235,7 +2353,7 @@ async def distribuir_pontos(
     name="ranking", description="Mostra o ranking de MVPs (Mais Abates) do servidor."
 )
 async def ranking(i: Interaction):
-    if not player_database:
+    if not player_count():
         await i.response.send_message(
             "Nenhum jogador no ranking ainda.", ephemeral=True
         )
@@ -2258,13 +2376,6 @@ async def ranking(i: Interaction):
         except Exception as e:
             print(f"Error fetching guild members for ranking: {e}")
 
-    # Sort based on 'kills', then 'level' if kills are tied, then 'money'
-    sorted_players = sorted(
-        player_database.values(),
-        key=lambda p: (p.get("kills", 0), p.get("level", 1), p.get("money", 0)),
-        reverse=True,
-    )
-
     embed = Embed(
         title="🏆 Ranking de MVPs - OUTLAWS 🏆",
         description="Os fora-da-lei mais temidos do servidor.",
@@ -2272,18 +2383,10 @@ async def ranking(i: Interaction):
     )
 
     rank_entries = []
-    # Using enumerate with a slice for the top 10 players
-    for idx, player_data in enumerate(sorted_players[:10]):
-        # Find the original user_id (string key) for the player_data dict
-        player_id_str = None
-        for uid_str, data_val in player_database.items():
-            if (
-                data_val == player_data
-            ):  # Compare by value, assumes player_data is unique
-                player_id_str = uid_str
-                break
-
-        if not player_id_str:  # Should not happen if data integrity is maintained
+    # Top 10 sorted by 'kills', then 'level' if kills are tied, then 'money'
+    for idx, player_id_str in enumerate(await get_ranking_ids(10)):
+        player_data = get_player_data(player_id_str)
+        if not player_data:  # Should not happen if data integrity is maintained
             continue
 
         player_id = int(player_id_str)
@@ -2429,7 +2532,7 @@ async def trabalhar(i: Interaction):
     embed.add_field(
         name="Recompensa", value=f"Você ganhou {money_message} {xp_message}."
     )
-    save_data()
+    mark_player_dirty(i.user.id)
     # Call level-up check using bot instance
     await bot.check_and_process_levelup(i.user, player_data, i)
     await i.response.send_message(embed=embed)
@@ -2533,7 +2636,7 @@ async def aprimorar(i: Interaction, atributo: app_commands.Choice[str]):
 
     player_data["money"] -= cost
     player_data[attr_key] += 2  # Increases the base stat by 2 per upgrade
-    save_data()
+    mark_player_dirty(i.user.id)
 
     # Calculate next cost for the message (current cost + 2 points * cost_per_point)
     next_cost = 100 + ((player_data[attr_key] - initial_base_value) * cost_per_point)
@@ -2551,9 +2654,12 @@ async def aprimorar(i: Interaction, atributo: app_commands.Choice[str]):
 @app_commands.check(check_player_exists)
 @app_commands.check(is_in_wilderness)
 @app_commands.checks.cooldown(
-    1, 15, key=lambda i: i.user.id
+    1, HUNT_COOLDOWN_SECONDS, key=lambda i: i.user.id
 )  # Add a cooldown for hunting
-async def cacar(i: Interaction):
+@app_commands.describe(
+    instantaneo="Resolver a luta de uma vez, sem animação. Padrão: o do servidor."
+)
+async def cacar(i: Interaction, instantaneo: bool = None):
     player_data = get_player_data(i.user.id)
     if player_data["status"] == "dead":
         await i.response.send_message("Mortos não caçam.", ephemeral=True)
@@ -2568,11 +2674,11 @@ async def cacar(i: Interaction):
         )
         return
 
-    await i.response.defer()
-
     enemy_template = random.choice(location_enemies)
     enemy = enemy_template.copy()
-    await run_turn_based_combat(bot, i, player_data, enemy)  # Pass bot instance
+    await run_governed_combat(
+        i, player_data, enemy, instant=instant_combat_enabled(i, instantaneo)
+    )
 
 
 @bot.tree.command(
@@ -2582,7 +2688,8 @@ async def cacar(i: Interaction):
 @app_commands.check(check_player_exists)
 @app_commands.checks.cooldown(1, 30, key=lambda i: i.user.id)
 @app_commands.describe(
-    primeiro_ataque="Escolha seu ataque inicial: Básico ou Especial."
+    primeiro_ataque="Escolha seu ataque inicial: Básico ou Especial.",
+    instantaneo="Resolver a luta de uma vez, sem animação. Padrão: o do servidor.",
 )
 @app_commands.choices(
     primeiro_ataque=[
@@ -2590,7 +2697,9 @@ async def cacar(i: Interaction):
         app_commands.Choice(name="Ataque Especial", value="especial"),
     ]
 )
-async def batalhar(i: Interaction, primeiro_ataque: app_commands.Choice[str]):
+async def batalhar(
+    i: Interaction, primeiro_ataque: app_commands.Choice[str], instantaneo: bool = None
+):
     player_data = get_player_data(i.user.id)
     if player_data["status"] == "dead":
         await i.response.send_message("Mortos não batalham.", ephemeral=True)
@@ -2598,62 +2707,18 @@ async def batalhar(i: Interaction, primeiro_ataque: app_commands.Choice[str]):
 
     # Pre-check energy for special attack
     if primeiro_ataque.value == "especial":
-        cost_energy_special = TRANSFORM_COST
-
         # Apply all relevant cooldown reductions
-        if player_data.get("aura_blessing_active"):
-            blessing_info = ITEMS_DATA.get("bencao_rei_henrique", {})
-            cost_energy_special = max(
-                1,
-                int(
-                    cost_energy_special
-                    * (1 - blessing_info.get("cooldown_reduction_percent", 0.0))
-                ),
-            )
-
-        if player_data.get("current_transformation"):
-            transform_name = player_data["current_transformation"]
-            class_name = player_data["class"]
-            transform_info = CLASS_TRANSFORMATIONS.get(class_name, {}).get(
-                transform_name
-            )
-            if transform_info and "cooldown_reduction_percent" in transform_info:
-                cost_energy_special = max(
-                    1,
-                    int(
-                        cost_energy_special
-                        * (1 - transform_info["cooldown_reduction_percent"])
-                    ),
-                )
-
-        # Mira Semi-Automática check
-        mira_semi_automatica_info = ITEMS_DATA.get("mira_semi_automatica", {})
-        if (
-            player_data["inventory"].get("mira_semi_automatica", 0) > 0
-            and player_data["class"] == "Atirador"
-        ):
-            cost_energy_special = max(
-                1,
-                int(
-                    cost_energy_special
-                    * (
-                        1
-                        - mira_semi_automatica_info.get(
-                            "cooldown_reduction_percent", 0.0
-                        )
-                    )
-                ),
-            )
+        cost_energy_special = player_modifiers(player_data).special_energy_cost(
+            TRANSFORM_COST
+        )
 
-        if player_data.get("energy", 0) < cost_energy_special:
+        if current_energy(player_data) < cost_energy_special:
             await i.response.send_message(
                 f"Você não tem energia suficiente ({cost_energy_special}) para um Ataque Especial inicial! Use Ataque Básico ou recupere energia.",
                 ephemeral=True,
             )
             return
 
-    await i.response.defer()
-
     enemy = {
         "name": "Ex-Cavaleiro Renegado",
         "hp": 320,
@@ -2662,7 +2727,9 @@ async def batalhar(i: Interaction, primeiro_ataque: app_commands.Choice[str]):
         "money": 400,
         "thumb": "https://c.tenor.com/ebFt6wJWEu8AAAAC/tenor.gif",
     }
-    await run_turn_based_combat(bot, i, player_data, enemy)  # Pass bot instance
+    await run_governed_combat(
+        i, player_data, enemy, instant=instant_combat_enabled(i, instantaneo)
+    )
 
 
 @bot.tree.command(name="atacar", description="Ataca outro jogador em um duelo.")
@@ -2686,190 +2753,338 @@ async def atacar(
         )
         return
 
-    raw_attacker_data = get_player_data(attacker_id)
-    raw_target_data = get_player_data(target_id)
+    # Both sheets change; wait for any level-up or fight result still being applied
+    async with player_locks.acquire(attacker_id, target_id):
+        raw_attacker_data = get_player_data(attacker_id)
+        raw_target_data = get_player_data(target_id)
 
-    if not raw_target_data:
-        await i.response.send_message("Este jogador não tem uma ficha!", ephemeral=True)
-        return
-    if raw_attacker_data["status"] == "dead" or raw_target_data["status"] == "dead":
-        await i.response.send_message("Um dos jogadores está morto.", ephemeral=True)
-        return
-
-    # Added check for AFK status before PVP
-    if raw_target_data.get("status") == "afk":
-        await i.response.send_message(
-            f"{alvo.display_name} está em modo AFK e não pode ser atacado.",
-            ephemeral=True,
-        )
-        return
+        if not raw_target_data:
+            await i.response.send_message(
+                "Este jogador não tem uma ficha!", ephemeral=True
+            )
+            return
+        if raw_attacker_data["status"] == "dead" or raw_target_data["status"] == "dead":
+            await i.response.send_message(
+                "Um dos jogadores está morto.", ephemeral=True
+            )
+            return
 
-    if raw_attacker_data.get("location") != raw_target_data.get("location"):
-        await i.response.send_message(
-            "Você precisa estar na mesma localização para atacar outro jogador!",
-            ephemeral=True,
-        )
-        return
+        # Added check for AFK status before PVP
+        if raw_target_data.get("status") == "afk":
+            await i.response.send_message(
+                f"{alvo.display_name} está em modo AFK e não pode ser atacado.",
+                ephemeral=True,
+            )
+            return
 
-    attacker_stats = calculate_effective_stats(raw_attacker_data)
-    target_stats = calculate_effective_stats(raw_target_data)
+        if raw_attacker_data.get("location") != raw_target_data.get("location"):
+            await i.response.send_message(
+                "Você precisa estar na mesma localização para atacar outro jogador!",
+                ephemeral=True,
+            )
+            return
 
-    now = datetime.now().timestamp()
-    cooldown_key = f"{estilo.value}_attack_cooldown"
-    cooldown_duration = 10 if estilo.value == "basico" else 30
+        attacker_stats = calculate_effective_stats(raw_attacker_data)
+        target_stats = calculate_effective_stats(raw_target_data)
 
-    # Apply cooldown reductions
-    if raw_attacker_data.get("aura_blessing_active"):
-        blessing_info = ITEMS_DATA.get("bencao_rei_henrique", {})
-        cooldown_duration = int(
-            cooldown_duration
-            * (1 - blessing_info.get("cooldown_reduction_percent", 0.0))
+        now = datetime.now().timestamp()
+        cooldown_key = f"{estilo.value}_attack_cooldown"
+        # Apply cooldown reductions (blessing, transformation, Mira Semi-Automática)
+        cooldown_duration = player_modifiers(raw_attacker_data).attack_cooldown(
+            10 if estilo.value == "basico" else 30
         )
 
-    if raw_attacker_data.get("current_transformation"):
-        transform_name = raw_attacker_data["current_transformation"]
-        class_name = raw_attacker_data["class"]
-        transform_info = CLASS_TRANSFORMATIONS.get(class_name, {}).get(transform_name)
-        if transform_info and "cooldown_reduction_percent" in transform_info:
-            cooldown_duration = int(
-                cooldown_duration * (1 - transform_info["cooldown_reduction_percent"])
+        if (
+            now - raw_attacker_data["cooldowns"].get(cooldown_key, 0)
+            < cooldown_duration
+        ):
+            await i.response.send_message(
+                f"Seu {estilo.name} está em cooldown! Tente novamente em **{cooldown_duration - (now - raw_attacker_data['cooldowns'].get(cooldown_key, 0)):.1f}s**.",
+                ephemeral=True,
             )
+            return
 
-    # Mira Semi-Automática reduction
-    mira_semi_automatica_info = ITEMS_DATA.get("mira_semi_automatica", {})
-    if (
-        raw_attacker_data["inventory"].get("mira_semi_automatica", 0) > 0
-        and raw_attacker_data["class"] == "Atirador"
-    ):
-        cooldown_duration = int(
-            cooldown_duration
-            * (1 - mira_semi_automatica_info.get("cooldown_reduction_percent", 0.0))
+        damage = (
+            random.randint(attacker_stats.attack // 2, int(attacker_stats.attack * 1.2))
+            if estilo.value == "basico"
+            else random.randint(
+                int(attacker_stats.special_attack * 0.8),
+                int(attacker_stats.special_attack * 1.5),
+            )
         )
+        crit_msg = ""
+        if random.random() < CRITICAL_CHANCE:
+            damage = int(damage * CRITICAL_MULTIPLIER)
+            crit_msg = "💥 **ACERTO CRÍTICO!** "
+
+        heal_info_msg = ""
+        if raw_attacker_data["class"] == "Vampiro":
+            if estilo.value == "basico":
+                heal_amount = int(damage * 0.5)
+                raw_attacker_data["hp"] = min(
+                    raw_attacker_data["max_hp"],
+                    raw_attacker_data["hp"] + heal_amount,
+                )
+                heal_info_msg = (
+                    f" (🩸 Você sugou `{heal_amount}` HP de {alvo.display_name}!)"
+                )
+            elif estilo.value == "especial":
+                heal_amount = int(damage * 0.75)
+                raw_attacker_data["hp"] = min(
+                    raw_attacker_data["max_hp"],
+                    raw_attacker_data["hp"] + heal_amount,
+                )
+                heal_info_msg = f" (🧛 Você sugou `{heal_amount}` HP de {alvo.display_name} com seu ataque especial!)"
 
-    if now - raw_attacker_data["cooldowns"].get(cooldown_key, 0) < cooldown_duration:
-        await i.response.send_message(
-            f"Seu {estilo.name} está em cooldown! Tente novamente em **{cooldown_duration - (now - raw_attacker_data['cooldowns'].get(cooldown_key, 0)):.1f}s**.",
-            ephemeral=True,
-        )
-        return
+        initial_target_hp = raw_target_data["hp"]
+        raw_target_data["hp"] -= damage
 
-    damage = (
-        random.randint(
-            attacker_stats["attack"] // 2, int(attacker_stats["attack"] * 1.2)
-        )
-        if estilo.value == "basico"
-        else random.randint(
-            int(attacker_stats["special_attack"] * 0.8),
-            int(attacker_stats["special_attack"] * 1.5),
-        )
-    )
-    crit_msg = ""
-    if random.random() < CRITICAL_CHANCE:
-        damage = int(damage * CRITICAL_MULTIPLIER)
-        crit_msg = "💥 **ACERTO CRÍTICO!** "
+        embed = Embed(color=Color.red())
 
-    heal_info_msg = ""
-    if raw_attacker_data["class"] == "Vampiro":
-        if estilo.value == "basico":
-            heal_amount = int(damage * 0.5)
-            raw_attacker_data["hp"] = min(
-                raw_attacker_data["max_hp"],
-                raw_attacker_data["hp"] + heal_amount,
-            )
-            heal_info_msg = (
-                f" (🩸 Você sugou `{heal_amount}` HP de {alvo.display_name}!)"
-            )
-        elif estilo.value == "especial":
-            heal_amount = int(damage * 0.75)
-            raw_attacker_data["hp"] = min(
-                raw_attacker_data["max_hp"],
-                raw_attacker_data["hp"] + heal_amount,
-            )
-            heal_info_msg = f" (🧛 Você sugou `{heal_amount}` HP de {alvo.display_name} com seu ataque especial!)"
+        # Dracula evasion chance for target (includes the Rei da Noite bonus)
+        target_modifiers = player_modifiers(raw_target_data)
+
+        # Check for target evasion or amulet
+        if raw_target_data["hp"] <= 0:
+            if (
+                target_modifiers.dracula_evasion_chance
+                and random.random() < target_modifiers.dracula_evasion_chance
+            ):
+                hp_stolen_on_evade = int(
+                    damage * target_modifiers.dracula_hp_steal_percent
+                )
+                raw_target_data["hp"] = min(
+                    target_stats.max_hp, initial_target_hp + hp_stolen_on_evade
+                )
+
+                embed.title = f"⚔️ Duelo de Fora-da-Lei ⚔️"
+                embed.description = (
+                    f"{crit_msg}{i.user.display_name} usou **{estilo.name}** em {alvo.display_name} e causou **{damage}** de dano!{heal_info_msg}\n"
+                    f"👻 **DESVIADO!** {alvo.display_name} (Vampiro) ativou a Bênção de Drácula e sugou `{hp_stolen_on_evade}` HP!\n"
+                    f"{alvo.display_name} agora tem **{raw_target_data['hp']}/{target_stats.max_hp}** HP."
+                )
+            elif raw_target_data["inventory"].get(
+                "amuleto_de_pedra", 0
+            ) > 0 and not raw_target_data.get("amulet_used_since_revive", False):
+                raw_target_data["hp"] = 1
+                raw_target_data["amulet_used_since_revive"] = True
+                embed.title = f"⚔️ Duelo de Fora-da-Lei ⚔️"
+                embed.description = (
+                    f"{crit_msg}{i.user.display_name} usou **{estilo.name}** em {alvo.display_name} e causou **{damage}** de dano!{heal_info_msg}\n"
+                    f"✨ **Amuleto de Pedra ativado!** {alvo.display_name} sobreviveu com 1 HP!\n"
+                    f"{alvo.display_name} agora tem **{raw_target_data['hp']}/{target_stats.max_hp}** HP."
+                )
+            else:
+                raw_target_data["hp"] = 0
+                set_player_status(target_id, raw_target_data, "dead")
+                raw_target_data["deaths"] += 1
+                bounty_claimed = raw_target_data.get("bounty", 0)
+                raw_target_data["bounty"] = 0  # Reset bounty on death
+
+                money_stolen = int(raw_target_data["money"] * BOUNTY_PERCENTAGE)
+                raw_attacker_data["money"] += money_stolen + bounty_claimed
+                raw_attacker_data["kills"] += 1
+                raw_attacker_data["bounty"] += 100  # Add bounty for successful kill
+
+                embed.title = (
+                    f"☠️ ABATE! {i.user.display_name} derrotou {alvo.display_name}!"
+                )
+                embed.description = f"{crit_msg}{i.user.display_name} usou **{estilo.name}** e causou **{damage}** de dano, finalizando o oponente.{heal_info_msg}\n\n"
+                if bounty_claimed > 0:
+                    embed.description += (
+                        f"Uma recompensa de **${bounty_claimed}** foi clamada!\n"
+                    )
+                embed.description += f"**${money_stolen}** (20%) foram roubados.\n"
+                embed.description += f"{i.user.display_name} agora tem uma recompensa de **${raw_attacker_data['bounty']}** por sua cabeça."
+        else:
+            embed.title = f"⚔️ Duelo de Fora-da-Lei ⚔️"
+            embed.description = f"{crit_msg}{i.user.display_name} usou **{estilo.name}** em {alvo.display_name} e causou **{damage}** de dano!{heal_info_msg}\n{alvo.display_name} agora tem **{raw_target_data['hp']}/{target_stats.max_hp}** HP."
+
+        raw_attacker_data["cooldowns"][cooldown_key] = now
+        mark_player_dirty(attacker_id, target_id)
+        await i.response.send_message(embed=embed)
+
+
+class PagedEmbedView(ui.View):
+    """Previous/next buttons over a list of embeds, for results too long for one."""
+
+    def __init__(self, pages: list, timeout: float = 600):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.index = 0
+        self.message = None
+        self._refresh_buttons()
+
+    def _refresh_buttons(self):
+        self.previous_button.disabled = self.index == 0
+        self.next_button.disabled = self.index == len(self.pages) - 1
 
-    initial_target_hp = raw_target_data["hp"]
-    raw_target_data["hp"] -= damage
+    async def _show(self, interaction: Interaction, index: int):
+        self.index = index
+        self._refresh_buttons()
+        await interaction.response.edit_message(embed=self.pages[index], view=self)
 
-    embed = Embed(color=Color.red())
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+    @ui.button(label="Anterior", style=ButtonStyle.secondary, emoji="◀️")
+    async def previous_button(self, interaction: Interaction, button: ui.Button):
+        await self._show(interaction, self.index - 1)
+
+    @ui.button(label="Próxima", style=ButtonStyle.secondary, emoji="▶️")
+    async def next_button(self, interaction: Interaction, button: ui.Button):
+        await self._show(interaction, self.index + 1)
 
-    # Calculate Dracula evasion chance for target
-    dracula_evasion_chance = ITEMS_DATA.get("bencao_dracula", {}).get(
-        "evasion_chance", 0.0
+
+async def sync_level_roles(guild: discord.Guild, leveled: list) -> dict:
+    """Runs update_level_role for many (member_id, level) pairs.
+
+    At most ROLE_UPDATE_WORKERS role edits are in flight at once, so a raid
+    full of level-ups neither waits on them one by one nor floods the API.
+    Returns member ID -> newly added role.
+    """
+    queue = asyncio.Queue()
+    for item in leveled:
+        queue.put_nowait(item)
+    new_roles = {}
+
+    async def worker():
+        while not queue.empty():
+            member_id, level = queue.get_nowait()
+            role = await update_level_role(guild, member_id, level)
+            if role:
+                new_roles[member_id] = role
+
+    await asyncio.gather(
+        *(worker() for _ in range(min(ROLE_UPDATE_WORKERS, len(leveled))))
     )
-    if raw_target_data.get("current_transformation") == "Rei da Noite":
-        vampire_blessed_transform_info = CLASS_TRANSFORMATIONS.get("Vampiro", {}).get(
-            "Rei da Noite", {}
-        )
-        dracula_evasion_chance += vampire_blessed_transform_info.get(
-            "evasion_chance_bonus", 0.0
-        )
+    return new_roles
 
-    # Check for target evasion or amulet
-    if raw_target_data["hp"] <= 0:
-        if (
-            raw_target_data["class"] == "Vampiro"
-            and raw_target_data.get("bencao_dracula_active", False)
-            and random.random() < dracula_evasion_chance
-        ):
-            hp_steal_percent_on_evade = ITEMS_DATA.get("bencao_dracula", {}).get(
-                "hp_steal_percent_on_evade", 0.0
+
+async def pay_out_boss(boss: BossInstance, channel: discord.abc.Messageable | None):
+    """Rewards every participant of a defeated boss and posts one summary.
+
+    Rewards are weighted by damage dealt (see bosses.boss_rewards). All sheets
+    are updated in memory first, level-ups included; then one paginated
+    summary is posted and the level roles are synced by a small worker pool.
+    Call it once per raid, after boss_manager.remove() returned True. With no
+    channel (e.g. it was deleted) the rewards are still paid, just not posted.
+    """
+    xp_multiplier_passive = ITEMS_DATA.get("habilidade_inata", {}).get(
+        "xp_multiplier_passive", 0.0
+    )
+    rewards = boss_rewards(boss)
+    rows, leveled = [], []  # rows: (damage, line)
+    mvp_lines = []  # (rank, line)
+    for p_id_str, reward in rewards.items():
+        p_data = get_player_data(p_id_str)
+        if not p_data:
+            continue
+        boss_money = reward.money
+        if p_data.get("money_double") is True:
+            boss_money *= 2
+        p_data["money"] += boss_money
+
+        boss_xp = reward.xp
+        if p_data.get("style") == "Habilidade Inata":
+            boss_xp = int(boss_xp * (1 + xp_multiplier_passive))
+        if p_data.get("xptriple") is True:
+            boss_xp *= 3
+        p_data["xp"] += boss_xp
+
+        for item_drop_id, quantity_drop in boss.drops.items():
+            item_drop_info = ITEMS_DATA.get(item_drop_id)
+            if not item_drop_info:
+                print(
+                    f"Warning: Dropped item '{item_drop_id}' is not defined in ITEMS_DATA."
+                )
+                continue
+
+            if item_drop_id == "amuleto_de_pedra":
+                if p_data["inventory"].get("amuleto_de_pedra", 0) == 0:
+                    p_data["inventory"]["amuleto_de_pedra"] = 1
+            else:
+                p_data["inventory"][item_drop_id] = (
+                    p_data["inventory"].get(item_drop_id, 0) + quantity_drop
+                )
+
+        damage = boss.participants[p_id_str]
+        summary = f"`{damage}` de dano → 💰 ${boss_money} | ✨ {boss_xp} XP"
+        if reward.mvp_rank is not None:
+            medal = (
+                BOSS_MVP_MEDALS[reward.mvp_rank - 1]
+                if reward.mvp_rank <= len(BOSS_MVP_MEDALS)
+                else "🏅"
             )
-            hp_stolen_on_evade = int(damage * hp_steal_percent_on_evade)
-            raw_target_data["hp"] = min(
-                target_stats["max_hp"], initial_target_hp + hp_stolen_on_evade
+            mvp_lines.append(
+                (reward.mvp_rank, f"{medal} **{p_data['name']}**: {summary}")
             )
+        if apply_level_ups(p_data):
+            leveled.append((int(p_id_str), p_data["level"]))
+            summary += f" | 🌟 Nível {p_data['level']}"
+        rows.append((damage, f"**{p_data['name']}**: {summary}"))
 
-            embed.title = f"⚔️ Duelo de Fora-da-Lei ⚔️"
-            embed.description = (
-                f"{crit_msg}{i.user.display_name} usou **{estilo.name}** em {alvo.display_name} e causou **{damage}** de dano!{heal_info_msg}\n"
-                f"👻 **DESVIADO!** {alvo.display_name} (Vampiro) ativou a Bênção de Drácula e sugou `{hp_stolen_on_evade}` HP!\n"
-                f"{alvo.display_name} agora tem **{raw_target_data['hp']}/{target_stats['max_hp']}** HP."
-            )
-        elif raw_target_data["inventory"].get(
-            "amuleto_de_pedra", 0
-        ) > 0 and not raw_target_data.get("amulet_used_since_revive", False):
-            raw_target_data["hp"] = 1
-            raw_target_data["amulet_used_since_revive"] = True
-            embed.title = f"⚔️ Duelo de Fora-da-Lei ⚔️"
-            embed.description = (
-                f"{crit_msg}{i.user.display_name} usou **{estilo.name}** em {alvo.display_name} e causou **{damage}** de dano!{heal_info_msg}\n"
-                f"✨ **Amuleto de Pedra ativado!** {alvo.display_name} sobreviveu com 1 HP!\n"
-                f"{alvo.display_name} agora tem **{raw_target_data['hp']}/{target_stats['max_hp']}** HP."
+    mark_player_dirty(*rewards)
+
+    rows.sort(key=lambda row: row[0], reverse=True)
+    description = (
+        f"**{len(rows)}** participante(s) dividiram as recompensas pelo dano causado."
+    )
+    if leveled:
+        description += f"\n🌟 **{len(leveled)}** subiram de nível!"
+    page_size = BOSS_RESULTS_PAGE_SIZE
+    page_count = max(1, -(-len(rows) // page_size))
+    pages = []
+    for page in range(page_count):
+        chunk = rows[page * page_size : (page + 1) * page_size]
+        lines = [
+            f"`#{page * page_size + n}` {line}" for n, (_, line) in enumerate(chunk, 1)
+        ]
+        embed = Embed(
+            title=f"🎉 O {boss.name} FOI DERROTADO! 🎉",
+            description=description + "\n\n" + "\n".join(lines),
+            color=Color.green(),
+        )
+        if mvp_lines and page == 0:
+            embed.add_field(
+                name="🏆 MVPs",
+                value="\n".join(line for _, line in sorted(mvp_lines)),
+                inline=False,
             )
-        else:
-            raw_target_data["hp"] = 0
-            raw_target_data["status"] = "dead"
-            raw_target_data["deaths"] += 1
-            bounty_claimed = raw_target_data.get("bounty", 0)
-            raw_target_data["bounty"] = 0  # Reset bounty on death
-
-            money_stolen = int(raw_target_data["money"] * BOUNTY_PERCENTAGE)
-            raw_attacker_data["money"] += money_stolen + bounty_claimed
-            raw_attacker_data["kills"] += 1
-            raw_attacker_data["bounty"] += 100  # Add bounty for successful kill
-
-            embed.title = (
-                f"☠️ ABATE! {i.user.display_name} derrotou {alvo.display_name}!"
-            )
-            embed.description = f"{crit_msg}{i.user.display_name} usou **{estilo.name}** e causou **{damage}** de dano, finalizando o oponente.{heal_info_msg}\n\n"
-            if bounty_claimed > 0:
-                embed.description += (
-                    f"Uma recompensa de **${bounty_claimed}** foi clamada!\n"
-                )
-            embed.description += f"**${money_stolen}** (20%) foram roubados.\n"
-            embed.description += f"{i.user.display_name} agora tem uma recompensa de **${raw_attacker_data['bounty']}** por sua cabeça."
+        if page_count > 1:
+            embed.set_footer(text=f"Página {page + 1}/{page_count}")
+        pages.append(embed)
+
+    if channel is None:
+        print(
+            f"Aviso: Canal {boss.channel_id} do boss não encontrado; recompensas pagas sem anúncio."
+        )
     else:
-        embed.title = f"⚔️ Duelo de Fora-da-Lei ⚔️"
-        embed.description = f"{crit_msg}{i.user.display_name} usou **{estilo.name}** em {alvo.display_name} e causou **{damage}** de dano!{heal_info_msg}\n{alvo.display_name} agora tem **{raw_target_data['hp']}/{target_stats['max_hp']}** HP."
+        try:
+            if page_count > 1:
+                view = PagedEmbedView(pages)
+                view.message = await channel.send(embed=pages[0], view=view)
+            else:
+                await channel.send(embed=pages[0])
+        except discord.HTTPException as e:
+            print(
+                f"Erro ao anunciar as recompensas do boss no canal {boss.channel_id}: {e}"
+            )
 
-    raw_attacker_data["cooldowns"][cooldown_key] = now
-    save_data()
-    await i.response.send_message(embed=embed)
+    # Level roles take one path per member: a direct edit here, else the reconciler
+    guild = getattr(channel, "guild", None)
+    if guild and leveled:
+        await sync_level_roles(guild, leveled)
+    else:
+        for member_id, _ in leveled:
+            track_player_roles(member_id, get_player_data(member_id))
 
 
-@bot.tree.command(
-    name="atacar_boss", description="Ataca o boss global quando ele estiver ativo."
-)
+@bot.tree.command(name="atacar_boss", description="Ataca o boss ativo neste canal.")
 @app_commands.check(check_player_exists)
 @app_commands.checks.cooldown(
     1, 5, key=lambda i: i.user.id
@@ -2881,8 +3096,11 @@ async def atacar(
     ]
 )
 async def atacar_boss(i: Interaction, estilo: app_commands.Choice[str]):
-    if not BOSS_DATA["is_active"]:
-        await i.response.send_message("Não há nenhum boss ativo.", ephemeral=True)
+    boss = boss_manager.get(i.channel_id)
+    if boss is None:
+        await i.response.send_message(
+            "Não há nenhum boss ativo neste canal.", ephemeral=True
+        )
         return
 
     player_id = str(i.user.id)
@@ -2894,40 +3112,14 @@ async def atacar_boss(i: Interaction, estilo: app_commands.Choice[str]):
         )
         return
 
-    if player_id not in BOSS_DATA["participants"]:
-        BOSS_DATA["participants"].append(player_id)
+    boss_manager.join(boss, player_id, raw_player_data["status"] == "online")
 
     now = datetime.now().timestamp()
     cooldown_key = f"boss_{estilo.value}_cooldown"
-    cooldown_duration = 5 if estilo.value == "basico" else 15
-
     # Apply cooldown reductions for boss attack
-    if raw_player_data.get("aura_blessing_active"):
-        blessing_info = ITEMS_DATA.get("bencao_rei_henrique", {})
-        cooldown_duration = int(
-            cooldown_duration
-            * (1 - blessing_info.get("cooldown_reduction_percent", 0.0))
-        )
-
-    if raw_player_data.get("current_transformation"):
-        transform_name = raw_player_data["current_transformation"]
-        class_name = raw_player_data["class"]
-        transform_info = CLASS_TRANSFORMATIONS.get(class_name, {}).get(transform_name)
-        if transform_info and "cooldown_reduction_percent" in transform_info:
-            cooldown_duration = int(
-                cooldown_duration * (1 - transform_info["cooldown_reduction_percent"])
-            )
-
-    # Mira Semi-Automática reduction for boss attacks
-    mira_semi_automatica_info = ITEMS_DATA.get("mira_semi_automatica", {})
-    if (
-        raw_player_data["inventory"].get("mira_semi_automatica", 0) > 0
-        and raw_player_data["class"] == "Atirador"
-    ):
-        cooldown_duration = int(
-            cooldown_duration
-            * (1 - mira_semi_automatica_info.get("cooldown_reduction_percent", 0.0))
-        )
+    cooldown_duration = player_modifiers(raw_player_data).attack_cooldown(
+        5 if estilo.value == "basico" else 15
+    )
 
     last_attack = raw_player_data["cooldowns"].get(cooldown_key, 0)
 
@@ -2941,10 +3133,10 @@ async def atacar_boss(i: Interaction, estilo: app_commands.Choice[str]):
     player_stats = calculate_effective_stats(raw_player_data)
 
     damage = (
-        random.randint(player_stats["attack"], int(player_stats["attack"] * 1.5))
+        random.randint(player_stats.attack, int(player_stats.attack * 1.5))
         if estilo.value == "basico"
         else random.randint(
-            player_stats["special_attack"], int(player_stats["special_attack"] * 1.8)
+            player_stats.special_attack, int(player_stats.special_attack * 1.8)
         )
     )
     crit_msg = ""
@@ -2952,89 +3144,28 @@ async def atacar_boss(i: Interaction, estilo: app_commands.Choice[str]):
         damage = int(damage * CRITICAL_MULTIPLIER)
         crit_msg = "💥 **CRÍTICO!** "
 
-    BOSS_DATA["hp"] -= damage
     raw_player_data["cooldowns"][cooldown_key] = now
-    save_data()
-
-    await i.response.send_message(
-        f"{crit_msg}Você atacou o {BOSS_DATA['name']} e causou `{damage}` de dano! Vida restante: `{max(0, BOSS_DATA['hp'])}/{BOSS_DATA['max_hp']}`."
-    )
 
-    if BOSS_DATA["hp"] <= 0:
-        embed = Embed(
-            title=f"🎉 O {BOSS_DATA['name']} FOI DERROTADO! 🎉",
-            description="Recompensas foram distribuídas!",
-            color=Color.green(),
+    if BOSS_HIT_TICK_SECONDS > 0:
+        # Applied, announced and saved with the other hits of this tick
+        boss.queue_hit(player_id, damage, bool(crit_msg))
+        await i.response.send_message(
+            f"{crit_msg}🎯 Golpe registrado! `{damage}` de dano no {boss.name}, aplicado no próximo tick.",
+            ephemeral=True,
         )
-        if BOSS_DATA["channel_id"]:
-            boss_channel = bot.get_channel(BOSS_DATA["channel_id"])
-            if boss_channel:
-                await boss_channel.send(embed=embed)
-        else:  # Fallback if channel_id is not set
-            await i.channel.send(embed=embed)
-
-        for p_id_str in BOSS_DATA["participants"]:  # Iterate over string IDs
-            if p_data := get_player_data(
-                p_id_str
-            ):  # Use get_player_data (handles int/str)
-                boss_money_raw = 5000
-                if p_data.get("money_double") is True:
-                    boss_money = boss_money_raw * 2
-                else:
-                    boss_money = boss_money_raw
-                p_data["money"] += boss_money
-
-                boss_xp_raw = 1000
-                xp_multiplier_passive = ITEMS_DATA.get("habilidade_inata", {}).get(
-                    "xp_multiplier_passive", 0.0
-                )
-
-                if p_data.get("style") == "Habilidade Inata":
-                    boss_xp_raw = int(boss_xp_raw * (1 + xp_multiplier_passive))
-
-                if p_data.get("xptriple") is True:
-                    boss_xp = boss_xp_raw * 3
-                else:
-                    boss_xp = boss_xp_raw
-
-                p_data["xp"] += boss_xp
-
-                for item_drop_id, quantity_drop in BOSS_DATA.get("drops", {}).items():
-                    item_drop_info = ITEMS_DATA.get(item_drop_id)
-                    if not item_drop_info:
-                        print(
-                            f"Warning: Dropped item '{item_drop_id}' is not defined in ITEMS_DATA."
-                        )
-                        continue
+        return
 
-                    if item_drop_id == "amuleto_de_pedra":
-                        if p_data["inventory"].get("amuleto_de_pedra", 0) == 0:
-                            p_data["inventory"]["amuleto_de_pedra"] = 1
-                    else:
-                        p_data["inventory"][item_drop_id] = (
-                            p_data["inventory"].get(item_drop_id, 0) + quantity_drop
-                        )
+    boss.hit(player_id, damage)
+    mark_player_dirty(player_id)
+    # Decided before any await: only the killing blow ends the raid and pays out
+    defeated = boss.defeated and boss_manager.remove(boss)
 
-                # Ensure user object is fetched correctly for level up message
-                member_for_levelup = bot.get_user(int(p_id_str))
-                if member_for_levelup:  # Only proceed if user is found
-                    await bot.check_and_process_levelup(
-                        member_for_levelup,
-                        p_data,
-                        i.channel,  # Send to the channel where boss was defeated
-                    )
+    await i.response.send_message(
+        f"{crit_msg}Você atacou o {boss.name} e causou `{damage}` de dano! Vida restante: `{max(0, boss.hp)}/{boss.max_hp}`."
+    )
 
-        # Reset BOSS_DATA only after all participants have been processed
-        BOSS_DATA.update(
-            {
-                "is_active": False,
-                "hp": 0,
-                "participants": [],
-                "channel_id": None,
-                "current_boss_name": "Colosso de Pedra",
-            }  # Reset current_boss_name
-        )
-        save_data()
+    if defeated:
+        await pay_out_boss(boss, i.channel)
 
 
 @bot.tree.command(name="usar", description="Usa um item do seu inventário.")
@@ -3084,27 +3215,23 @@ async def usar(i: Interaction, item_id: str):
             f"{item_info['emoji']} Você usou uma Super Poção e recuperou {item_info['heal']} HP! Vida atual: `{raw_player_data['hp']}/{raw_player_data['max_hp']}`."
         )
     elif item_id == "invocador":
-        if BOSS_DATA["is_active"]:
-            await i.response.send_message("O Colosso já está ativo!", ephemeral=True)
+        boss = boss_manager.spawn(
+            i.channel_id, i.user.id, raw_player_data["status"] == "online"
+        )
+        if boss is None:
+            await i.response.send_message(
+                "O Colosso já está ativo neste canal!", ephemeral=True
+            )
             return
 
         raw_player_data["inventory"]["invocador"] -= 1
-        BOSS_DATA.update(
-            {
-                "is_active": True,
-                "hp": BOSS_DATA["max_hp"],
-                "participants": [str(i.user.id)],
-                "channel_id": i.channel.id,
-                "current_boss_name": "Colosso de Pedra",  # Ensure this is consistently set
-            }
-        )
         embed = Embed(
-            title=f"{item_info['emoji']} O {BOSS_DATA['name']} APARECEU! {item_info['emoji']}",
-            description=f"Invocado por **{i.user.display_name}**! Usem `/atacar_boss`!",
+            title=f"{item_info['emoji']} O {boss.name} APARECEU! {item_info['emoji']}",
+            description=f"Invocado por **{i.user.display_name}**! Usem `/atacar_boss` neste canal!",
             color=Color.dark_red(),
         )
         embed.add_field(
-            name="Vida do Boss", value=f"`{BOSS_DATA['hp']}/{BOSS_DATA['max_hp']}`"
+            name="Vida do Boss", value=f"`{boss.hp}/{boss.max_hp}`"
         ).set_thumbnail(url="https://c.tenor.com/TgVgrdOEIIYAAAAd/tenor.gif")
         await i.response.send_message(embed=embed)
 
@@ -3114,7 +3241,7 @@ async def usar(i: Interaction, item_id: str):
             raw_player_data["inventory"].get(item_id) == 0
         ):  # Clean up if quantity drops to 0
             del raw_player_data["inventory"][item_id]
-    save_data()
+    mark_player_dirty(i.user.id)
 
 
 @bot.tree.command(
@@ -3139,73 +3266,54 @@ async def curar(i: Interaction, alvo: discord.Member):
         )
         return
 
-    target_stats = calculate_effective_stats(raw_target_data)
-
-    now, cooldown_key, last_heal = (
-        datetime.now().timestamp(),
-        "heal_cooldown",
-        raw_player_data["cooldowns"].get("heal_cooldown", 0),
-    )
-
-    # Base cooldown for healing
-    cooldown_healing = 45
+    async with player_locks.acquire(i.user.id, alvo.id):
+        target_stats = calculate_effective_stats(raw_target_data)
 
-    # Apply Aura Blessing reduction
-    if raw_player_data.get("aura_blessing_active"):
-        blessing_info = ITEMS_DATA.get("bencao_rei_henrique", {})
-        cooldown_healing = int(
-            cooldown_healing
-            * (1 - blessing_info.get("cooldown_reduction_percent", 0.0))
+        now, cooldown_key, last_heal = (
+            datetime.now().timestamp(),
+            "heal_cooldown",
+            raw_player_data["cooldowns"].get("heal_cooldown", 0),
         )
 
-    # Apply Transformation reduction
-    if raw_player_data.get("current_transformation"):
-        transform_name = raw_player_data["current_transformation"]
-        class_name = raw_player_data["class"]
-        transform_info = CLASS_TRANSFORMATIONS.get(class_name, {}).get(transform_name)
-        if transform_info and "cooldown_reduction_percent" in transform_info:
-            cooldown_healing = int(
-                cooldown_healing * (1 - transform_info["cooldown_reduction_percent"])
+        # Base cooldown for healing, with Aura Blessing and transformation reductions
+        cooldown_healing = player_modifiers(raw_player_data).heal_cooldown(45)
+
+        if now - last_heal < cooldown_healing:
+            await i.response.send_message(
+                f"Sua cura está em cooldown! Tente novamente em **{cooldown_healing - (now - last_heal):.1f}s**.",
+                ephemeral=True,
             )
+            return
 
-    if now - last_heal < cooldown_healing:
-        await i.response.send_message(
-            f"Sua cura está em cooldown! Tente novamente em **{cooldown_healing - (now - last_heal):.1f}s**.",
-            ephemeral=True,
+        heal_amount = random.randint(
+            int(player_stats.special_attack * 1.5),
+            int(player_stats.special_attack * 2.5),
         )
-        return
-
-    heal_amount = random.randint(
-        int(player_stats["special_attack"] * 1.5),
-        int(player_stats["special_attack"] * 2.5),
-    )
 
-    # Apply healing multiplier from items/transformations (calculated in effective stats)
-    if player_stats.get("healing_multiplier", 1.0) > 1.0:
-        heal_amount = int(heal_amount * player_stats["healing_multiplier"])
+        # Apply healing multiplier from items/transformations (calculated in effective stats)
+        if player_stats.healing_multiplier > 1.0:
+            heal_amount = int(heal_amount * player_stats.healing_multiplier)
 
-    original_hp = raw_target_data["hp"]
-    raw_target_data["hp"] = min(
-        raw_target_data["max_hp"], raw_target_data["hp"] + heal_amount
-    )
-    healed_for = raw_target_data["hp"] - original_hp
+        original_hp = raw_target_data["hp"]
+        raw_target_data["hp"] = min(
+            raw_target_data["max_hp"], raw_target_data["hp"] + heal_amount
+        )
+        healed_for = raw_target_data["hp"] - original_hp
 
-    raw_player_data["cooldowns"][cooldown_key] = now
+        raw_player_data["cooldowns"][cooldown_key] = now
 
-    embed = Embed(title="✨ Bênção Vital ✨", color=Color.from_rgb(139, 212, 181))
-    if i.user.id == alvo.id:
-        embed.description = (
-            f"Você se concentrou e curou a si mesmo em **{healed_for}** HP."
-        )
-    else:
-        embed.description = (
-            f"Você usou seus poderes para curar {alvo.mention} em **{healed_for}** HP."
+        embed = Embed(title="✨ Bênção Vital ✨", color=Color.from_rgb(139, 212, 181))
+        if i.user.id == alvo.id:
+            embed.description = (
+                f"Você se concentrou e curou a si mesmo em **{healed_for}** HP."
+            )
+        else:
+            embed.description = f"Você usou seus poderes para curar {alvo.mention} em **{healed_for}** HP."
+        embed.set_footer(
+            text=f"Vida de {alvo.display_name}: {raw_target_data['hp']}/{target_stats.max_hp}"
         )
-    embed.set_footer(
-        text=f"Vida de {alvo.display_name}: {raw_target_data['hp']}/{target_stats['max_hp']}"
-    )
-    save_data()
-    await i.response.send_message(embed=embed)
+        mark_player_dirty(i.user.id, alvo.id)
+        await i.response.send_message(embed=embed)
 
 
 @bot.tree.command(
@@ -3275,7 +3383,7 @@ async def transformar(i: Interaction, forma: app_commands.Choice[str]):
                 )
                 return
 
-        if raw_player_data["energy"] < transform_info["cost_energy"]:
+        if settle_energy(raw_player_data) < transform_info["cost_energy"]:
             await i.response.send_message(
                 f"Energia insuficiente para se transformar em {forma.value} ({transform_info['cost_energy']} energia)!",
                 ephemeral=True,
@@ -3286,6 +3394,9 @@ async def transformar(i: Interaction, forma: app_commands.Choice[str]):
         raw_player_data["transform_end_time"] = (
             datetime.now().timestamp() + transform_info["duration_seconds"]
         )
+        effect_expiry.schedule(
+            (str(i.user.id), "transformation"), raw_player_data["transform_end_time"]
+        )
         raw_player_data["energy"] -= transform_info["cost_energy"]
 
         embed = Embed(
@@ -3294,7 +3405,7 @@ async def transformar(i: Interaction, forma: app_commands.Choice[str]):
             color=Color.dark_red() if player_class == "Vampiro" else Color.gold(),
         )
         await i.response.send_message(embed=embed)
-        save_data()
+        mark_player_dirty(i.user.id)
         return
 
     # Handle special blessings that are activated via /transformar
@@ -3323,7 +3434,7 @@ async def transformar(i: Interaction, forma: app_commands.Choice[str]):
             )
             return
 
-        if raw_player_data["energy"] < dracula_info["cost_energy"]:
+        if settle_energy(raw_player_data) < dracula_info["cost_energy"]:
             await i.response.send_message(
                 f"Energia insuficiente para a {dracula_info['name']} ({dracula_info['cost_energy']} energia)!",
                 ephemeral=True,
@@ -3335,6 +3446,9 @@ async def transformar(i: Interaction, forma: app_commands.Choice[str]):
         raw_player_data["bencao_dracula_end_time"] = (
             datetime.now().timestamp() + dracula_info["duration_seconds"]
         )
+        effect_expiry.schedule(
+            (str(i.user.id), "dracula"), raw_player_data["bencao_dracula_end_time"]
+        )
 
         embed = Embed(
             title=f"{dracula_info['emoji']} {dracula_info['name']}! {dracula_info['emoji']}",
@@ -3344,7 +3458,7 @@ async def transformar(i: Interaction, forma: app_commands.Choice[str]):
         )
         embed.set_thumbnail(url="https://c.tenor.com/A6j4yvK8J-oAAAAC/tenor.gif")
         await i.response.send_message(embed=embed)
-        save_data()
+        mark_player_dirty(i.user.id)
         return
 
     await i.response.send_message(
@@ -3419,9 +3533,9 @@ async def destransformar(i: Interaction, forma: app_commands.Choice[str]):
 
         if deactivated_any:
             raw_player_data["energy"] = min(
-                MAX_ENERGY, raw_player_data["energy"] + 1
+                MAX_ENERGY, settle_energy(raw_player_data) + 1
             )  # Regain some energy
-            save_data()
+            mark_player_dirty(i.user.id)
             messages.append("Você recuperou 1 de energia.")
             await i.response.send_message("\n".join(messages))
         else:
@@ -3479,9 +3593,9 @@ async def destransformar(i: Interaction, forma: app_commands.Choice[str]):
 
     if deactivated_any:
         raw_player_data["energy"] = min(
-            MAX_ENERGY, raw_player_data["energy"] + 1
+            MAX_ENERGY, settle_energy(raw_player_data) + 1
         )  # Regain energy
-        save_data()
+        mark_player_dirty(i.user.id)
         messages.append("Você recuperou 1 de energia.")
         await i.response.send_message("\n".join(messages))
     else:
@@ -3517,7 +3631,7 @@ async def ativar_bencao_aura(i: Interaction):
         )
         return
 
-    if raw_player_data["energy"] < blessing_info["cost_energy"]:
+    if settle_energy(raw_player_data) < blessing_info["cost_energy"]:
         await i.response.send_message(
             f"Você precisa de {blessing_info['cost_energy']} de energia para invocar a {blessing_info['name']}!",
             ephemeral=True,
@@ -3529,6 +3643,9 @@ async def ativar_bencao_aura(i: Interaction):
     raw_player_data["aura_blessing_end_time"] = (
         datetime.now().timestamp() + blessing_info["duration_seconds"]
     )
+    effect_expiry.schedule(
+        (str(i.user.id), "aura"), raw_player_data["aura_blessing_end_time"]
+    )
 
     embed = Embed(
         title=f"{blessing_info['emoji']} {blessing_info['name']}! {blessing_info['emoji']}",
@@ -3538,7 +3655,7 @@ async def ativar_bencao_aura(i: Interaction):
     )
     embed.set_thumbnail(url="https://c.tenor.com/2U54k92V-i4AAAAC/tenor.gif")
     await i.response.send_message(embed=embed)
-    save_data()
+    mark_player_dirty(i.user.id)
 
 
 ## Comandos Utilitários
@@ -3577,8 +3694,8 @@ async def afk(i: Interaction):
         await i.response.send_message("Você já está em modo AFK.", ephemeral=True)
         return
 
-    player_data["status"] = "afk"
-    save_data()
+    set_player_status(i.user.id, player_data, "afk")
+    mark_player_dirty(i.user.id)
     await i.response.send_message(
         "🌙 Você entrou em modo AFK. Use `/voltar` para ficar online."
     )
@@ -3598,9 +3715,9 @@ async def voltar(i: Interaction):
         await i.response.send_message("Você não está em modo AFK.", ephemeral=True)
         return
 
-    player_data["status"] = "online"
+    set_player_status(i.user.id, player_data, "online")
     player_data["cooldowns"]["afk_cooldown"] = datetime.now().timestamp()
-    save_data()
+    mark_player_dirty(i.user.id)
     await i.response.send_message(
         "🟢 Você está online novamente! O cooldown para usar `/afk` outra vez começou."
     )
@@ -3625,7 +3742,7 @@ async def set_xptriple(i: Interaction, membro: discord.Member, status: bool):
         return
 
     player_data["xptriple"] = status
-    save_data()
+    mark_player_dirty(membro.id)
 
     status_str = "ativado" if status else "desativado"
     await i.response.send_message(
@@ -3652,7 +3769,7 @@ async def set_money_double(i: Interaction, membro: discord.Member, status: bool)
         return
 
     player_data["money_double"] = status
-    save_data()
+    mark_player_dirty(membro.id)
 
     status_str = "ativado" if status else "desativado"
     await i.response.send_message(
@@ -3660,6 +3777,48 @@ async def set_money_double(i: Interaction, membro: discord.Member, status: bool)
     )
 
 
+# --- COMANDO DE ADMIN PARA ACOMPANHAR A CARGA DE BATALHAS ---
+@bot.tree.command(
+    name="status_batalhas",
+    description="[ADMIN] Mostra quantas batalhas estão rodando e na fila.",
+)
+@app_commands.checks.has_permissions(administrator=True)
+async def status_batalhas(i: Interaction):
+    metrics = battle_governor.metrics()
+    embed = Embed(title="🚦 Batalhas", color=Color.blurple())
+    embed.add_field(
+        name="Em andamento", value=f"{metrics['active']}/{metrics['max_active']}"
+    )
+    embed.add_field(
+        name="Na fila", value=f"{metrics['queued']}/{metrics['max_queued']}"
+    )
+    embed.add_field(
+        name="Concluídas / Recusadas",
+        value=f"{metrics['completed']} / {metrics['rejected']}",
+    )
+    await i.response.send_message(embed=embed, ephemeral=True)
+
+
+# --- COMANDO DE ADMIN PARA O MODO DE COMBATE DO SERVIDOR ---
+@bot.tree.command(
+    name="modo_combate",
+    description="[ADMIN] Define se /cacar e /batalhar são instantâneos por padrão.",
+)
+@app_commands.describe(
+    instantaneo="True para resolver as lutas de uma vez, False para animá-las."
+)
+@app_commands.guild_only()
+@app_commands.checks.has_permissions(administrator=True)
+async def modo_combate(i: Interaction, instantaneo: bool):
+    guild_settings.setdefault(str(i.guild_id), {})["instant_combat"] = instantaneo
+    await save_guild_settings()
+
+    mode_str = "instantâneo" if instantaneo else "animado (turno a turno)"
+    await i.response.send_message(
+        f"O modo de combate padrão deste servidor agora é **{mode_str}**."
+    )
+
+
 # --- COMANDO /lore ---
 @bot.tree.command(name="lore", description="Mostra a história do mundo de Outlaws.")
 async def lore(i: Interaction):
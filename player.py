@@ -0,0 +1,383 @@
+# player.py
+import sys
+import time
+from collections.abc import Mapping, MutableMapping
+from dataclasses import dataclass, field, fields
+
+from config import ENERGY_REGEN_SECONDS, MAX_ENERGY, STARTING_LOCATION
+
+
+class _Unset:
+    """Marks a field the sheet does not have (older sheets lack some keys)."""
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "<unset>"
+
+
+UNSET = _Unset()
+
+
+class _SlotMapping(MutableMapping):
+    """Dict interface over slots: a slot holding UNSET is an absent key.
+
+    Subclasses set `_KEY_ATTRS` (key -> slot name, in output order) and have an
+    `extras` slot for keys without a slot of their own.
+    """
+
+    __slots__ = ()
+    _KEY_ATTRS = {}
+
+    def __getitem__(self, key):
+        attr = self._KEY_ATTRS.get(key)
+        if attr is not None:
+            value = getattr(self, attr)
+            if value is not UNSET:
+                return value
+        elif self.extras and key in self.extras:
+            return self.extras[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        attr = self._KEY_ATTRS.get(key)
+        if attr is not None:
+            value = getattr(self, attr)
+            return default if value is UNSET else value
+        return self.extras.get(key, default) if self.extras else default
+
+    def __setitem__(self, key, value):
+        attr = self._KEY_ATTRS.get(key)
+        if attr is not None:
+            setattr(self, attr, value)
+        elif self.extras is None:
+            self.extras = {key: value}
+        else:
+            self.extras[key] = value
+
+    def __delitem__(self, key):
+        attr = self._KEY_ATTRS.get(key)
+        if attr is not None:
+            if getattr(self, attr) is UNSET:
+                raise KeyError(key)
+            setattr(self, attr, UNSET)
+        elif self.extras and key in self.extras:
+            del self.extras[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        attr = self._KEY_ATTRS.get(key)
+        if attr is not None:
+            return getattr(self, attr) is not UNSET
+        return bool(self.extras) and key in self.extras
+
+    def __iter__(self):
+        for key, attr in self._KEY_ATTRS.items():
+            if getattr(self, attr) is not UNSET:
+                yield key
+        if self.extras:
+            yield from list(self.extras)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self) -> dict:
+        """Shallow copy as a plain dict, like dict.copy()."""
+        record = {}
+        for key, attr in self._KEY_ATTRS.items():
+            value = getattr(self, attr)
+            if value is not UNSET:
+                record[key] = value
+        if self.extras:
+            record.update(self.extras)
+        return record
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.copy()!r})"
+
+
+# Cooldown keys the bot writes; anything else (e.g. from old versions) goes to extras.
+COOLDOWN_KEYS = (
+    "basico_attack_cooldown",
+    "especial_attack_cooldown",
+    "boss_basico_cooldown",
+    "boss_especial_cooldown",
+    "work_cooldown",
+    "heal_cooldown",
+    "afk_cooldown",
+)
+
+
+class Cooldowns(_SlotMapping):
+    """Last-use timestamps keyed like the `cooldowns` dict, one slot per cooldown."""
+
+    __slots__ = COOLDOWN_KEYS + ("extras",)
+    _KEY_ATTRS = {key: key for key in COOLDOWN_KEYS}
+
+    def __init__(self, timestamps: Mapping = ()):
+        for key in COOLDOWN_KEYS:
+            setattr(self, key, UNSET)
+        self.extras = None
+        self.update(timestamps)
+
+
+class Inventory(dict):
+    """The inventory dict, counting its own changes so cached stats can notice them."""
+
+    __slots__ = ("version",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, key, value):
+        self.version += 1
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.version += 1
+        super().__delitem__(key)
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.version += 1
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+
+# Attributes that feed stats.calculate_effective_stats(); setting one bumps the version.
+STATS_FIELDS = frozenset(
+    {
+        "player_class",
+        "style",
+        "max_hp",
+        "base_attack",
+        "base_special_attack",
+        "inventory",
+        "current_transformation",
+        "aura_blessing_active",
+    }
+)
+
+
+# Fields holding one of a few values (class, style, ...) that every sheet repeats.
+SHARED_STRING_KEYS = frozenset(
+    {"class", "style", "status", "location", "current_transformation"}
+)
+
+
+@dataclass(slots=True, weakref_slot=True, eq=False, repr=False)
+class Player(_SlotMapping):
+    """A player sheet with one slot per known field instead of a 35-key dict.
+
+    It still behaves like the dict stored in outlaws_data.json (`p["money"]`,
+    `p.get("xptriple", False)`, `"location" in p`...), so handlers can move to
+    attribute access (`p.money`, `p.player_class`) one at a time. A field the
+    sheet does not have is UNSET (falsy) and is left out of to_dict(); unknown
+    keys live in `extras`, so from_dict()/to_dict() round-trip losslessly.
+    """
+
+    # Not part of the sheet: invalidation counter and cache for stats.py.
+    _stats_version: int = field(default=0, init=False)
+    _stats_cache: tuple | None = field(default=None, init=False)
+
+    name: str = UNSET
+    player_class: str = UNSET  # "class" in the JSON
+    style: str = UNSET
+    xp: int = UNSET
+    level: int = UNSET
+    money: int = UNSET
+    hp: int = UNSET
+    max_hp: int = UNSET
+    base_attack: int = UNSET
+    base_special_attack: int = UNSET
+    inventory: Inventory = UNSET  # item_id -> quantity
+    cooldowns: Cooldowns = UNSET
+    status: str = UNSET
+    bounty: int = UNSET
+    kills: int = UNSET
+    deaths: int = UNSET
+    energy: int = UNSET  # As of energy_updated_at; see current_energy()
+    energy_updated_at: float = UNSET
+    current_transformation: str | None = UNSET
+    transform_end_time: float = UNSET
+    aura_blessing_active: bool = UNSET
+    aura_blessing_end_time: float = UNSET
+    bencao_dracula_active: bool = UNSET
+    bencao_dracula_end_time: float = UNSET
+    amulet_used_since_revive: bool = UNSET
+    attribute_points: int = UNSET
+    location: str = UNSET
+    xptriple: bool = UNSET
+    money_double: bool = UNSET
+    schema_version: int = UNSET
+    extras: dict | None = None  # Keys this version does not know about
+
+    @classmethod
+    def from_dict(cls, record: Mapping) -> "Player":
+        player = cls()
+        for key, value in record.items():
+            if key == "inventory" and isinstance(value, Mapping):
+                # Every sheet repeats the same few item names; share the strings.
+                value = Inventory({sys.intern(k): v for k, v in value.items()})
+            elif key == "cooldowns" and isinstance(value, Mapping):
+                value = Cooldowns(value)
+            elif key in SHARED_STRING_KEYS and isinstance(value, str):
+                value = sys.intern(value)  # One copy per class/location, not per sheet
+            player[key] = value
+        return player
+
+    def __setattr__(self, name, value):
+        if name in STATS_FIELDS:
+            object.__setattr__(self, "_stats_version", self._stats_version + 1)
+        object.__setattr__(self, name, value)
+
+    def stats_key(self):
+        """Changes whenever the effective stats may have; None if it cannot tell."""
+        inventory = self.inventory
+        if isinstance(inventory, Inventory):
+            return (self._stats_version, inventory.version)
+        # A plain dict could change behind our back
+        return (self._stats_version, 0) if inventory is UNSET else None
+
+    def to_dict(self) -> dict:
+        """The sheet as stored in JSON (the inventory dict is shared, not copied)."""
+        record = self.copy()
+        if isinstance(self.cooldowns, Cooldowns):
+            record["cooldowns"] = self.cooldowns.copy()
+        return record
+
+
+Player._KEY_ATTRS = {
+    ("class" if f.name == "player_class" else f.name): f.name
+    for f in fields(Player)
+    if f.name != "extras" and not f.name.startswith("_")
+}
+
+
+# --- ENERGIA ---
+# A sheet stores energy as an anchor: the value at `energy_updated_at`. One point
+# regenerates every ENERGY_REGEN_SECONDS after that, up to MAX_ENERGY, so nothing
+# has to tick. Anything that changes energy must settle_energy() first.
+
+
+def _regenerate(record, now: float) -> tuple:
+    """(current energy, timestamp it is current as of, keeping partial progress)."""
+    energy = record.get("energy", MAX_ENERGY)
+    if energy >= MAX_ENERGY:
+        return energy, now  # Full: the regeneration clock is idle
+    anchor = record.get("energy_updated_at") or now
+    points = max(0, int((now - anchor) // ENERGY_REGEN_SECONDS))
+    if energy + points >= MAX_ENERGY:
+        return MAX_ENERGY, now
+    return energy + points, anchor + points * ENERGY_REGEN_SECONDS
+
+
+def current_energy(record, now: float | None = None) -> int:
+    return _regenerate(record, time.time() if now is None else now)[0]
+
+
+def settle_energy(record, now: float | None = None) -> int:
+    """Folds the regenerated points into record["energy"] and returns it.
+
+    The player's energy stays the same (only how it is stored changes), so the
+    sheet does not need saving just for this.
+    """
+    energy, updated_at = _regenerate(record, time.time() if now is None else now)
+    record["energy"] = energy
+    record["energy_updated_at"] = updated_at
+    return energy
+
+
+def seconds_to_next_energy(record, now: float | None = None) -> float:
+    """0 if the energy is full."""
+    now = time.time() if now is None else now
+    energy, updated_at = _regenerate(record, now)
+    if energy >= MAX_ENERGY:
+        return 0.0
+    return updated_at + ENERGY_REGEN_SECONDS - now
+
+
+# --- MIGRAÇÃO DE FICHAS ---
+# Bump SCHEMA_VERSION and append a step to _MIGRATIONS whenever the sheet layout changes.
+SCHEMA_VERSION = 2
+
+# Fields every sheet has since ClassChooserView.confirm_button started writing them.
+PLAYER_DEFAULTS = {
+    "inventory": {},
+    "cooldowns": {},
+    "status": "online",
+    "bounty": 0,
+    "kills": 0,
+    "deaths": 0,
+    "energy": MAX_ENERGY,
+    "current_transformation": None,
+    "transform_end_time": 0,
+    "aura_blessing_active": False,
+    "aura_blessing_end_time": 0,
+    "bencao_dracula_active": False,
+    "bencao_dracula_end_time": 0,
+    "amulet_used_since_revive": False,
+    "attribute_points": 0,
+    "location": STARTING_LOCATION,
+    "xptriple": False,
+    "money_double": False,
+}
+
+# Written by older versions of the bot and no longer read anywhere.
+DEAD_FIELDS = (
+    "is_transformed",
+    "transform_name",
+    "attack",
+    "special_attack",
+    "amulet_pvp_activated_this_duel",
+)
+
+
+def _migrate_to_v1(record: dict) -> None:
+    # Old transformation flags: keep an active transformation under the new key.
+    if record.get("is_transformed") and not record.get("current_transformation"):
+        record["current_transformation"] = record.get("transform_name")
+    for dead in DEAD_FIELDS:
+        record.pop(dead, None)
+    for key, default in PLAYER_DEFAULTS.items():
+        if key not in record:
+            record[key] = default.copy() if isinstance(default, dict) else default
+
+
+def _migrate_to_v2(record: dict) -> None:
+    # Energy used to be topped up by a task every minute; now it regenerates from here.
+    record.setdefault("energy_updated_at", time.time())
+
+
+# _MIGRATIONS[n] upgrades a sheet from version n
+_MIGRATIONS = [_migrate_to_v1, _migrate_to_v2]
+
+
+def migrate_player(record: dict) -> bool:
+    """Upgrades a raw sheet in place to SCHEMA_VERSION. Returns True if it changed."""
+    version = record.get("schema_version", 0)
+    if version >= SCHEMA_VERSION:
+        return False
+    for step in _MIGRATIONS[version:]:
+        step(record)
+    record["schema_version"] = SCHEMA_VERSION
+    return True
@@ -0,0 +1,84 @@
+# player_locks.py
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+
+
+class PlayerLocks:
+    """One asyncio.Lock per player, created on first use and dropped when unused.
+
+    Only code that reads a sheet, awaits, and then writes it back needs a lock:
+    everything between two awaits already runs without interruption. Locks are
+    not reentrant, so a holder must not call anything that acquires the same one.
+    """
+
+    def __init__(self):
+        self._locks = weakref.WeakValueDictionary()
+
+    def _lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    def locked(self, user_id) -> bool:
+        lock = self._locks.get(str(user_id))
+        return lock is not None and lock.locked()
+
+    @asynccontextmanager
+    async def acquire(self, *user_ids):
+        """Holds the locks of every given player.
+
+        They are always taken in sorted ID order, so two tasks locking the same
+        players (e.g. attacker and target of a duel) cannot deadlock.
+        """
+        locks = [self._lock(uid) for uid in sorted({str(uid) for uid in user_ids})]
+        acquired = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+class PlayerTransaction:
+    """Stages changes to player sheets and applies them together in commit().
+
+    Changes are relative where it matters (`add`), so a fight that took a while
+    to resolve adds its result to whatever the sheet holds at commit time
+    instead of overwriting changes made meanwhile. Every new value is computed
+    before any is written, so a failing commit leaves the sheets untouched.
+    Works on any mapping: a sheet, its inventory or its cooldowns.
+    """
+
+    def __init__(self):
+        self._changes = []  # (mapping, key, function of the current value)
+
+    def set(self, record, key, value) -> None:
+        self._changes.append((record, key, lambda current: value))
+
+    def add(self, record, key, amount, minimum=None, maximum=None) -> None:
+        """Adds `amount` to the value at commit time, clamped to [minimum, maximum]."""
+
+        def update(current):
+            value = current + amount
+            if maximum is not None:
+                value = min(maximum, value)
+            if minimum is not None:
+                value = max(minimum, value)
+            return value
+
+        self._changes.append((record, key, update))
+
+    def commit(self) -> None:
+        staged = {}  # (id(mapping), key) -> [mapping, key, new value]
+        for record, key, update in self._changes:
+            slot = staged.get((id(record), key))
+            current = slot[2] if slot else record.get(key, 0)
+            staged[(id(record), key)] = [record, key, update(current)]
+        for record, key, value in staged.values():
+            record[key] = value
+        self._changes.clear()
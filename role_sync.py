@@ -0,0 +1,116 @@
+# role_sync.py
+import asyncio
+from bisect import bisect_right
+
+import discord
+
+
+class RoleReconciler:
+    """Keeps members' game roles (level role, new-character role) as their sheets say.
+
+    A member's wanted roles are recomputed only when track() is told their
+    level or status may have changed. Members whose wanted roles changed, or
+    whose roles someone else edited (roles_changed()), go into a dirty set.
+    One worker drains it, compares with the member's cached roles and edits
+    only what differs, at most `per_second` edits a second. Nothing is
+    rescanned periodically, so idle cost does not grow with the player count.
+    """
+
+    def __init__(self, level_roles: dict, base_role_id: int | None, per_second: float):
+        # Required levels, ascending, and the role ID for each, for bisect
+        self._role_levels = sorted(level_roles)
+        self._role_ids = [level_roles[level] for level in self._role_levels]
+        self.level_role_ids = frozenset(level_roles.values())
+        self.base_role_id = base_role_id  # Given to every character, never removed
+        self.managed = self.level_role_ids | {base_role_id} - {None}
+        self._interval = 1 / per_second
+        self._wanted = {}  # Member ID -> frozenset of role IDs; None leaves them be
+        self._dirty = set()
+        self._wakeup = asyncio.Event()
+        self.edits = 0
+
+    def level_role(self, level: int) -> int | None:
+        """ID of the role for the highest required level <= `level`."""
+        index = bisect_right(self._role_levels, level)
+        return self._role_ids[index - 1] if index else None
+
+    def wanted_roles(self, level: int, status: str) -> frozenset | None:
+        if status == "afk":
+            return None  # AFK players' roles are not touched
+        roles = {self.base_role_id, self.level_role(level)} - {None}
+        return frozenset(roles)
+
+    def track(self, member_id, level: int, status: str) -> None:
+        member_id = int(member_id)
+        wanted = self.wanted_roles(level, status)
+        if member_id in self._wanted and self._wanted[member_id] == wanted:
+            return
+        self._wanted[member_id] = wanted
+        if wanted is not None:
+            self.mark(member_id)
+
+    def synced(self, member_id, level: int, status: str) -> None:
+        """Like track(), for a member whose roles were just set to target_roles()
+        directly (e.g. on level-up): records them without queueing a second edit."""
+        member_id = int(member_id)
+        self._wanted[member_id] = self.wanted_roles(level, status)
+        self._dirty.discard(member_id)
+
+    def mark(self, member_id) -> None:
+        self._dirty.add(int(member_id))
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def diff(self, member: discord.Member, wanted: frozenset) -> tuple:
+        """(role IDs to add, role IDs to remove)."""
+        have = {role.id for role in member.roles} & self.managed
+        return wanted - have, (have & self.level_role_ids) - wanted
+
+    def target_roles(
+        self, guild: discord.Guild, member: discord.Member, wanted: frozenset
+    ) -> list | None:
+        """The member's full role list (without @everyone) with the game roles as
+        wanted, for a single member.edit(); None if nothing would change."""
+        add_ids, remove_ids = self.diff(member, wanted)
+        to_add = [role for role in map(guild.get_role, add_ids) if role]
+        if not to_add and not remove_ids:
+            return None
+        roles = [role for role in member.roles[1:] if role.id not in remove_ids]
+        return roles + to_add
+
+    def roles_changed(self, member: discord.Member) -> None:
+        """For on_member_update: re-marks a member whose game roles were edited."""
+        wanted = self._wanted.get(member.id)
+        if wanted is not None and any(self.diff(member, wanted)):
+            self.mark(member.id)
+
+    async def run(self, guild: discord.Guild):
+        while True:
+            if not self._dirty:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if await self._reconcile(guild, self._dirty.pop()):
+                await asyncio.sleep(self._interval)
+
+    async def _reconcile(self, guild: discord.Guild, member_id: int) -> bool:
+        """Brings one member in line; True if it cost a request."""
+        wanted = self._wanted.get(member_id)
+        member = guild.get_member(member_id)
+        if wanted is None or member is None:
+            return False
+        roles = self.target_roles(guild, member, wanted)
+        if roles is None:
+            return False
+        try:
+            await member.edit(roles=roles, reason="Sincronização de cargos de nível.")
+            self.edits += 1
+        except discord.Forbidden:
+            print(
+                f"PERMISSÃO NEGADA: Não foi possível sincronizar os cargos de {member.display_name}."
+            )
+        except discord.HTTPException as e:
+            print(f"ERRO HTTP ao sincronizar cargos de {member.display_name}: {e}")
+        return True
@@ -0,0 +1,248 @@
+# stats.py
+from dataclasses import dataclass
+from itertools import product
+from types import MappingProxyType
+
+from config import CLASS_TRANSFORMATIONS, ITEMS_DATA
+from player import Player
+
+# Each class has one item that changes its stats or cooldowns.
+CLASS_ITEMS = {
+    "Lutador": "manopla_lutador",
+    "Espadachim": "espada_fantasma",
+    "Curandeiro": "cajado_curandeiro",
+    "Atirador": "mira_semi_automatica",
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Modifiers:
+    """Everything a player's class, transformation, blessings and class item change.
+
+    Stat steps are applied in order as `int(value * multiplier + flat)`, so the
+    results match the layer-by-layer rounding of the original formulas.
+    """
+
+    attack_steps: tuple = ()
+    special_attack_steps: tuple = ()
+    max_hp_steps: tuple = ()
+    healing_multiplier: float = 1.0
+    evasion_chance_bonus: float = 0.0
+    # Blessing and transformation cooldown reductions, then the class item's.
+    cooldown_reductions: tuple = ()
+    item_cooldown_reductions: tuple = ()
+    # Bênção de Drácula (0.0 unless it is active on a Vampiro).
+    dracula_evasion_chance: float = 0.0
+    dracula_hp_steal_percent: float = 0.0
+
+    def attack_cooldown(self, seconds: int) -> int:
+        """Attack cooldown after blessing, transformation and class item reductions."""
+        for reduction in self.cooldown_reductions + self.item_cooldown_reductions:
+            seconds = int(seconds * (1 - reduction))
+        return seconds
+
+    def heal_cooldown(self, seconds: int) -> int:
+        """Healing cooldown; the class item does not shorten it."""
+        for reduction in self.cooldown_reductions:
+            seconds = int(seconds * (1 - reduction))
+        return seconds
+
+    def special_energy_cost(self, cost: int) -> int:
+        """Energy cost of a special attack; the cooldown reductions apply to it too."""
+        for reduction in self.cooldown_reductions + self.item_cooldown_reductions:
+            cost = max(1, int(cost * (1 - reduction)))
+        return cost
+
+
+def _compile_modifiers(
+    class_name, transformation, aura_active, dracula_active, has_class_item, innate
+) -> Modifiers:
+    attack_steps, special_steps, hp_steps = [], [], []
+    healing_multiplier = 1.0
+    evasion_chance_bonus = 0.0
+    cooldown_reductions, item_cooldown_reductions = [], []
+
+    transform_info = (
+        CLASS_TRANSFORMATIONS.get(class_name, {}).get(transformation)
+        if transformation
+        else None
+    )
+    if transform_info:
+        attack_steps.append((transform_info.get("attack_multiplier", 1.0), 0))
+        special_steps.append((transform_info.get("special_attack_multiplier", 1.0), 0))
+        hp_steps.append((transform_info.get("hp_multiplier", 1.0), 0))
+        healing_multiplier *= transform_info.get("healing_multiplier", 1.0)
+        evasion_chance_bonus += transform_info.get("evasion_chance_bonus", 0.0)
+
+    king_henry_blessing_info = ITEMS_DATA.get("bencao_rei_henrique", {})
+    if aura_active:
+        attack_steps.append((king_henry_blessing_info.get("attack_multiplier", 1.0), 0))
+        special_steps.append(
+            (king_henry_blessing_info.get("special_attack_multiplier", 1.0), 0)
+        )
+        hp_steps.append((king_henry_blessing_info.get("max_hp_multiplier", 1.0), 0))
+        healing_multiplier *= king_henry_blessing_info.get("healing_multiplier", 1.0)
+        cooldown_reductions.append(
+            king_henry_blessing_info.get("cooldown_reduction_percent", 0.0)
+        )
+    if transform_info and "cooldown_reduction_percent" in transform_info:
+        cooldown_reductions.append(transform_info["cooldown_reduction_percent"])
+
+    item_info = ITEMS_DATA.get(CLASS_ITEMS.get(class_name), {})
+    if has_class_item:
+        if class_name == "Lutador":
+            attack_steps.append((1 + item_info.get("attack_bonus_percent", 0.0), 0))
+            hp_steps.append((1, item_info.get("hp_bonus_flat", 0)))
+        elif class_name == "Espadachim":
+            attack_steps.append((1 + item_info.get("attack_bonus_percent", 0.0), 0))
+            hp_steps.append((1 - item_info.get("hp_penalty_percent", 0.0), 0))
+        elif class_name == "Curandeiro":
+            healing_multiplier *= item_info.get("effect_multiplier", 1.0)
+        elif class_name == "Atirador":
+            item_cooldown_reductions.append(
+                item_info.get("cooldown_reduction_percent", 0.0)
+            )
+
+    if innate:
+        # Passive attack bonus from "Habilidade Inata" (final layer)
+        habilidade_inata_info = ITEMS_DATA.get("habilidade_inata", {})
+        attack_steps.append(
+            (1 + habilidade_inata_info.get("attack_bonus_passive_percent", 0.0), 0)
+        )
+
+    dracula_evasion_chance = dracula_hp_steal_percent = 0.0
+    if dracula_active and class_name == "Vampiro":
+        dracula_info = ITEMS_DATA.get("bencao_dracula", {})
+        dracula_evasion_chance = dracula_info.get("evasion_chance", 0.0)
+        if transformation == "Rei da Noite":
+            dracula_evasion_chance += (
+                CLASS_TRANSFORMATIONS.get("Vampiro", {})
+                .get("Rei da Noite", {})
+                .get("evasion_chance_bonus", 0.0)
+            )
+        dracula_hp_steal_percent = dracula_info.get("hp_steal_percent_on_evade", 0.0)
+
+    return Modifiers(
+        attack_steps=tuple(attack_steps),
+        special_attack_steps=tuple(special_steps),
+        max_hp_steps=tuple(hp_steps),
+        healing_multiplier=healing_multiplier,
+        evasion_chance_bonus=evasion_chance_bonus,
+        cooldown_reductions=tuple(cooldown_reductions),
+        item_cooldown_reductions=tuple(item_cooldown_reductions),
+        dracula_evasion_chance=dracula_evasion_chance,
+        dracula_hp_steal_percent=dracula_hp_steal_percent,
+    )
+
+
+# (class, transformation, aura blessing, Drácula blessing, class item, Habilidade
+# Inata) -> Modifiers, for every combination config.py allows. Built once at import.
+MODIFIER_TABLE = MappingProxyType(
+    {
+        key: _compile_modifiers(*key)
+        for class_name, transformations in CLASS_TRANSFORMATIONS.items()
+        for key in product(
+            (class_name,),
+            (None, *transformations),
+            (False, True),
+            (False, True),
+            (False, True),
+            (False, True),
+        )
+    }
+)
+
+
+def player_modifiers(raw_player_data: Player) -> Modifiers:
+    """The player's row of MODIFIER_TABLE."""
+    class_name = raw_player_data.player_class
+    item_id = CLASS_ITEMS.get(class_name)
+    key = (
+        class_name,
+        raw_player_data.current_transformation or None,
+        bool(raw_player_data.aura_blessing_active),
+        bool(raw_player_data.bencao_dracula_active),
+        item_id is not None and (raw_player_data.inventory or {}).get(item_id, 0) > 0,
+        raw_player_data.style == "Habilidade Inata",
+    )
+    modifiers = MODIFIER_TABLE.get(key)
+    if modifiers is None:  # Class or transformation no longer in config.py
+        modifiers = _compile_modifiers(*key)
+    return modifiers
+
+
+def _apply_steps(value: int, steps: tuple) -> int:
+    for multiplier, flat in steps:
+        value = int(value * multiplier + flat)
+    return value
+
+
+@dataclass(slots=True, frozen=True)
+class EffectiveStats:
+    """A player's stats after transformation, blessing, item and passive bonuses.
+
+    Current HP is not included: it changes every hit and callers read it from
+    the sheet, so it does not invalidate the cached stats.
+    """
+
+    attack: int
+    special_attack: int
+    max_hp: int
+    healing_multiplier: float = 1.0
+    evasion_chance_bonus: float = 0.0
+    attack_bonus_passive_percent: float = 0.0
+
+
+def calculate_effective_stats(raw_player_data: Player) -> EffectiveStats:
+    """Calculates a player's effective stats based on their base stats, transformation, and inventory items.
+    Does NOT modify the original raw_player_data.
+
+    The result is cached on the sheet until a field that feeds it changes
+    (see Player.stats_key()), so repeated calls are a tuple comparison.
+    """
+    key = raw_player_data.stats_key()
+    cached = raw_player_data._stats_cache
+    if cached is not None and key is not None and cached[0] == key:
+        return cached[1]
+
+    stats = _compute_effective_stats(raw_player_data)
+    raw_player_data._stats_cache = (key, stats)
+    return stats
+
+
+def _compute_effective_stats(raw_player_data: Player) -> EffectiveStats:
+    modifiers = player_modifiers(raw_player_data)
+    innate = raw_player_data.style == "Habilidade Inata"
+    return EffectiveStats(
+        attack=_apply_steps(raw_player_data.base_attack, modifiers.attack_steps),
+        special_attack=_apply_steps(
+            raw_player_data.base_special_attack, modifiers.special_attack_steps
+        ),
+        max_hp=_apply_steps(raw_player_data.max_hp, modifiers.max_hp_steps),
+        healing_multiplier=modifiers.healing_multiplier,
+        evasion_chance_bonus=modifiers.evasion_chance_bonus,
+        attack_bonus_passive_percent=(
+            ITEMS_DATA.get("habilidade_inata", {}).get(
+                "attack_bonus_passive_percent", 0.0
+            )
+            if innate
+            else 0.0
+        ),
+    )
+
+
+def apply_class_item_hp(raw_player_data: Player, item_id: str) -> None:
+    """Changes max_hp (and hp) the way buying `item_id` does, once, at purchase:
+    the Manopla adds flat HP to a Lutador, the Espada Fantasma takes a share of
+    an Espadachim's. Other items and classes are left as they are."""
+    if CLASS_ITEMS.get(raw_player_data["class"]) != item_id:
+        return
+    item_info = ITEMS_DATA.get(item_id, {})
+    hp_bonus = item_info.get("hp_bonus_flat", 0)
+    hp_bonus -= int(
+        raw_player_data["max_hp"] * item_info.get("hp_penalty_percent", 0.0)
+    )
+    raw_player_data["max_hp"] = max(1, raw_player_data["max_hp"] + hp_bonus)
+    raw_player_data["hp"] = min(
+        raw_player_data["hp"] + max(0, hp_bonus), raw_player_data["max_hp"]
+    )
@@ -0,0 +1,509 @@
+# storage.py
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+
+from player import Player
+
+
+def copy_record(record: dict) -> dict:
+    """Detached copy of a sheet that another thread can serialize safely.
+
+    Sheets only nest flat mappings (inventory, cooldowns) of scalars, so one
+    level of copying is enough. Also turns a Player into a plain dict.
+    """
+    return {k: dict(v) if isinstance(v, Mapping) else v for k, v in record.items()}
+
+
+def load_json(path: str, default=None):
+    """Reads a small JSON file; `default` if it does not exist yet."""
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json_atomic(path: str, data) -> None:
+    """Writes `data` to a temporary file and swaps it in, like the player stores do."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class JsonPlayerStore:
+    """Stores every player sheet in the single JSON file used by the bot.
+
+    Each record is kept as its own encoded JSON fragment, so a save only
+    re-encodes the players that changed and reuses the cached text for the rest.
+    The file written is byte-for-byte what `json.dump(database, f, indent=4)` produces.
+
+    Saving is split in two: `snapshot()` runs on the event loop and only copies
+    what changed, `write_snapshot()` encodes and writes it and may run in a worker
+    thread. The file is replaced atomically, so a crash never leaves it half-written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fragments = {}
+        self._write_lock = threading.Lock()
+
+    def load_all(self) -> dict:
+        """Reads the whole file. Raises json.JSONDecodeError / IOError on failure."""
+        self._fragments.clear()
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def snapshot(self, database: dict, user_ids=None) -> list:
+        """Captures the current state; `user_ids` (or everyone if None) are re-encoded."""
+        if user_ids is None:
+            self._fragments.clear()
+        else:
+            for user_id in user_ids:
+                self._fragments.pop(user_id, None)
+
+        entries = []
+        for user_id, record in database.items():
+            fragment = self._fragments.get(user_id)
+            entries.append((user_id, fragment or copy_record(record)))
+        return entries
+
+    def write_snapshot(self, entries: list) -> dict:
+        """Encodes and writes a snapshot. Returns the fragments it had to encode."""
+        encoded, parts = {}, []
+        for user_id, item in entries:
+            if isinstance(item, str):
+                fragment = item
+            else:
+                # Nested lines need one extra indentation level inside the top-level object.
+                fragment = json.dumps(item, indent=4).replace("\n", "\n    ")
+                encoded[user_id] = fragment
+            parts.append(f"    {json.dumps(user_id)}: {fragment}")
+        text = "{\n" + ",\n".join(parts) + "\n}" if parts else "{}"
+
+        with self._write_lock:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        return encoded
+
+    def adopt(self, database: dict, encoded: dict) -> None:
+        """Caches fragments returned by write_snapshot(); call it on the event loop."""
+        self._fragments.update(encoded)
+        if len(self._fragments) > len(database):
+            for user_id in [u for u in self._fragments if u not in database]:
+                del self._fragments[user_id]
+
+    def save(self, database: dict, user_ids=None) -> None:
+        """Blocking save: snapshot and write in the calling thread."""
+        self.adopt(database, self.write_snapshot(self.snapshot(database, user_ids)))
+
+
+class JournalPlayerStore(JsonPlayerStore):
+    """JSON snapshot plus an append-only log of field changes.
+
+    A save appends one compact line per changed field
+    (`{"u": user_id, "f": field, "v": value, "t": timestamp}`; no "v" means the
+    field was removed, no "f" means the player was) instead of rewriting the file.
+    Compaction folds the log back into a fresh snapshot. Loading reads the snapshot
+    and replays the log on top of it.
+    """
+
+    def __init__(self, path: str, journal_path: str):
+        super().__init__(path)
+        self.journal_path = journal_path
+        self._persisted = {}  # user_id -> copy of the sheet as the journal knows it
+        self._changed_since_compaction = set()
+
+    def load_all(self) -> dict:
+        database = super().load_all()
+        self._changed_since_compaction = self._replay(database)
+        self._persisted = {uid: copy_record(r) for uid, r in database.items()}
+        return database
+
+    def _replay(self, database: dict) -> set:
+        touched = set()
+        if not os.path.exists(self.journal_path):
+            return touched
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Only the last line can be cut short by a crash mid-append.
+                    print(
+                        f"AVISO: journal incompleto na linha {line_number}; o restante foi ignorado."
+                    )
+                    break
+                user_id = entry["u"]
+                touched.add(user_id)
+                if "f" not in entry:
+                    database.pop(user_id, None)
+                elif "v" in entry:
+                    database.setdefault(user_id, {})[entry["f"]] = entry["v"]
+                elif user_id in database:
+                    database[user_id].pop(entry["f"], None)
+        return touched
+
+    def _diff(self, user_id: str, record, now: float):
+        """Journal entries turning the persisted copy into `record`, and the new copy."""
+        before = self._persisted.get(user_id)
+        if record is None:
+            return (
+                ([{"u": user_id, "t": now}], None) if before is not None else ([], None)
+            )
+
+        before = before or {}
+        changed = [f for f, v in record.items() if f not in before or before[f] != v]
+        removed = [f for f in before if f not in record]
+        if not changed and not removed:
+            return [], before
+
+        copy = copy_record(record)
+        entries = [{"u": user_id, "f": f, "v": copy[f], "t": now} for f in changed]
+        entries += [{"u": user_id, "f": f, "t": now} for f in removed]
+        return entries, copy
+
+    def snapshot(self, database: dict, user_ids=None, compact: bool = False) -> tuple:
+        """Journal entries for `user_ids` (or everyone); `compact` also snapshots the file."""
+        if user_ids is None or compact:
+            user_ids = database.keys() | self._persisted.keys()
+
+        now = round(time.time(), 3)
+        entries, persisted = [], {}
+        for user_id in user_ids:
+            record_entries, copy = self._diff(user_id, database.get(user_id), now)
+            if record_entries:
+                entries += record_entries
+                persisted[user_id] = copy
+
+        compaction = None
+        if compact:
+            changed = self._changed_since_compaction.union(persisted)
+            compaction = super().snapshot(database, list(changed))
+        return entries, persisted, compaction
+
+    def write_snapshot(self, snapshot: tuple) -> tuple:
+        entries, persisted, compaction = snapshot
+        if entries:
+            lines = "".join(
+                json.dumps(e, separators=(",", ":")) + "\n" for e in entries
+            )
+            with self._write_lock, open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+        encoded = None
+        if compaction is not None:
+            # The journal already ends with the snapshot's values (appended above),
+            # so a crash before the truncation below replays to the same state.
+            encoded = super().write_snapshot(compaction)
+            with self._write_lock, open(self.journal_path, "w", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+        return persisted, encoded
+
+    def adopt(self, database: dict, result: tuple) -> None:
+        persisted, encoded = result
+        for user_id, copy in persisted.items():
+            if copy is None:
+                self._persisted.pop(user_id, None)
+            else:
+                self._persisted[user_id] = copy
+
+        if encoded is None:
+            self._changed_since_compaction.update(persisted)
+        else:
+            super().adopt(database, encoded)
+            self._changed_since_compaction.clear()
+
+
+# Fields copied into their own indexed columns; everything else goes into `data`.
+HOT_COLUMNS = ("level", "kills", "money", "bounty", "location", "status")
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    user_id  TEXT PRIMARY KEY,
+    level    INTEGER,
+    kills    INTEGER,
+    money    INTEGER,
+    bounty   INTEGER,
+    location TEXT,
+    status   TEXT,
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_players_ranking ON players (kills DESC, level DESC, money DESC);
+CREATE INDEX IF NOT EXISTS idx_players_level ON players (level);
+CREATE INDEX IF NOT EXISTS idx_players_bounty ON players (bounty);
+CREATE INDEX IF NOT EXISTS idx_players_location ON players (location);
+CREATE INDEX IF NOT EXISTS idx_players_status ON players (status);
+"""
+
+
+class SqlitePlayerStore:
+    """Stores one row per player in a SQLite database running in WAL mode.
+
+    Saving a player is a single-row upsert, and the ranking is answered by an
+    index instead of scanning every sheet. Reads use `conn` on the
+    event loop; writes go through a separate connection so they can run in a
+    worker thread without blocking readers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SQLITE_SCHEMA)
+        self._write_conn = sqlite3.connect(path, check_same_thread=False)
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_lock = threading.Lock()
+
+    @staticmethod
+    def _to_row(user_id: str, record: dict) -> tuple:
+        rest = {k: v for k, v in record.items() if k not in HOT_COLUMNS}
+        hot = tuple(record.get(column) for column in HOT_COLUMNS)
+        return (user_id, *hot, json.dumps(rest))
+
+    @staticmethod
+    def _from_row(row: tuple) -> dict:
+        record = json.loads(row[-1])
+        for column, value in zip(HOT_COLUMNS, row[1:-1]):
+            if value is not None:  # NULL means the sheet never had this field
+                record[column] = value
+        return record
+
+    def load_all(self) -> dict:
+        cursor = self.conn.execute(
+            f"SELECT user_id, {', '.join(HOT_COLUMNS)}, data FROM players"
+        )
+        return {row[0]: self._from_row(row) for row in cursor}
+
+    def load_player(self, user_id: str):
+        """One sheet, or None if the player has none."""
+        row = self.conn.execute(
+            f"SELECT user_id, {', '.join(HOT_COLUMNS)}, data FROM players WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def exists(self, user_id: str) -> bool:
+        cursor = self.conn.execute(
+            "SELECT 1 FROM players WHERE user_id = ?", (user_id,)
+        )
+        return cursor.fetchone() is not None
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def snapshot(self, database: dict, user_ids=None) -> tuple:
+        """Copies `user_ids` (or everyone if None); IDs missing from `database` are deleted."""
+        if isinstance(database, LazyPlayerDatabase):
+            # Only sheets in memory can have unsaved changes; never prune the rest.
+            records = database.loaded_records(user_ids)
+            return False, [
+                (uid, copy_record(r) if r is not None else None)
+                for uid, r in records.items()
+            ]
+        if user_ids is None:
+            return True, [(uid, copy_record(r)) for uid, r in database.items()]
+        return False, [
+            (uid, copy_record(database[uid]) if uid in database else None)
+            for uid in user_ids
+        ]
+
+    def write_snapshot(self, snapshot: tuple) -> dict:
+        full, entries = snapshot
+        rows = [
+            self._to_row(uid, record) for uid, record in entries if record is not None
+        ]
+        removed = [(uid,) for uid, record in entries if record is None]
+
+        with self._write_lock, self._write_conn as conn:
+            if full:
+                kept = {uid for uid, _ in entries}
+                removed = [
+                    row
+                    for row in conn.execute("SELECT user_id FROM players")
+                    if row[0] not in kept
+                ]
+            if rows:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO players (user_id, {', '.join(HOT_COLUMNS)}, data) "
+                    f"VALUES ({', '.join('?' * (len(HOT_COLUMNS) + 2))})",
+                    rows,
+                )
+            if removed:
+                conn.executemany("DELETE FROM players WHERE user_id = ?", removed)
+        return {}
+
+    def adopt(self, database: dict, encoded: dict) -> None:
+        pass  # Nothing is cached between saves
+
+    def save(self, database: dict, user_ids=None) -> None:
+        """Blocking save: upserts `user_ids` (or every player if None)."""
+        self.write_snapshot(self.snapshot(database, user_ids))
+
+    def top_player_ids(self, limit: int) -> list:
+        """IDs ordered like /ranking (kills, then level, then money), via the index."""
+        cursor = self.conn.execute(
+            "SELECT user_id FROM players "
+            "ORDER BY kills DESC, level DESC, money DESC LIMIT ?",
+            (limit,),
+        )
+        return [row[0] for row in cursor]
+
+    def import_json(self, json_path: str) -> int:
+        """One-shot migration from the legacy JSON file. Returns the number of players."""
+        with open(json_path, "r", encoding="utf-8") as f:
+            database = json.load(f)
+        self.save(database, list(database))
+        return len(database)
+
+
+class LazyPlayerDatabase(MutableMapping):
+    """Player sheets loaded from a SqlitePlayerStore on first access, kept in an LRU.
+
+    At most `capacity` sheets stay resident. Iteration, `len()` and `items()` only
+    see resident sheets; use `count()` and the store's indexed queries for
+    questions about every player.
+
+    An evicted sheet that `has_unsaved_changes(user_id)` is parked until a save
+    writes it (`release_saved()`). A clean one is dropped, but stays reachable
+    through a weak reference while some handler still holds it, so a later
+    access returns the same object instead of a stale copy from disk.
+    """
+
+    def __init__(
+        self,
+        store: SqlitePlayerStore,
+        capacity: int,
+        has_unsaved_changes,
+        on_load=None,
+    ):
+        self.store = store
+        self._on_load = on_load  # Called with (user_id, raw sheet) before first use
+        self.capacity = max(1, capacity)
+        self._has_unsaved_changes = has_unsaved_changes
+        self._resident = OrderedDict()
+        self._parked = {}  # Evicted but not yet saved
+        self._evicted = weakref.WeakValueDictionary()
+        self._deleted = set()
+
+    def __getitem__(self, user_id: str) -> Player:
+        record = self._resident.get(user_id)
+        if record is not None:
+            self._resident.move_to_end(user_id)
+            return record
+        if user_id in self._deleted:
+            raise KeyError(user_id)
+
+        record = self._parked.pop(user_id, None)
+        if record is None:
+            record = self._evicted.pop(user_id, None)
+        if record is None:
+            record = self.store.load_player(user_id)
+            if record is None:
+                raise KeyError(user_id)
+            if self._on_load is not None:
+                self._on_load(user_id, record)
+            record = Player.from_dict(record)
+        self._resident[user_id] = record
+        self._evict()
+        return record
+
+    def __setitem__(self, user_id: str, record: Player) -> None:
+        if not isinstance(record, Player):
+            record = Player.from_dict(record)
+        self._deleted.discard(user_id)
+        self._parked.pop(user_id, None)
+        self._evicted.pop(user_id, None)
+        self._resident[user_id] = record
+        self._resident.move_to_end(user_id)
+        self._evict()
+
+    def __delitem__(self, user_id: str) -> None:
+        if user_id not in self:
+            raise KeyError(user_id)
+        self._resident.pop(user_id, None)
+        self._parked.pop(user_id, None)
+        self._evicted.pop(user_id, None)
+        self._deleted.add(user_id)
+
+    def __contains__(self, user_id) -> bool:
+        if user_id in self._resident or user_id in self._parked:
+            return True
+        if user_id in self._deleted:
+            return False
+        return user_id in self._evicted or self.store.exists(user_id)
+
+    def __iter__(self):
+        return iter(list(self._resident))  # Handlers may load sheets mid-scan
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def items(self):
+        """Resident (user_id, sheet) pairs, without touching the LRU order."""
+        return list(self._resident.items())
+
+    def values(self):
+        return list(self._resident.values())
+
+    def count(self) -> int:
+        """Number of players in the store, including the ones not loaded."""
+        return self.store.count()
+
+    def _evict(self) -> None:
+        while len(self._resident) > self.capacity:
+            user_id, record = self._resident.popitem(last=False)
+            if self._has_unsaved_changes(user_id):
+                self._parked[user_id] = record
+            else:
+                self._evicted[user_id] = record
+
+    def keep_until_saved(self, user_id: str) -> None:
+        """Parks an evicted sheet that was changed after its eviction."""
+        record = self._evicted.pop(user_id, None)
+        if record is not None:
+            self._parked[user_id] = record
+
+    def loaded_records(self, user_ids=None) -> dict:
+        """In-memory sheets for `user_ids` (or all of them); deleted ones map to None."""
+        records = {**self._evicted, **self._parked, **self._resident}
+        records.update(dict.fromkeys(self._deleted))
+        if user_ids is None:
+            return records
+        return {uid: records[uid] for uid in user_ids if uid in records}
+
+    def release_saved(self) -> None:
+        """Drops parked sheets (and deletions) whose changes have been written."""
+        for user_id in [u for u in self._parked if not self._has_unsaved_changes(u)]:
+            self._evicted[user_id] = self._parked.pop(user_id)
+        self._deleted = {u for u in self._deleted if self._has_unsaved_changes(u)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Importa o outlaws_data.json para o banco SQLite."
+    )
+    parser.add_argument("json_path", help="Arquivo JSON de origem.")
+    parser.add_argument("sqlite_path", help="Banco SQLite de destino.")
+    args = parser.parse_args()
+
+    store = SqlitePlayerStore(args.sqlite_path)
+    total = store.import_json(args.json_path)
+    print(f"{total} fichas importadas para {args.sqlite_path}.")
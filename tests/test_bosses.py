@@ -0,0 +1,100 @@
+# tests/test_bosses.py
+import asyncio
+
+import pytest
+
+from bosses import BossManager, boss_rewards
+
+TEMPLATE = {
+    "name": "Colosso",
+    "max_hp": 1000,
+    "attack": 50,
+    "attack_interval_seconds": 0.02,
+    "targets_per_attack": 2,
+    "rewards": {"money": 1000, "xp": 100, "min_share": 0.25, "mvp_bonus": [0.5, 0.1]},
+}
+
+
+def boss_with(participants: dict):
+    async def spawn():
+        manager = BossManager(TEMPLATE)
+        boss = manager.spawn(1, "summoner", summoner_online=False)
+        boss.participants = dict(participants)
+        return boss
+
+    return asyncio.run(spawn())
+
+
+def test_rewards_split_by_damage_with_mvp_bonus():
+    rewards = boss_rewards(boss_with({"a": 600, "b": 300, "c": 100, "d": 0}))
+    # weight = min_share + (1 - min_share) * count * share (+ MVP bonus)
+    assert rewards["a"].money == int(1000 * (0.25 + 0.75 * 4 * 0.6 + 0.5))
+    assert rewards["b"].xp == int(100 * (0.25 + 0.75 * 4 * 0.3 + 0.1))
+    assert rewards["c"].money == int(1000 * (0.25 + 0.75 * 4 * 0.1))
+    assert rewards["d"].money == 250  # Everyone gets min_share
+    assert [rewards[p].mvp_rank for p in "abcd"] == [1, 2, None, None]
+
+
+def test_rewards_without_damage_are_even():
+    boss = boss_with({"a": 0, "b": 0})
+    boss.rewards = dict(boss.rewards, mvp_bonus=[])
+    rewards = boss_rewards(boss)
+    assert rewards["a"] == rewards["b"] == (1000, 100, None)
+
+
+def test_queued_hits_apply_together():
+    boss = boss_with({})
+    boss.queue_hit("a", 100, crit=True)
+    boss.queue_hit("a", 50)
+    boss.queue_hit("b", 30)
+    assert boss.hp == 1000
+    batch = boss.apply_pending()
+    assert (batch.total, batch.hits, batch.crits) == (180, 3, 1)
+    assert boss.hp == 820 and boss.participants["a"] == 150
+    assert boss.apply_pending().hits == 0
+
+
+def test_only_the_first_remove_wins():
+    async def main():
+        manager = BossManager(TEMPLATE)
+        boss = manager.spawn(1, "x", summoner_online=False)
+        assert manager.spawn(1, "y") is None  # One boss per channel
+        assert manager.remove(boss) and not manager.remove(boss)
+        assert manager.get(1) is None
+
+    asyncio.run(main())
+
+
+def test_scheduler_attacks_only_while_someone_is_online():
+    attacks = []
+
+    async def attack(boss):
+        attacks.append(boss.channel_id)
+
+    async def main():
+        manager = BossManager(TEMPLATE, attack)
+        first = manager.spawn(1, "a", summoner_online=False)
+        second = manager.spawn(2, "b", summoner_online=True)
+        await asyncio.sleep(0.1)
+        assert 2 in attacks and 1 not in attacks
+
+        manager.status_changed("a", "online")
+        await asyncio.sleep(0.1)
+        assert 1 in attacks
+
+        manager.remove(first)
+        manager.remove(second)
+        await asyncio.wait_for(manager._scheduler, 1)  # Ends with the last boss
+        attacks.clear()
+        await asyncio.sleep(0.05)
+        assert attacks == []
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("online, expected", [(0, 0.02), (2, 0.02), (8, 0.005)])
+def test_attack_delay_shrinks_with_the_crowd(online, expected):
+    boss = boss_with({})
+    boss.min_attack_interval = 0.001
+    boss.online = {str(n) for n in range(online)}
+    assert boss.attack_delay() == pytest.approx(expected)
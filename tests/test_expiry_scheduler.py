@@ -0,0 +1,43 @@
+# tests/test_expiry_scheduler.py
+import asyncio
+import time
+
+from expiry_scheduler import ExpiryScheduler
+
+
+def test_expiry_scheduler_fires_in_deadline_order():
+    async def on_expire(key):
+        pass
+
+    scheduler = ExpiryScheduler(on_expire)
+    scheduler.schedule("late", 30)
+    scheduler.schedule("early", 10)
+    scheduler.schedule("moved", 5)
+    scheduler.schedule("moved", 40)  # Replaces its deadline
+    scheduler.schedule("gone", 1)
+    scheduler.cancel("gone")
+    assert scheduler.pop_due(now=35) == ["early", "late"]
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(now=100) == ["moved"]
+
+
+def test_expiry_scheduler_runs_due_callbacks():
+    fired = []
+
+    async def on_expire(key):
+        fired.append(key)
+        if key == "bad":
+            raise RuntimeError("falhou")
+
+    async def main():
+        scheduler = ExpiryScheduler(on_expire)
+        runner = asyncio.create_task(scheduler.run())
+        now = time.time()
+        scheduler.schedule("second", now + 0.06)
+        scheduler.schedule("bad", now + 0.02)  # A failure doesn't stop the runner
+        scheduler.schedule("first", now + 0.03)
+        await asyncio.sleep(0.15)
+        runner.cancel()
+
+    asyncio.run(main())
+    assert fired == ["bad", "first", "second"]
@@ -0,0 +1,129 @@
+# tests/test_player.py
+import json
+
+import pytest
+
+from config import ENERGY_REGEN_SECONDS, MAX_ENERGY
+from player import (
+    DEAD_FIELDS,
+    PLAYER_DEFAULTS,
+    SCHEMA_VERSION,
+    UNSET,
+    Cooldowns,
+    Inventory,
+    Player,
+    current_energy,
+    migrate_player,
+    seconds_to_next_energy,
+    settle_energy,
+)
+
+
+def old_sheet() -> dict:
+    """A sheet as written before schema versions existed."""
+    return {
+        "name": "Antigo",
+        "class": "Espadachim",
+        "style": "Aura",
+        "level": 7,
+        "xp": 40,
+        "money": 120,
+        "hp": 90,
+        "max_hp": 200,
+        "base_attack": 20,
+        "base_special_attack": 30,
+        "is_transformed": True,
+        "transform_name": "Lâmina Fantasma",
+        "attack": 99,
+        "special_attack": 99,
+    }
+
+
+def test_migration_fills_defaults_and_drops_dead_fields():
+    record = old_sheet()
+    assert migrate_player(record)
+    assert record["schema_version"] == SCHEMA_VERSION
+    assert record["current_transformation"] == "Lâmina Fantasma"
+    assert not any(dead in record for dead in DEAD_FIELDS)
+    for key, default in PLAYER_DEFAULTS.items():
+        if key != "current_transformation":
+            assert record[key] == default
+    assert "energy_updated_at" in record
+    assert record["name"] == "Antigo" and record["money"] == 120
+
+
+def test_migration_is_idempotent_and_survives_json():
+    record = old_sheet()
+    migrate_player(record)
+    stored = json.loads(json.dumps(record))
+    assert not migrate_player(stored)
+    assert stored == record
+
+
+def test_migrated_defaults_are_not_shared():
+    first, second = old_sheet(), old_sheet()
+    migrate_player(first)
+    migrate_player(second)
+    first["inventory"]["pocao"] = 1
+    assert second["inventory"] == {} and PLAYER_DEFAULTS["inventory"] == {}
+
+
+def test_player_round_trips_every_key():
+    record = old_sheet()
+    migrate_player(record)
+    record["cooldowns"] = {"work_cooldown": 10.5, "message_xp_cooldown": 3.0}
+    record["inventory"] = {"pocao": 2}
+    record["future_field"] = {"a": 1}
+    player = Player.from_dict(record)
+
+    assert player.to_dict() == record
+    assert json.loads(json.dumps(player.to_dict())) == record
+    assert list(player) == list(player.to_dict())
+    assert isinstance(player.cooldowns, Cooldowns)
+    assert isinstance(player.inventory, Inventory)
+    assert player.extras == {"future_field": {"a": 1}}
+
+
+def test_player_behaves_like_the_dict():
+    player = Player.from_dict({"name": "X", "class": "Vampiro"})
+    assert player["class"] == player.player_class == "Vampiro"
+    assert "money" not in player and player.get("money", 5) == 5
+    assert player.money is UNSET and not player.money
+    with pytest.raises(KeyError):
+        player["money"]
+
+    player["money"] = 10
+    player["novo"] = True
+    assert player.money == 10 and player["novo"] is True
+    del player["money"], player["novo"]
+    assert player.to_dict() == {"name": "X", "class": "Vampiro"}
+    with pytest.raises(KeyError):
+        del player["money"]
+
+
+def test_stats_key_changes_with_stat_fields_only():
+    player = Player.from_dict({"max_hp": 100, "inventory": {}, "money": 0})
+    key = player.stats_key()
+    player["money"] = 50
+    assert player.stats_key() == key
+    player["max_hp"] = 110
+    assert player.stats_key() != key
+    key = player.stats_key()
+    player["inventory"]["pocao"] = 1
+    assert player.stats_key() != key
+
+
+def test_energy_regenerates_from_the_anchor():
+    now = 1_000_000.0
+    record = {"energy": MAX_ENERGY - 3, "energy_updated_at": now}
+    later = now + 2 * ENERGY_REGEN_SECONDS + 1
+    assert current_energy(record, later) == MAX_ENERGY - 1
+    assert seconds_to_next_energy(record, later) == pytest.approx(
+        ENERGY_REGEN_SECONDS - 1
+    )
+
+    # Settling keeps partial progress towards the next point
+    assert settle_energy(record, later) == MAX_ENERGY - 1
+    assert record["energy_updated_at"] == now + 2 * ENERGY_REGEN_SECONDS
+    assert current_energy(record, now + 10 * ENERGY_REGEN_SECONDS) == MAX_ENERGY
+    assert seconds_to_next_energy(record, now + 10 * ENERGY_REGEN_SECONDS) == 0.0
@@ -0,0 +1,94 @@
+# tests/test_player_locks.py
+import asyncio
+
+import pytest
+
+from battle_governor import BUSY, FULL, BattleGovernor
+from player_locks import PlayerLocks, PlayerTransaction
+
+
+def test_locks_taken_in_any_order_do_not_deadlock():
+    locks = PlayerLocks()
+    order = []
+
+    async def hold(*user_ids):
+        async with locks.acquire(*user_ids):
+            order.append(user_ids)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.wait_for(
+            asyncio.gather(hold(1, 2), hold("2", 1), hold(2, 3), hold(3, 1)), 1
+        )
+
+    asyncio.run(main())
+    assert len(order) == 4
+
+
+def test_lock_is_held_and_released():
+    locks = PlayerLocks()
+
+    async def main():
+        async with locks.acquire(5, "5"):  # Same player twice: one lock
+            assert locks.locked(5)
+        assert not locks.locked("5")
+
+    asyncio.run(main())
+
+
+def test_locks_released_when_the_body_raises():
+    locks = PlayerLocks()
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with locks.acquire(1, 2):
+                raise RuntimeError
+        assert not locks.locked(1) and not locks.locked(2)
+
+    asyncio.run(main())
+
+
+def test_transaction_applies_deltas_to_current_values():
+    sheet = {"hp": 50, "money": 10, "inventory": {}}
+    txn = PlayerTransaction()
+    txn.add(sheet, "hp", 80, minimum=0, maximum=100)
+    txn.add(sheet, "money", 5)
+    txn.add(sheet, "money", 5)  # Stacks on the staged value
+    txn.add(sheet["inventory"], "pocao", 2)
+    sheet["money"] = 1000  # Changed meanwhile by someone else
+    txn.commit()
+    assert sheet == {"hp": 100, "money": 1010, "inventory": {"pocao": 2}}
+
+
+def test_failed_transaction_changes_nothing():
+    sheet = {"hp": 50, "status": "online", "xp": None}
+    txn = PlayerTransaction()
+    txn.set(sheet, "status", "dead")
+    txn.set(sheet, "hp", 0)
+    txn.add(sheet, "xp", 10)  # None + 10 raises
+    with pytest.raises(TypeError):
+        txn.commit()
+    assert sheet == {"hp": 50, "status": "online", "xp": None}
+
+
+def test_governor_caps_and_queues_fights():
+    governor = BattleGovernor(max_active=1, max_queued=1)
+    assert governor.admit(1) is None
+    assert governor.admit(1) == BUSY
+    assert governor.admit(2) is None and governor.must_wait()
+    assert governor.admit(3) == FULL
+
+    async def main():
+        async with governor.session(1):
+            waiting = asyncio.create_task(enter(2))
+            await asyncio.sleep(0)
+            assert governor.active == 1 and governor.queue_position() == 1
+        await waiting
+
+    async def enter(user_id):
+        async with governor.session(user_id):
+            assert governor.active == 1
+
+    asyncio.run(main())
+    assert governor.metrics()["completed"] == 2
+    assert governor.admit(1) is None  # Free again once finished
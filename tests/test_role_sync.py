@@ -0,0 +1,100 @@
+# tests/test_role_sync.py
+import asyncio
+from types import SimpleNamespace
+
+from role_sync import RoleReconciler
+
+LEVEL_ROLES = {2: 102, 5: 105, 10: 110, 50: 150}
+BASE_ROLE = 900
+
+
+class FakeMember:
+    def __init__(self, member_id, role_ids=()):
+        self.id = member_id
+        self.display_name = f"membro {member_id}"
+        self.roles = [SimpleNamespace(id=0)] + [SimpleNamespace(id=r) for r in role_ids]
+        self.edits = 0
+
+    async def edit(self, roles, reason=None):
+        self.edits += 1
+        self.roles = self.roles[:1] + list(roles)
+
+
+class FakeGuild:
+    def __init__(self, *members):
+        self.members = {member.id: member for member in members}
+        self._roles = {
+            role_id: SimpleNamespace(id=role_id)
+            for role_id in [*LEVEL_ROLES.values(), BASE_ROLE, 777]
+        }
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+
+def role_ids(member) -> set:
+    return {role.id for role in member.roles[1:]}
+
+
+def test_level_role_matches_a_linear_scan():
+    reconciler = RoleReconciler(LEVEL_ROLES, BASE_ROLE, per_second=100)
+    for level in range(0, 80):
+        reached = [req for req in LEVEL_ROLES if req <= level]
+        expected = LEVEL_ROLES[max(reached)] if reached else None
+        assert reconciler.level_role(level) == expected, level
+
+
+def test_afk_players_are_left_alone():
+    reconciler = RoleReconciler(LEVEL_ROLES, BASE_ROLE, per_second=100)
+    assert reconciler.wanted_roles(7, "afk") is None
+    assert reconciler.wanted_roles(7, "online") == {BASE_ROLE, 105}
+    reconciler.track(1, 7, "afk")
+    assert reconciler.pending() == 0
+
+
+def test_track_marks_only_real_changes():
+    reconciler = RoleReconciler(LEVEL_ROLES, BASE_ROLE, per_second=100)
+    reconciler.track("1", 3, "online")
+    assert reconciler.pending() == 1
+    reconciler._dirty.clear()
+    reconciler.track(1, 4, "dead")  # Same wanted roles as level 3
+    assert reconciler.pending() == 0
+    reconciler.track(1, 5, "online")
+    assert reconciler.pending() == 1
+    reconciler.synced(1, 5, "online")  # Edited directly
+    assert reconciler.pending() == 0
+
+
+def test_target_roles_keeps_unmanaged_roles():
+    reconciler = RoleReconciler(LEVEL_ROLES, BASE_ROLE, per_second=100)
+    member = FakeMember(1, [102, 777])
+    guild = FakeGuild(member)
+    roles = reconciler.target_roles(guild, member, reconciler.wanted_roles(12, "x"))
+    assert {role.id for role in roles} == {777, 110, BASE_ROLE}
+    member.roles = member.roles[:1] + roles
+    assert reconciler.target_roles(guild, member, frozenset({110, BASE_ROLE})) is None
+
+
+def test_reconciler_edits_each_dirty_member_once():
+    reconciler = RoleReconciler(LEVEL_ROLES, BASE_ROLE, per_second=1000)
+    in_line = FakeMember(1, [BASE_ROLE, 105])
+    behind = FakeMember(2, [BASE_ROLE, 102, 777])
+    guild = FakeGuild(in_line, behind)
+
+    async def main():
+        worker = asyncio.create_task(reconciler.run(guild))
+        reconciler.track(1, 6, "online")
+        reconciler.track(2, 60, "online")
+        reconciler.track(3, 60, "online")  # Not in the guild
+        await asyncio.sleep(0.05)
+        reconciler.roles_changed(behind)  # Nothing differs: not re-marked
+        await asyncio.sleep(0.05)
+        worker.cancel()
+
+    asyncio.run(main())
+    assert (in_line.edits, behind.edits) == (0, 1)
+    assert role_ids(behind) == {BASE_ROLE, 150, 777}
+    assert reconciler.edits == 1 and reconciler.pending() == 0
@@ -0,0 +1,194 @@
+# tests/test_stats.py
+import pytest
+
+from config import CLASS_TRANSFORMATIONS, ITEMS_DATA
+from player import Player
+from stats import (
+    CLASS_ITEMS,
+    MODIFIER_TABLE,
+    apply_class_item_hp,
+    calculate_effective_stats,
+    player_modifiers,
+)
+
+
+def legacy_effective_stats(raw_player_data: dict) -> dict:
+    """calculate_effective_stats() as it was before the modifier table."""
+    effective = {"healing_multiplier": 1.0, "evasion_chance_bonus": 0.0}
+    passive = 0.0
+    if raw_player_data.get("style") == "Habilidade Inata":
+        passive = ITEMS_DATA.get("habilidade_inata", {}).get(
+            "attack_bonus_passive_percent", 0.0
+        )
+    attack = raw_player_data["base_attack"]
+    special_attack = raw_player_data["base_special_attack"]
+    max_hp = raw_player_data["max_hp"]
+
+    transform_info = CLASS_TRANSFORMATIONS.get(raw_player_data["class"], {}).get(
+        raw_player_data.get("current_transformation")
+    )
+    if raw_player_data.get("current_transformation") and transform_info:
+        attack = int(attack * transform_info.get("attack_multiplier", 1.0))
+        special_attack = int(
+            special_attack * transform_info.get("special_attack_multiplier", 1.0)
+        )
+        max_hp = int(max_hp * transform_info.get("hp_multiplier", 1.0))
+        effective["healing_multiplier"] *= transform_info.get("healing_multiplier", 1.0)
+        if "evasion_chance_bonus" in transform_info:
+            effective["evasion_chance_bonus"] += transform_info["evasion_chance_bonus"]
+
+    blessing = ITEMS_DATA.get("bencao_rei_henrique", {})
+    if raw_player_data.get("aura_blessing_active"):
+        attack = int(attack * blessing.get("attack_multiplier", 1.0))
+        special_attack = int(
+            special_attack * blessing.get("special_attack_multiplier", 1.0)
+        )
+        max_hp = int(max_hp * blessing.get("max_hp_multiplier", 1.0))
+        effective["healing_multiplier"] *= blessing.get("healing_multiplier", 1.0)
+
+    inventory = raw_player_data.get("inventory", {})
+    class_name = raw_player_data["class"]
+    manopla = ITEMS_DATA.get("manopla_lutador", {})
+    if inventory.get("manopla_lutador", 0) > 0 and class_name == "Lutador":
+        attack = int(attack * (1 + manopla.get("attack_bonus_percent", 0.0)))
+        max_hp = int(max_hp + manopla.get("hp_bonus_flat", 0))
+    espada = ITEMS_DATA.get("espada_fantasma", {})
+    if inventory.get("espada_fantasma", 0) > 0 and class_name == "Espadachim":
+        attack = int(attack * (1 + espada.get("attack_bonus_percent", 0.0)))
+        max_hp = int(max_hp * (1 - espada.get("hp_penalty_percent", 0.0)))
+    cajado = ITEMS_DATA.get("cajado_curandeiro", {})
+    if inventory.get("cajado_curandeiro", 0) > 0 and class_name == "Curandeiro":
+        effective["healing_multiplier"] *= cajado.get("effect_multiplier", 1.0)
+
+    effective["attack"] = int(attack * (1 + passive))
+    effective["special_attack"] = special_attack
+    effective["max_hp"] = max_hp
+    effective["attack_bonus_passive_percent"] = passive
+    return effective
+
+
+def legacy_special_energy_cost(raw_player_data: dict, cost: int) -> int:
+    """The special attack's energy cost as the old combat loop computed it."""
+    if raw_player_data.get("aura_blessing_active"):
+        reduction = ITEMS_DATA.get("bencao_rei_henrique", {}).get(
+            "cooldown_reduction_percent", 0.0
+        )
+        cost = max(1, int(cost * (1 - reduction)))
+    transform_info = CLASS_TRANSFORMATIONS.get(raw_player_data["class"], {}).get(
+        raw_player_data.get("current_transformation")
+    )
+    if transform_info and "cooldown_reduction_percent" in transform_info:
+        cost = max(1, int(cost * (1 - transform_info["cooldown_reduction_percent"])))
+    mira = ITEMS_DATA.get("mira_semi_automatica", {})
+    if (
+        raw_player_data["inventory"].get("mira_semi_automatica", 0) > 0
+        and raw_player_data["class"] == "Atirador"
+    ):
+        cost = max(1, int(cost * (1 - mira.get("cooldown_reduction_percent", 0.0))))
+    return cost
+
+
+def sheets():
+    """A sheet for every MODIFIER_TABLE row, at a few base stat values."""
+    bases = [(1, 1, 1), (37, 53, 211), (250, 180, 1999)]
+    for key in MODIFIER_TABLE:
+        class_name, transformation, aura, dracula, has_item, innate = key
+        own_item = CLASS_ITEMS.get(class_name)
+        if has_item and own_item is None:
+            continue  # Vampiro has no class item
+        # Other classes' items are carried too: they must change nothing.
+        inventory = {item: 1 for item in CLASS_ITEMS.values() if item != own_item}
+        if has_item:
+            inventory[own_item] = 1
+        for attack, special_attack, max_hp in bases:
+            yield {
+                "class": class_name,
+                "style": "Habilidade Inata" if innate else "Aura",
+                "base_attack": attack,
+                "base_special_attack": special_attack,
+                "max_hp": max_hp,
+                "hp": max_hp,
+                "inventory": inventory,
+                "current_transformation": transformation,
+                "aura_blessing_active": aura,
+                "bencao_dracula_active": dracula,
+            }
+
+
+def test_table_covers_every_combination():
+    expected = sum((len(forms) + 1) * 2**4 for forms in CLASS_TRANSFORMATIONS.values())
+    assert len(MODIFIER_TABLE) == expected
+
+
+def test_effective_stats_match_legacy_formulas():
+    for record in sheets():
+        stats = calculate_effective_stats(Player.from_dict(record))
+        legacy = legacy_effective_stats(record)
+        assert (stats.attack, stats.special_attack, stats.max_hp) == (
+            legacy["attack"],
+            legacy["special_attack"],
+            legacy["max_hp"],
+        ), record
+        assert stats.healing_multiplier == pytest.approx(legacy["healing_multiplier"])
+        assert stats.evasion_chance_bonus == pytest.approx(
+            legacy["evasion_chance_bonus"]
+        )
+        assert stats.attack_bonus_passive_percent == (
+            legacy["attack_bonus_passive_percent"]
+        )
+
+
+@pytest.mark.parametrize("cost", [1, 2, 7, 40])
+def test_special_energy_cost_matches_legacy(cost):
+    for record in sheets():
+        modifiers = player_modifiers(Player.from_dict(record))
+        assert modifiers.special_energy_cost(cost) == legacy_special_energy_cost(
+            record, cost
+        )
+
+
+def test_cached_stats_follow_sheet_changes():
+    player = Player.from_dict(
+        {
+            "class": "Lutador",
+            "style": "Aura",
+            "base_attack": 40,
+            "base_special_attack": 60,
+            "max_hp": 300,
+            "hp": 300,
+            "inventory": {},
+        }
+    )
+    before = calculate_effective_stats(player)
+    assert calculate_effective_stats(player) is before  # Cached
+
+    player["base_attack"] += 10
+    raised = calculate_effective_stats(player)
+    assert raised.attack > before.attack
+
+    player["inventory"]["manopla_lutador"] = 1  # Mutated in place
+    equipped = calculate_effective_stats(player)
+    assert equipped.max_hp == legacy_effective_stats(player.to_dict())["max_hp"]
+
+
+def test_unknown_transformation_falls_back_to_compiling():
+    record = next(sheets()) | {"current_transformation": "Forma Removida"}
+    stats = calculate_effective_stats(Player.from_dict(record))
+    assert stats.attack == legacy_effective_stats(record)["attack"]
+
+
+def test_class_item_hp_on_purchase():
+    manopla = ITEMS_DATA["manopla_lutador"].get("hp_bonus_flat", 0)
+    fighter = {"class": "Lutador", "max_hp": 100, "hp": 40}
+    apply_class_item_hp(fighter, "manopla_lutador")
+    assert fighter == {"class": "Lutador", "max_hp": 100 + manopla, "hp": 40 + manopla}
+
+    penalty = ITEMS_DATA["espada_fantasma"].get("hp_penalty_percent", 0.0)
+    swordsman = {"class": "Espadachim", "max_hp": 100, "hp": 100}
+    apply_class_item_hp(swordsman, "espada_fantasma")
+    assert swordsman["max_hp"] == 100 - int(100 * penalty)
+    assert swordsman["hp"] == swordsman["max_hp"]
+
+    other = {"class": "Lutador", "max_hp": 100, "hp": 40}
+    apply_class_item_hp(other, "espada_fantasma")
+    assert other == {"class": "Lutador", "max_hp": 100, "hp": 40}
@@ -0,0 +1,143 @@
+# tests/test_storage.py
+import json
+
+from player import Player
+from storage import JournalPlayerStore, JsonPlayerStore, SqlitePlayerStore
+
+
+def sample_database() -> dict:
+    return {
+        "1": {
+            "name": "Astolfo",
+            "class": "Lutador",
+            "level": 12,
+            "kills": 3,
+            "money": 900,
+            "location": "cidade_inicial",
+            "status": "online",
+            "inventory": {"pocao": 2, "manopla_lutador": 1},
+            "cooldowns": {"work_cooldown": 1751303453.456277},
+        },
+        "2": {
+            "name": "Bia ♡",
+            "class": "Vampiro",
+            "level": 30,
+            "kills": 10,
+            "money": 50,
+            "inventory": {},
+            "cooldowns": {},
+            "legacy_field": [1, 2],  # Unknown keys survive too
+        },
+        "3": {"name": "Sem Local", "class": "Atirador", "kills": 3, "level": 40},
+    }
+
+
+def compact(store: JournalPlayerStore, database: dict) -> None:
+    """The bot's journal compaction: snapshot, write and adopt in one go."""
+    store.adopt(database, store.write_snapshot(store.snapshot(database, compact=True)))
+
+
+def test_json_store_writes_what_json_dump_writes(tmp_path):
+    path = tmp_path / "outlaws_data.json"
+    database = sample_database()
+    store = JsonPlayerStore(str(path))
+    store.save(database)
+    assert path.read_text(encoding="utf-8") == json.dumps(database, indent=4)
+
+    # A partial save reuses the cached text of everyone else
+    database["2"]["money"] += 1
+    database["4"] = {"name": "Novo"}
+    store.save(database, ["2", "4"])
+    assert path.read_text(encoding="utf-8") == json.dumps(database, indent=4)
+    assert JsonPlayerStore(str(path)).load_all() == database
+
+
+def test_json_store_round_trips_player_objects(tmp_path):
+    path = tmp_path / "outlaws_data.json"
+    database = {uid: Player.from_dict(r) for uid, r in sample_database().items()}
+    JsonPlayerStore(str(path)).save(database)
+    assert JsonPlayerStore(str(path)).load_all() == sample_database()
+
+
+def test_journal_replays_changes_and_removals(tmp_path):
+    path, journal = tmp_path / "data.json", tmp_path / "data.journal"
+    database = sample_database()
+    store = JournalPlayerStore(str(path), str(journal))
+    compact(store, database)
+
+    database["1"]["money"] = 1
+    database["1"]["inventory"]["pocao"] = 5
+    del database["1"]["cooldowns"]
+    del database["3"]
+    database["5"] = {"name": "Recém-chegado", "level": 1}
+    store.save(database, ["1", "3", "5"])
+    assert journal.stat().st_size > 0
+
+    assert JournalPlayerStore(str(path), str(journal)).load_all() == database
+
+
+def test_journal_compaction_truncates_the_log(tmp_path):
+    path, journal = tmp_path / "data.json", tmp_path / "data.journal"
+    database = sample_database()
+    store = JournalPlayerStore(str(path), str(journal))
+    store.save(database)
+    database["2"]["level"] = 31
+    store.save(database, ["2"])
+
+    compact(store, database)
+    assert journal.read_text(encoding="utf-8") == ""
+    assert JsonPlayerStore(str(path)).load_all() == database
+    assert JournalPlayerStore(str(path), str(journal)).load_all() == database
+
+
+def test_journal_ignores_a_torn_last_line(tmp_path):
+    path, journal = tmp_path / "data.json", tmp_path / "data.journal"
+    database = sample_database()
+    store = JournalPlayerStore(str(path), str(journal))
+    compact(store, database)
+    database["1"]["level"] = 13
+    store.save(database, ["1"])
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('{"u": "2", "f": "level", "v": 9')  # Crash mid-append
+
+    assert JournalPlayerStore(str(path), str(journal)).load_all() == database
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    database = sample_database()
+    store.save(database)
+    assert store.load_all() == database
+    assert store.load_player("2") == database["2"]
+    assert store.load_player("404") is None
+    assert store.count() == 3 and store.exists("3") and not store.exists("404")
+
+    database["1"]["location"] = "floresta"
+    del database["3"]
+    store.save(database, ["1", "3"])
+    assert SqlitePlayerStore(str(tmp_path / "players.db")).load_all() == database
+
+
+def test_sqlite_full_save_prunes_missing_players(tmp_path):
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    database = sample_database()
+    store.save(database)
+    del database["2"]
+    store.save(database)
+    assert set(store.load_all()) == {"1", "3"}
+
+
+def test_sqlite_ranking_order(tmp_path):
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    store.save(sample_database())
+    # kills, then level, then money, all descending
+    assert store.top_player_ids(10) == ["2", "3", "1"]
+    assert store.top_player_ids(1) == ["2"]
+
+
+def test_sqlite_imports_the_json_file(tmp_path):
+    json_path = tmp_path / "outlaws_data.json"
+    json_path.write_text(json.dumps(sample_database(), indent=4), encoding="utf-8")
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    assert store.import_json(str(json_path)) == 3
+    assert store.load_all() == sample_database()